@@ -52,7 +52,7 @@ def cleanup():
     global scheduler_manager
     if scheduler_manager:
         try:
-            scheduler_manager.stop()
+            scheduler_manager.shutdown()
         except Exception as e:
             print(f"Error during cleanup: {e}")
 
@@ -0,0 +1,170 @@
+import itertools
+import logging
+import threading
+import time
+
+from .dispatcher import DispatchError
+
+logger = logging.getLogger(__name__)
+
+# Overflow policies for a schedule item whose run would exceed a cap
+POLICY_DEFER = "defer"
+POLICY_COALESCE = "coalesce"
+POLICY_DROP = "drop"
+OVERFLOW_POLICIES = (POLICY_DEFER, POLICY_COALESCE, POLICY_DROP)
+
+# What a schedule does when its previous run is still queued or running
+DEDUP_ALLOW = "allow"
+DEDUP_SKIP = "skip"
+DEDUP_REPLACE = "replace"
+DEDUP_MODES = (DEDUP_ALLOW, DEDUP_SKIP, DEDUP_REPLACE)
+
+DEFAULT_SETTINGS = {
+    'maxQueueDepth': None,          # global cap on ComfyUI queue depth
+    'maxInFlightPerWorkflow': None,  # default per-workflow cap on our prompts
+    'overflowPolicy': POLICY_DEFER,
+    'deferSeconds': 30,
+    'maxDeferrals': 20,
+    'dedup': DEDUP_ALLOW,
+}
+
+
+class AdmissionController:
+    """
+    Caps in-flight prompts before a workflow is submitted to ComfyUI.
+
+    Queue depth is read from /queue of every backend (cached for
+    `refresh_interval` seconds) and combined with the prompts we submitted since, so
+    concurrent dispatch workers cannot overshoot a cap between refreshes.
+    """
+
+    def __init__(self, dispatcher, refresh_interval=1.0):
+        self.dispatcher = dispatcher
+        self.refresh_interval = refresh_interval
+        self.settings = dict(DEFAULT_SETTINGS)
+        self._lock = threading.Lock()
+        self._tokens = itertools.count(1)
+        self._reserved = {}      # token -> workflow
+        self._in_flight = {}     # prompt_id -> (workflow, submitted_at)
+        self._queue_depth = 0
+        self._snapshot_at = 0.0     # when the queue depth in use was read
+        self._attempted_at = 0.0    # last read attempt, successful or not
+        self._fetching = False
+
+    def configure(self, config):
+        """Apply the 'admission' section of schedules.json"""
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(config.get('admission', {}) or {})
+        if settings['overflowPolicy'] not in OVERFLOW_POLICIES:
+            logger.warning(f"Unknown overflow policy {settings['overflowPolicy']!r}, using {POLICY_DEFER!r}")
+            settings['overflowPolicy'] = POLICY_DEFER
+        if settings['dedup'] not in DEDUP_MODES:
+            logger.warning(f"Unknown dedup mode {settings['dedup']!r}, using {DEDUP_ALLOW!r}")
+            settings['dedup'] = DEDUP_ALLOW
+        self.settings = settings
+
+    def policy_for(self, schedule_item):
+        policy = (schedule_item or {}).get('overflowPolicy') or self.settings['overflowPolicy']
+        return policy if policy in OVERFLOW_POLICIES else self.settings['overflowPolicy']
+
+    def dedup_for(self, schedule_item):
+        mode = (schedule_item or {}).get('dedup') or self.settings['dedup']
+        return mode if mode in DEDUP_MODES else self.settings['dedup']
+
+    def _workflow_cap(self, schedule_item):
+        cap = (schedule_item or {}).get('maxInFlight')
+        return cap if cap is not None else self.settings['maxInFlightPerWorkflow']
+
+    def _refresh(self):
+        """
+        Refresh queue depth and drop our prompts that left the queue.
+
+        /queue is read outside the lock, by one worker at a time, and the
+        snapshot is swapped in under it; other workers keep deciding on the
+        previous snapshot meanwhile. Failed reads are rate limited too, so a
+        hung ComfyUI costs one timeout per interval instead of one per run.
+        """
+        fetched_at = time.time()
+        with self._lock:
+            if self._fetching or fetched_at - self._attempted_at < self.refresh_interval:
+                return
+            self._fetching = True
+            self._attempted_at = fetched_at
+        try:
+            queue = self.dispatcher.get_queue()
+        except (DispatchError, ValueError) as e:
+            # Fail open: the submission itself will report the outage
+            logger.debug(f"Failed to read ComfyUI queue: {e}")
+            queue = None
+        finally:
+            with self._lock:
+                self._fetching = False
+        if queue is None:
+            return
+        queued_ids = set()
+        for key in ('queue_running', 'queue_pending'):
+            for entry in queue.get(key, []):
+                if len(entry) > 1:
+                    queued_ids.add(entry[1])
+        with self._lock:
+            self._queue_depth = len(queued_ids)
+            self._snapshot_at = fetched_at
+            self._in_flight = {
+                prompt_id: info for prompt_id, info in self._in_flight.items()
+                if prompt_id in queued_ids or info[1] >= fetched_at
+            }
+
+    def reserve(self, workflow, schedule_item=None):
+        """Reserve a submission slot; returns a token, or None if a cap is reached"""
+        max_depth = self.settings['maxQueueDepth']
+        cap = self._workflow_cap(schedule_item)
+        if max_depth is not None or cap is not None:
+            # Without a cap there is nothing to check the queue against
+            self._refresh()
+        with self._lock:
+            if max_depth is not None:
+                unseen = sum(1 for _, submitted_at in self._in_flight.values()
+                             if submitted_at >= self._snapshot_at)
+                if self._queue_depth + unseen + len(self._reserved) >= max_depth:
+                    return None
+            if cap is not None and self._count_in_flight(workflow) >= cap:
+                return None
+            token = next(self._tokens)
+            self._reserved[token] = workflow
+            return token
+
+    def commit(self, token, prompt_id):
+        """Turn a reservation into a tracked in-flight prompt"""
+        with self._lock:
+            workflow = self._reserved.pop(token, None)
+            if workflow is not None:
+                self._in_flight[prompt_id] = (workflow, time.time())
+
+    def complete(self, prompt_id):
+        """Forget a prompt that finished executing"""
+        with self._lock:
+            self._in_flight.pop(prompt_id, None)
+
+    def release(self, token):
+        """Give back a reservation whose submission failed"""
+        with self._lock:
+            self._reserved.pop(token, None)
+
+    def in_flight(self, workflow=None):
+        """Our prompts still queued or running (including reservations)"""
+        with self._lock:
+            return self._count_in_flight(workflow)
+
+    def _count_in_flight(self, workflow=None):
+        # Caller holds self._lock
+        if workflow is None:
+            return len(self._in_flight) + len(self._reserved)
+        return (sum(1 for wf, _ in self._in_flight.values() if wf == workflow)
+                + sum(1 for wf in self._reserved.values() if wf == workflow))
+
+    def status(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue_depth,
+                'in_flight': self._count_in_flight(),
+            }
@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Routing policies for picking the backend of a new prompt
+ROUTE_LEAST_QUEUE = "least_queue"
+ROUTE_WEIGHTED = "weighted"
+ROUTING_POLICIES = (ROUTE_LEAST_QUEUE, ROUTE_WEIGHTED)
+
+DEFAULT_SETTINGS = {
+    'routing': ROUTE_LEAST_QUEUE,
+    'healthInterval': 10,   # seconds between /queue probes of every backend
+    'pins': {},             # workflow -> backend names it may run on
+}
+
+
+class Backend:
+    """One ComfyUI instance in the pool"""
+
+    def __init__(self, name, url, weight=1):
+        self.name = name
+        self.url = url.rstrip('/')
+        self.weight = max(1, int(weight))
+        self.healthy = True
+        self.queue_depth = 0
+        self.assigned = 0         # prompts routed here since the last queue reading
+        self.current_weight = 0   # smooth weighted round-robin state
+        self.submitted = 0
+        self.failures = 0
+        self.last_checked = None
+        self.last_error = None
+
+    @property
+    def load(self):
+        return self.queue_depth + self.assigned
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'url': self.url,
+            'weight': self.weight,
+            'healthy': self.healthy,
+            'queue_depth': self.queue_depth,
+            'assigned': self.assigned,
+            'submitted': self.submitted,
+            'failures': self.failures,
+            'last_checked': self.last_checked,
+            'last_error': self.last_error,
+        }
+
+
+class BackendPool:
+    """
+    Routes prompts across one or more ComfyUI backends.
+
+    Healthy backends are ordered by the routing policy (least queued
+    prompts per unit of weight, or smooth weighted round-robin); backends
+    that refused a connection are kept as a last resort until a health
+    probe sees them answer again. Without a 'backends' section the pool
+    holds only the default URL and behaves like a single server.
+    """
+
+    def __init__(self, default_url):
+        self.default_url = default_url
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.backends = [Backend('default', default_url)]
+        self._lock = threading.Lock()
+        self._probe = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def configure(self, config):
+        """Apply the 'backends' section of schedules.json"""
+        section = config.get('backends') or {}
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update({key: value for key, value in section.items() if key != 'servers'})
+        if settings['routing'] not in ROUTING_POLICIES:
+            logger.warning(f"Unknown routing policy {settings['routing']!r}, using {ROUTE_LEAST_QUEUE!r}")
+            settings['routing'] = ROUTE_LEAST_QUEUE
+
+        backends = []
+        for index, server in enumerate(section.get('servers') or []):
+            if isinstance(server, str):
+                server = {'url': server}
+            if not server.get('url'):
+                logger.warning(f"Backend #{index + 1} has no url, skipping")
+                continue
+            try:
+                backends.append(Backend(server.get('name') or f"backend{index + 1}",
+                                        server['url'], server.get('weight', 1)))
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Invalid backend #{index + 1}: {e}")
+        if not backends:
+            backends = [Backend('default', self.default_url)]
+
+        names = {backend.name for backend in backends}
+        for workflow, pins in (settings['pins'] or {}).items():
+            unknown = set([pins] if isinstance(pins, str) else pins) - names
+            if unknown:
+                logger.warning(f"Workflow {workflow} is pinned to unknown backends: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            # Backends that stay in the pool keep their health and counters
+            previous = {(backend.name, backend.url): backend for backend in self.backends}
+            for backend in backends:
+                old = previous.get((backend.name, backend.url))
+                if old is not None:
+                    for attr in ('healthy', 'queue_depth', 'assigned', 'submitted', 'failures',
+                                 'last_checked', 'last_error'):
+                        setattr(backend, attr, getattr(old, attr))
+            self.backends = backends
+            self.settings = settings
+
+    def urls(self):
+        return [backend.url for backend in self.backends]
+
+    def pins_for(self, workflow, schedule_item=None):
+        """Backend names a workflow is pinned to, or None for any backend"""
+        pins = (schedule_item or {}).get('backends') or (self.settings['pins'] or {}).get(workflow)
+        if not pins:
+            return None
+        return [pins] if isinstance(pins, str) else list(pins)
+
+    def route(self, pins=None):
+        """
+        Backends to try for one prompt, best first.
+
+        The first one is counted as assigned right away, so concurrent
+        workers routing before the next queue reading spread out instead
+        of all picking the same backend.
+        """
+        with self._lock:
+            pool = [backend for backend in self.backends if not pins or backend.name in pins]
+            healthy = [backend for backend in pool if backend.healthy]
+            down = [backend for backend in pool if not backend.healthy]
+            if self.settings['routing'] == ROUTE_WEIGHTED and healthy:
+                total = sum(backend.weight for backend in healthy)
+                for backend in healthy:
+                    backend.current_weight += backend.weight
+                best = max(healthy, key=lambda backend: backend.current_weight)
+                best.current_weight -= total
+                healthy.remove(best)
+                healthy.sort(key=lambda backend: backend.load / backend.weight)
+                healthy.insert(0, best)
+            else:
+                # Stable sort keeps config order between equally loaded backends
+                healthy.sort(key=lambda backend: backend.load / backend.weight)
+            ordered = healthy + down
+            if ordered:
+                ordered[0].assigned += 1
+            return ordered
+
+    def assign(self, backend):
+        """Count a prompt routed to a fallback backend"""
+        with self._lock:
+            backend.assigned += 1
+
+    def submitted(self, backend):
+        with self._lock:
+            backend.submitted += 1
+
+    def mark_down(self, backend, error):
+        """Skip a backend that refused a connection until it answers a probe"""
+        with self._lock:
+            was_healthy = backend.healthy
+            backend.healthy = False
+            backend.assigned = max(0, backend.assigned - 1)
+            backend.failures += 1
+            backend.last_error = str(error)
+            backend.last_checked = time.time()
+        if was_healthy:
+            logger.warning(f"⚠️ Backend {backend.name} ({backend.url}) is down: {error}")
+
+    def observe_queue(self, backend, depth):
+        """Record a fresh /queue reading, which also proves the backend is up"""
+        with self._lock:
+            was_healthy = backend.healthy
+            backend.healthy = True
+            backend.queue_depth = depth
+            backend.assigned = 0
+            backend.last_checked = time.time()
+            backend.last_error = None
+        if not was_healthy:
+            logger.info(f"✅ Backend {backend.name} ({backend.url}) is back")
+
+    def check(self):
+        """Probe every backend once"""
+        for backend in list(self.backends):
+            try:
+                depth = self._probe(backend)
+            except Exception as e:
+                self.mark_down(backend, e)
+                continue
+            self.observe_queue(backend, depth)
+
+    def start(self, probe):
+        """Run health checks in the background; probe(backend) returns its queue depth"""
+        self._probe = probe
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ScheduledTaskBackends", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.settings['healthInterval']):
+            # A single healthy server needs no probing; admission reads its queue anyway
+            if len(self.backends) > 1 or not self.backends[0].healthy:
+                self.check()
+
+    def status(self):
+        with self._lock:
+            return {
+                'routing': self.settings['routing'],
+                'backends': [backend.to_dict() for backend in self.backends],
+            }
@@ -0,0 +1,154 @@
+import json
+import random
+import uuid
+
+from .dispatcher import encode_prompt
+from .workflow_cache import WorkflowFormatError
+
+VARY_RANDOM = "random"
+VARY_INCREMENT = "increment"
+VARY_VALUES = "values"
+
+MAX_BATCH_COUNT = 10000
+SEED_MAX = 0xffffffffffffffff
+DEFAULT_WINDOW = 4
+
+# Inputs randomized when a batch does not list what to vary
+DEFAULT_SEED_INPUTS = ('seed', 'noise_seed')
+
+
+class BatchField:
+    """One node input varied across the variants of a batch"""
+
+    __slots__ = ('node', 'input', 'mode', 'start', 'step', 'values', 'low', 'high')
+
+    def __init__(self, spec):
+        self.node = str(spec['node'])
+        self.input = spec['input']
+        self.values = spec.get('values')
+        self.mode = spec.get('mode') or (VARY_VALUES if self.values is not None else VARY_RANDOM)
+        self.start = int(spec['start']) if spec.get('start') is not None else None
+        self.step = int(spec.get('step', 1))
+        self.low = int(spec.get('min', 0))
+        self.high = int(spec.get('max', SEED_MAX))
+        if self.mode == VARY_VALUES:
+            if not isinstance(self.values, list) or not self.values:
+                raise ValueError(f"Batch input {self.node}.{self.input} needs a non-empty 'values' list")
+        elif self.mode not in (VARY_RANDOM, VARY_INCREMENT):
+            raise ValueError(f"Unknown batch mode: {self.mode!r}")
+        if self.low > self.high:
+            raise ValueError(f"Batch input {self.node}.{self.input} has min > max")
+
+    def value(self, index, rng, original):
+        if self.mode == VARY_VALUES:
+            return self.values[index % len(self.values)]
+        if self.mode == VARY_INCREMENT:
+            start = self.start if self.start is not None else int(original or 0)
+            return start + index * self.step
+        return rng.randint(self.low, self.high)
+
+
+class BatchSpec:
+    """
+    Parsed 'batch' section of a schedule item:
+
+        {"count": 200, "window": 4, "offset": 0,
+         "vary": [{"node": "3", "input": "seed", "mode": "random"},
+                  {"node": "6", "input": "text", "values": ["a cat", "a dog"]}]}
+
+    Without 'vary', every seed/noise_seed input of the workflow is randomized.
+    """
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise ValueError(f"Invalid batch: {spec!r}")
+        self.count = int(spec.get('count', 1))
+        if not 1 <= self.count <= MAX_BATCH_COUNT:
+            raise ValueError(f"Batch count must be between 1 and {MAX_BATCH_COUNT}")
+        self.window = max(1, int(spec.get('window', DEFAULT_WINDOW)))
+        self.offset = max(0, int(spec.get('offset', 0)))
+        vary = spec.get('vary')
+        self.fields = [BatchField(field) for field in vary] if vary else None
+
+    @classmethod
+    def from_item(cls, schedule_item):
+        """BatchSpec of a schedule item, or None if it is a single run"""
+        spec = schedule_item.get('batch') if schedule_item else None
+        return cls(spec) if spec else None
+
+    def resolve_fields(self, workflow_data):
+        """Fields to vary, defaulting to the workflow's seed inputs"""
+        if self.fields is not None:
+            return self.fields
+        return [BatchField({'node': node_id, 'input': name, 'mode': VARY_RANDOM})
+                for node_id, node in workflow_data.items()
+                for name, value in (node.get('inputs') or {}).items()
+                if name in DEFAULT_SEED_INPUTS and not isinstance(value, list)]
+
+
+class BatchTemplate:
+    """
+    A /prompt body encoded once, with holes for the varied inputs.
+
+    The markers are patched into the shared workflow dict, encoded, and
+    the original values put back, so the graph is never deep-copied;
+    each variant then only encodes its own values.
+    """
+
+    def __init__(self, workflow_data, fields):
+        self.fields = fields
+        self.originals = []
+        marker = f"__scheduledtask_{uuid.uuid4().hex}_"
+        for i, field in enumerate(fields):
+            node = workflow_data.get(field.node)
+            if not isinstance(node, dict) or not isinstance(node.get('inputs'), dict):
+                raise WorkflowFormatError(f"Batch input refers to missing node {field.node}")
+            original = node['inputs'].get(field.input)
+            if isinstance(original, list):
+                raise WorkflowFormatError(f"Batch input {field.node}.{field.input} is linked to node "
+                                          f"{original[0] if original else '?'}; vary that node's input instead")
+            if field.mode == VARY_INCREMENT and field.start is None:
+                try:
+                    int(original or 0)
+                except (TypeError, ValueError):
+                    raise WorkflowFormatError(f"Batch input {field.node}.{field.input} has no integer value "
+                                              f"to increment; set 'start'") from None
+            self.originals.append(original)
+        for i, field in enumerate(fields):
+            workflow_data[field.node]['inputs'][field.input] = f"{marker}{i}"
+        try:
+            encoded = encode_prompt(workflow_data)
+        finally:
+            for field, original in zip(fields, self.originals):
+                workflow_data[field.node]['inputs'][field.input] = original
+
+        # Split the body at the quoted markers: segments[i] precedes field i
+        self.segments = []
+        self.order = []
+        rest = encoded
+        prefix = f'"{marker}'.encode('utf-8')
+        while True:
+            start = rest.find(prefix)
+            if start < 0:
+                break
+            end = rest.index(b'"', start + len(prefix))
+            self.segments.append(rest[:start])
+            self.order.append(int(rest[start + len(prefix):end]))
+            rest = rest[end + 1:]
+        self.segments.append(rest)
+
+    def body(self, values):
+        """Encoded request body with values[i] filled in for field i"""
+        parts = [self.segments[0]]
+        for segment, field_index in zip(self.segments[1:], self.order):
+            parts.append(json.dumps(values[field_index], ensure_ascii=False).encode('utf-8'))
+            parts.append(segment)
+        return b''.join(parts)
+
+    def variants(self, count, offset=0, seed=None):
+        """Yield (index, values, body) for variants offset..count-1"""
+        rng = random.Random(seed)
+        for index in range(offset, count):
+            values = [field.value(index, rng, original)
+                      for field, original in zip(self.fields, self.originals)]
+            yield index, values, self.body(values)
@@ -0,0 +1,92 @@
+"""
+Scheduler scaling benchmark.
+
+Measures full and incremental schedule saves, timer ticks and
+get_status against a large number of schedules, using a temporary
+directory so the real schedules.json is never touched.
+
+    python benchmarks/bench_scheduler.py --count 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_package():
+    """Import the extension modules without running its ComfyUI __init__"""
+    package = types.ModuleType("scheduledtask")
+    package.__path__ = [ROOT]
+    sys.modules.setdefault("scheduledtask", package)
+    import logging
+    logging.disable(logging.INFO)
+    from scheduledtask import scheduler
+    return scheduler
+
+
+def make_schedules(count, seed=1):
+    rng = random.Random(seed)
+    return [{
+        'time': f"{rng.randrange(24):02d}:{rng.randrange(60):02d}",
+        'workflow': f"workflow_{rng.randrange(50)}.json",
+        'enabled': True,
+        'id': i,
+    } for i in range(count)]
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(count):
+    scheduler = load_package()
+    results = {'schedules': count}
+    with tempfile.TemporaryDirectory() as base_dir:
+        manager = scheduler.SchedulerManager(base_dir=base_dir)
+        schedules = make_schedules(count)
+
+        results['save_full_s'], _ = timed(lambda: manager.save_schedules(schedules, True))
+
+        edited = list(schedules)
+        edited[count // 2] = dict(edited[count // 2], time="12:34")
+        results['save_one_edit_s'], _ = timed(lambda: manager.save_schedules(edited, True))
+        results['apply_one_edit_s'], _ = timed(lambda: manager.setup_schedules(schedules))
+
+        results['get_status_s'], status = timed(manager.get_status, repeat=1000)
+        results['registered_jobs'] = status['schedule_count']
+        results['timer_heap_entries'] = len(manager.timer._heap)
+
+        # One tick: pop the earliest bucket and re-arm its jobs for the next day
+        timer = manager.timer
+        first = timer.next_fire_time()
+
+        def tick():
+            due = timer.pop_due(first)
+            for key, fire_ts in due:
+                timer.reschedule_fired(key, fire_ts + 86400)
+            return len(due)
+
+        results['tick_s'], results['tick_jobs'] = timed(tick)
+        manager.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.count), indent=2))
+
+
+if __name__ == '__main__':
+    main()
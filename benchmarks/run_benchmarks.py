@@ -0,0 +1,244 @@
+"""
+Benchmark suite for the scheduler and its nodes.
+
+Runs every benchmark against temporary folders and a local stub
+ComfyUI server (benchmarks/stub_comfyui.py, needs aiohttp), and prints
+one JSON document so runs can be diffed or stored:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --only dispatch --latency 0.02 --failure-rate 0.05
+    python benchmarks/run_benchmarks.py --only backends --backends 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_scheduler import load_package, make_schedules, timed  # noqa: E402
+from bench_scheduler import run as run_scheduler_bench  # noqa: E402
+
+SECTIONS = ('dispatch', 'backends', 'scheduler', 'config', 'prompts', 'seeds')
+
+SAMPLE_WORKFLOW = {
+    "3": {"class_type": "KSampler", "inputs": {
+        "seed": 1, "steps": 20, "cfg": 7.0, "sampler_name": "euler", "scheduler": "normal",
+        "denoise": 1.0, "model": ["4", 0], "positive": ["6", 0], "negative": ["7", 0],
+        "latent_image": ["5", 0]}},
+    "4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.safetensors"}},
+    "5": {"class_type": "EmptyLatentImage", "inputs": {"width": 512, "height": 512, "batch_size": 1}},
+    "6": {"class_type": "CLIPTextEncode", "inputs": {"text": "a scenic view", "clip": ["4", 1]}},
+    "7": {"class_type": "CLIPTextEncode", "inputs": {"text": "blurry", "clip": ["4", 1]}},
+    "8": {"class_type": "VAEDecode", "inputs": {"samples": ["3", 0], "vae": ["4", 2]}},
+    "9": {"class_type": "SaveImage", "inputs": {"filename_prefix": "bench", "images": ["8", 0]}},
+}
+
+
+def latency_summary(samples):
+    from scheduledtask.tracker import percentile
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0}
+    return {
+        'count': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': percentile(ordered, 50) * 1000,
+        'p95_ms': percentile(ordered, 95) * 1000,
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def run_executes(manager, count, halfway=None):
+    """Run `count` execute_workflow calls through the worker pool; calls halfway() midway"""
+    samples = []
+    outcomes = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def execute():
+        start = time.perf_counter()
+        ok = manager.execute_workflow('bench.json')
+        with lock:
+            samples.append(time.perf_counter() - start)
+            outcomes['ok' if ok else 'failed'] += 1
+
+    start = time.perf_counter()
+    futures = []
+    for i in range(count):
+        if halfway is not None and i == count // 2:
+            for future in futures:
+                future.result()
+            halfway()
+        future = manager.dispatcher.submit(execute)
+        while future is None:
+            time.sleep(0.001)
+            future = manager.dispatcher.submit(execute)
+        futures.append(future)
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start
+    return dict(latency_summary(samples), **outcomes, throughput_per_s=count / elapsed)
+
+
+def bench_dispatch(scheduler, args):
+    from stub_comfyui import StubComfyUI
+
+    stub = StubComfyUI(latency=args.latency, failure_rate=args.failure_rate, seed=1)
+    url = stub.start()
+    results = {'latency_s': args.latency, 'failure_rate': args.failure_rate}
+    try:
+        with tempfile.TemporaryDirectory() as base_dir:
+            manager = scheduler.SchedulerManager(base_dir=base_dir, comfyui_url=url)
+            manager.global_enabled = True
+            with open(os.path.join(manager.workflow_dir, 'bench.json'), 'w', encoding='utf-8') as f:
+                json.dump(SAMPLE_WORKFLOW, f)
+
+            # Raw /prompt round trips on the keep-alive session
+            body = manager.load_workflow_payload('bench.json')
+            samples = []
+            for _ in range(args.round_trips):
+                start = time.perf_counter()
+                try:
+                    manager.dispatcher.post_body(body)
+                except scheduler.DispatchError:
+                    pass
+                samples.append(time.perf_counter() - start)
+            results['round_trip'] = latency_summary(samples)
+
+            # Full execute path (load, admission, post, history, tracking) through the worker pool
+            results['execute'] = run_executes(manager, args.dispatch_count)
+
+            # One batch schedule item fanning out to many variants
+            item = {'workflow': 'bench.json', 'time': '00:00', 'enabled': True,
+                    'batch': {'count': args.dispatch_count}}
+            elapsed, _ = timed(lambda: manager.execute_batch('bench.json', item))
+            results['batch'] = {'variants': args.dispatch_count, 'total_s': elapsed,
+                                'throughput_per_s': args.dispatch_count / elapsed}
+            manager.shutdown()
+    finally:
+        stub.stop()
+    results['stub'] = {'accepted': stub.accepted, 'failed': stub.failed}
+    return results
+
+
+def bench_backends(scheduler, args):
+    """Routing across several stub servers; the first one is stopped halfway to exercise failover"""
+    from scheduledtask.backends import ROUTING_POLICIES
+    from stub_comfyui import StubComfyUI
+
+    results = {'backends': args.backends, 'latency_s': args.latency}
+    for routing in ROUTING_POLICIES:
+        stubs = [StubComfyUI(latency=args.latency, seed=i) for i in range(args.backends)]
+        servers = [{'name': f"stub{i + 1}", 'url': stub.start(), 'weight': i + 1}
+                   for i, stub in enumerate(stubs)]
+        try:
+            with tempfile.TemporaryDirectory() as base_dir:
+                manager = scheduler.SchedulerManager(base_dir=base_dir)
+                manager.global_enabled = True
+                manager.dispatcher.pool.configure({'backends': {'routing': routing, 'servers': servers}})
+                with open(os.path.join(manager.workflow_dir, 'bench.json'), 'w', encoding='utf-8') as f:
+                    json.dump(SAMPLE_WORKFLOW, f)
+                section = run_executes(manager, args.dispatch_count, halfway=stubs[0].stop)
+                section['backends'] = {
+                    backend['name']: {key: backend[key] for key in ('weight', 'healthy', 'submitted', 'failures')}
+                    for backend in manager.dispatcher.pool.status()['backends']
+                }
+                manager.shutdown()
+        finally:
+            for stub in stubs:
+                stub.stop()
+        section['accepted'] = {server['name']: stub.accepted for server, stub in zip(servers, stubs)}
+        results[routing] = section
+    return results
+
+
+def bench_config(scheduler, args):
+    results = {'schedules': args.schedules}
+    with tempfile.TemporaryDirectory() as base_dir:
+        manager = scheduler.SchedulerManager(base_dir=base_dir)
+        schedules = make_schedules(args.schedules)
+        results['save_s'], _ = timed(lambda: manager.save_schedules(schedules, True))
+        results['file_bytes'] = os.path.getsize(manager.config_file)
+        results['load_s'], _ = timed(manager.config_store.load, repeat=3)
+        results['get_s'], _ = timed(manager.load_config, repeat=1000)
+        manager.shutdown()
+    return results
+
+
+def bench_prompts(scheduler, args):
+    results = {'lines': args.prompt_lines, 'daily_count': args.daily_count}
+    with tempfile.TemporaryDirectory() as prompt_dir:
+        with open(os.path.join(prompt_dir, 'bench.txt'), 'w', encoding='utf-8') as f:
+            for i in range(args.prompt_lines):
+                f.write(f"prompt {i}, a scenic view of mountains at dusk, highly detailed\n")
+        node = scheduler.DailyPromptScheduler()
+        node.prompt_dir = prompt_dir
+        results['index_build_s'], _ = timed(lambda: node.get_daily_prompts('bench.txt', args.daily_count, False))
+        for name, scheduled, no_repeat in (('random', False, False),
+                                           ('scheduled', True, False),
+                                           ('no_repeat', False, True)):
+            results[f'{name}_s'], _ = timed(
+                lambda: node.get_daily_prompts('bench.txt', args.daily_count, scheduled, no_repeat), repeat=5)
+    return results
+
+
+def bench_seeds(scheduler, args):
+    from scheduledtask import rng
+
+    node = scheduler.TimeToSeedList()
+    results = {'count': args.seed_count, 'numpy': rng.HAS_NUMPY}
+    results['time_based_s'], _ = timed(lambda: node.generate_seed_list(args.seed_count), repeat=5)
+    results['stream_key_s'], _ = timed(lambda: node.generate_seed_list(args.seed_count, 'bench', 10 ** 12), repeat=5)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', choices=SECTIONS, action='append', help="run only these sections")
+    parser.add_argument('--output', help="also write the JSON results to this file")
+    parser.add_argument('--latency', type=float, default=0.0, help="stub /prompt latency in seconds")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of stub /prompt calls that fail")
+    parser.add_argument('--dispatch-count', type=int, default=200)
+    parser.add_argument('--round-trips', type=int, default=100)
+    parser.add_argument('--backends', type=int, default=3, help="stub servers for the backends section")
+    parser.add_argument('--schedules', type=int, default=10000)
+    parser.add_argument('--prompt-lines', type=int, default=1000000)
+    parser.add_argument('--daily-count', type=int, default=100)
+    parser.add_argument('--seed-count', type=int, default=100000)
+    parser.add_argument('--verbose', action='store_true', help="show scheduler warnings and errors")
+    args = parser.parse_args()
+
+    scheduler = load_package()
+    if not args.verbose:
+        # Simulated failures would otherwise flood stderr
+        logging.disable(logging.ERROR)
+    sections = args.only or SECTIONS
+    results = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+    }
+    for section in sections:
+        if section == 'scheduler':
+            results[section] = run_scheduler_bench(args.schedules)
+        else:
+            results[section] = globals()[f'bench_{section}'](scheduler, args)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Local stand-in for the parts of the ComfyUI API the scheduler uses.
+
+Serves /prompt, /queue, /history and /ws with configurable submit
+latency, failure rate and per-prompt run time, so dispatch can be
+benchmarked without a GPU. Can be embedded (StubComfyUI.start()) or run
+on its own:
+
+    python benchmarks/stub_comfyui.py --port 8188 --latency 0.01 --run-time 1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+from aiohttp import web
+
+
+class StubComfyUI:
+    """aiohttp app emulating ComfyUI's prompt queue"""
+
+    def __init__(self, latency=0.0, failure_rate=0.0, run_time=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.run_time = run_time
+        self.rng = random.Random(seed)
+        self.pending = []
+        self.running = None
+        self.history = {}
+        self.sockets = set()
+        self.accepted = 0
+        self.failed = 0
+        self.port = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    def make_app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/prompt', self.handle_prompt)
+        app.router.add_get('/queue', self.handle_queue)
+        app.router.add_post('/queue', self.handle_queue_update)
+        app.router.add_get('/history', self.handle_history)
+        app.router.add_get('/history/{prompt_id}', self.handle_history)
+        app.router.add_get('/ws', self.handle_ws)
+        app.on_startup.append(self._start_worker)
+        app.on_cleanup.append(self._stop_worker)
+        return app
+
+    async def _start_worker(self, app):
+        app['worker'] = asyncio.ensure_future(self._worker())
+
+    async def _stop_worker(self, app):
+        app['worker'].cancel()
+        try:
+            await app['worker']
+        except asyncio.CancelledError:
+            pass
+
+    async def _send(self, event, data):
+        message = json.dumps({'type': event, 'data': data})
+        for ws in list(self.sockets):
+            try:
+                await ws.send_str(message)
+            except Exception:
+                self.sockets.discard(ws)
+
+    async def _worker(self):
+        # Executes queued prompts one at a time, like ComfyUI
+        while True:
+            if not self.pending:
+                await asyncio.sleep(0.005)
+                continue
+            prompt_id = self.pending.pop(0)
+            self.running = prompt_id
+            started = int(time.time() * 1000)
+            await self._send('execution_start', {'prompt_id': prompt_id, 'timestamp': started})
+            if self.run_time:
+                await asyncio.sleep(self.run_time)
+            finished = int(time.time() * 1000)
+            await self._send('execution_success', {'prompt_id': prompt_id, 'timestamp': finished})
+            self.history[prompt_id] = {'status': {
+                'status_str': 'success',
+                'completed': True,
+                'messages': [['execution_start', {'prompt_id': prompt_id, 'timestamp': started}],
+                             ['execution_success', {'prompt_id': prompt_id, 'timestamp': finished}]],
+            }}
+            self.running = None
+
+    async def handle_prompt(self, request):
+        body = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self.failed += 1
+            return web.json_response({'error': 'simulated failure'}, status=500)
+        prompt_id = str(uuid.uuid4())
+        if body.get('front'):
+            self.pending.insert(0, prompt_id)
+        else:
+            self.pending.append(prompt_id)
+        self.accepted += 1
+        return web.json_response({'prompt_id': prompt_id, 'number': self.accepted})
+
+    async def handle_queue(self, request):
+        running = [[0, self.running, {}, {}, []]] if self.running else []
+        return web.json_response({
+            'queue_running': running,
+            'queue_pending': [[i, prompt_id, {}, {}, []] for i, prompt_id in enumerate(self.pending)],
+        })
+
+    async def handle_queue_update(self, request):
+        body = await request.json()
+        if body.get('clear'):
+            self.pending.clear()
+        for prompt_id in body.get('delete', []):
+            if prompt_id in self.pending:
+                self.pending.remove(prompt_id)
+        return web.json_response({})
+
+    async def handle_history(self, request):
+        prompt_id = request.match_info.get('prompt_id')
+        if prompt_id:
+            entry = self.history.get(prompt_id)
+            return web.json_response({prompt_id: entry} if entry else {})
+        return web.json_response(self.history)
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self.sockets.discard(ws)
+        return ws
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, port=0):
+        """Serve from a background thread; returns the base URL"""
+        ready = threading.Event()
+
+        def serve():
+            loop = self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._runner = web.AppRunner(self.make_app())
+            loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, '127.0.0.1', port)
+            loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self._runner.cleanup())
+            loop.close()
+
+        self._thread = threading.Thread(target=serve, name="StubComfyUI", daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        return self.url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+            self._loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8188)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to each /prompt")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="fraction of /prompt calls answered with 500")
+    parser.add_argument('--run-time', type=float, default=0.0, help="seconds each prompt 'executes'")
+    args = parser.parse_args()
+    stub = StubComfyUI(args.latency, args.failure_rate, args.run_time)
+    web.run_app(stub.make_app(), host='127.0.0.1', port=args.port)
+
+
+if __name__ == '__main__':
+    main()
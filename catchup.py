@@ -0,0 +1,158 @@
+import json
+import logging
+import threading
+from collections import deque
+
+from .config_store import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Per-schedule policies for runs missed while the scheduler was down
+CATCHUP_SKIP = "skip"
+CATCHUP_ONCE = "once"
+CATCHUP_ALL = "all"
+CATCHUP_POLICIES = (CATCHUP_SKIP, CATCHUP_ONCE, CATCHUP_ALL)
+
+DEFAULT_SETTINGS = {
+    'policy': CATCHUP_SKIP,
+    'maxReplays': 10,        # per schedule, for the "all" policy
+    'maxAge': 86400,         # ignore fire times older than this (seconds)
+    'replayDelay': 10,       # wait before the first replay after startup
+    'replayInterval': 30,    # spacing between replays across all schedules
+}
+
+# Deferred watermark advances are written at most this often (seconds)
+WATERMARK_FLUSH_SECONDS = 5
+
+
+class WatermarkStore:
+    """
+    Persists the fire time of the last handled timer tick.
+
+    advance() with defer=True only moves the in-memory value; a background
+    writer persists it at most every `flush_interval` seconds, so timer
+    callbacks never wait on an fsync. Catch-up only needs coarse
+    precision: a crash can replay at most the last interval's runs.
+    """
+
+    def __init__(self, path, flush_interval=WATERMARK_FLUSH_SECONDS):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.value = self._load()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return float(json.load(f).get('last_tick'))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to load scheduler state: {e}")
+            return None
+
+    def reload(self):
+        """Re-read the file, e.g. after another process advanced it"""
+        value = self._load()
+        with self._lock:
+            if value is not None and (self.value is None or value > self.value):
+                self.value = value
+
+    def advance(self, timestamp, defer=False):
+        """Move the watermark forward (never backwards); persist now, or soon with defer"""
+        with self._lock:
+            if self.value is not None and timestamp <= self.value:
+                return
+            self.value = timestamp
+            self._dirty = True
+            if defer:
+                if self._thread is None:
+                    self._stop_event.clear()
+                    self._thread = threading.Thread(target=self._run, name="ScheduledTaskWatermark", daemon=True)
+                    self._thread.start()
+                return
+        self.flush()
+
+    def flush(self):
+        """Write a pending value, unless the file already holds a later one"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            value = self.value
+        stored = self._load()
+        if stored is not None and stored >= value:
+            return
+        try:
+            atomic_write_json(self.path, {'last_tick': value}, indent=None)
+        except Exception as e:
+            logger.error(f"Failed to save scheduler state: {e}")
+            with self._lock:
+                self._dirty = True
+
+    def _run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background writer and persist the latest value"""
+        self._stop_event.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.flush_interval + 1)
+        self.flush()
+
+
+def missed_fire_times(trigger, since, until, limit):
+    """The latest limit fire times of trigger in (since, until]"""
+    missed = deque(maxlen=limit)
+    fire_ts = trigger.next_fire(since)
+    while fire_ts <= until:
+        missed.append(fire_ts)
+        fire_ts = trigger.next_fire(fire_ts)
+    return list(missed)
+
+
+def _replay_limit(item, settings):
+    """Per-item 'catchupMax', falling back to the 'maxReplays' setting"""
+    for source, value in (('catchupMax', item.get('catchupMax')), ('maxReplays', settings['maxReplays']),
+                          ('default', DEFAULT_SETTINGS['maxReplays'])):
+        if value is None:
+            continue
+        try:
+            return max(0, int(value))
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid {source} {value!r} for {item.get('workflow')}, using the default")
+    return DEFAULT_SETTINGS['maxReplays']
+
+
+def plan_catch_up(jobs, since, until, settings):
+    """
+    Decide which missed runs to replay.
+
+    Returns (schedule_item, missed_fire_ts) pairs in fire order, limited
+    by each item's 'catchup' policy and 'catchupMax'; when more runs were
+    missed, the latest ones are replayed.
+    """
+    since = max(since, until - settings['maxAge'])
+    plan = []
+    for job in jobs:
+        item = job.item
+        policy = item.get('catchup') or settings['policy']
+        if policy not in CATCHUP_POLICIES:
+            logger.warning(f"Unknown catch-up policy {policy!r} for {item.get('workflow')}, skipping")
+            continue
+        if policy == CATCHUP_SKIP:
+            continue
+        limit = 1 if policy == CATCHUP_ONCE else _replay_limit(item, settings)
+        try:
+            missed = missed_fire_times(job.trigger, since, until, limit)
+        except ValueError as e:
+            logger.error(f"Failed to compute missed runs for {item.get('workflow')}: {e}")
+            continue
+        plan.extend((item, fire_ts) for fire_ts in missed)
+    plan.sort(key=lambda entry: entry[1])
+    return plan
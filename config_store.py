@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Assumed when the process umask cannot be read
+DEFAULT_UMASK = 0o022
+
+
+def _current_umask():
+    """
+    Process umask, read without changing it.
+
+    os.umask() can only be queried by setting it, which would briefly
+    apply the wrong mask to files created by ComfyUI's other threads.
+    """
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return DEFAULT_UMASK
+
+
+def _file_mode(path):
+    """Mode a rewritten file should keep: the current one, or what open() would give a new file"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_current_umask()
+
+
+def atomic_write_json(path, data, indent=2):
+    """Write JSON to path via temp file + fsync + rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(data, ensure_ascii=False, indent=indent))
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates 0600; other processes sharing the install must still read the file
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if hasattr(os, 'O_DIRECTORY'):
+        # Persist the rename itself (POSIX only)
+        try:
+            dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        except OSError:
+            pass
+
+
+class ConfigStore:
+    """
+    In-memory source of truth for schedules.json.
+
+    Reads never touch the disk. Every accepted change, whether saved
+    through update() or picked up from an external edit of the file,
+    bumps a monotonically increasing version. External edits are detected
+    by a polling watcher and applied once the file has been stable for
+    `debounce` seconds; on_change(config) is then called with the new config.
+    """
+
+    def __init__(self, path, on_change=None, poll_interval=2.0, debounce=0.5):
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.version = 0
+        self._config = {}
+        self._signature = None
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.load()
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """(Re)load the file into memory; keeps the previous config on errors"""
+        with self._lock:
+            signature = self._stat_signature()
+            if signature is None:
+                self._signature = None
+                return self._config
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                if not isinstance(config, dict):
+                    raise ValueError("top-level value must be an object")
+            except Exception as e:
+                logger.error(f"Failed to load config file: {e}")
+                # Remember the signature so a broken file is not re-parsed every poll
+                self._signature = signature
+                return self._config
+            self._config = config
+            self._signature = signature
+            self.version += 1
+            return config
+
+    def get(self):
+        """Current config (shared; treat as read-only)"""
+        return self._config
+
+    def update(self, changes, indent=2):
+        """Merge changes into the config and persist it atomically"""
+        with self._lock:
+            config = dict(self._config)
+            config.update(changes)
+            atomic_write_json(self.path, config, indent=indent)
+            self._config = config
+            self._signature = self._stat_signature()
+            self.version += 1
+            return config
+
+    def start_watching(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, name="ScheduledTaskConfigWatcher", daemon=True)
+        self._thread.start()
+
+    def stop_watching(self):
+        self._stop_event.set()
+        self._thread = None
+
+    def _watch(self):
+        while not self._stop_event.wait(self.poll_interval):
+            signature = self._stat_signature()
+            if signature is None or signature == self._signature:
+                continue
+            # Debounce: wait until the file stops changing
+            while not self._stop_event.wait(self.debounce):
+                latest = self._stat_signature()
+                if latest == signature:
+                    break
+                signature = latest
+            if self._stop_event.is_set():
+                break
+            with self._lock:
+                if signature is None or signature == self._signature:
+                    continue
+                version = self.version
+                config = self.load()
+                reloaded = self.version != version
+            if reloaded:
+                logger.info(f"🔄 Detected external edit of {os.path.basename(self.path)}, reloaded (version {self.version})")
+                if self.on_change is not None:
+                    try:
+                        self.on_change(config)
+                    except Exception as e:
+                        logger.error(f"Failed to apply reloaded config: {e}")
@@ -0,0 +1,255 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .backends import BackendPool
+from .metrics import PROMPT_REQUEST
+
+logger = logging.getLogger(__name__)
+
+CLIENT_ID = "scheduled_task"
+
+# Remembered prompt_id -> backend URL routes, until the tracker picks them up
+MAX_ROUTES = 4096
+
+
+def encode_prompt(workflow_data):
+    """Encode a /prompt request body for the scheduler's client_id"""
+    return b''.join((
+        b'{"prompt":',
+        json.dumps(workflow_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        b',"client_id":"', CLIENT_ID.encode('utf-8'), b'"}',
+    ))
+
+
+def with_front(body):
+    """Ask ComfyUI to put a pre-encoded /prompt body at the front of its queue"""
+    return body[:-1] + b',"front":true}'
+
+
+class DispatchError(Exception):
+    """Raised when a prompt could not be submitted to ComfyUI"""
+
+    def __init__(self, message, cause="error"):
+        super().__init__(message)
+        self.cause = cause
+
+
+class WorkflowDispatcher:
+    """
+    Submits workflows to ComfyUI from a bounded worker pool.
+
+    All requests share one keep-alive session, so jobs due at the same
+    time go out concurrently without opening a new connection each.
+    Prompts are routed through a BackendPool; `base_url` is the default
+    backend used when no pool is configured.
+    """
+
+    def __init__(self, base_url, max_workers=4, max_pending=256, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pool = BackendPool(self.base_url)
+        self._routes = OrderedDict()
+        self.session = requests.Session()
+        # Room for batch posts running alongside the worker pool, per backend host
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_workers * 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="ScheduledTaskDispatch")
+        # Separate pool for batch posts, so a batch job waiting on its
+        # posts never blocks the workers those posts would need
+        self._batch_executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                  thread_name_prefix="ScheduledTaskBatch")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.pool.start(self._probe)
+
+    @property
+    def pending(self):
+        """Number of submitted jobs not finished yet"""
+        return self._pending
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) on the worker pool; returns a Future or None if full"""
+        if not self._slots.acquire(blocking=False):
+            logger.warning(f"Dispatch queue full ({self.max_pending} pending), dropping job")
+            return None
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except RuntimeError as e:
+            self._release()
+            logger.error(f"Dispatcher is shut down, dropping job: {e}")
+            return None
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def post_prompt(self, workflow_data, pins=None):
+        """Post a workflow to /prompt and return its prompt_id"""
+        return self.post_body(encode_prompt(workflow_data), pins)
+
+    def post_body(self, body, pins=None):
+        """
+        Post a pre-encoded /prompt request body and return its prompt_id.
+
+        Tries the backends in routing order (restricted to `pins` when
+        given) and fails over only when a backend refuses the connection;
+        a timeout or HTTP error may mean the prompt was accepted, so it is
+        not retried elsewhere.
+        """
+        error = None
+        for attempt, backend in enumerate(self.pool.route(pins)):
+            if attempt:
+                self.pool.assign(backend)
+            try:
+                prompt_id = self._post(backend.url, body)
+            except DispatchError as e:
+                if e.cause != "connection":
+                    raise
+                self.pool.mark_down(backend, e)
+                error = e
+                continue
+            self.pool.submitted(backend)
+            with self._lock:
+                self._routes[prompt_id] = backend.url
+                if len(self._routes) > MAX_ROUTES:
+                    self._routes.popitem(last=False)
+            return prompt_id
+        if error is None:
+            raise DispatchError(f"No ComfyUI backend named {', '.join(pins or ())}", "connection")
+        raise error
+
+    def _post(self, base_url, body):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{base_url}/prompt",
+                data=body,
+                timeout=self.timeout,
+                headers={'Content-Type': 'application/json'}
+            )
+        except requests.exceptions.ConnectionError as e:
+            raise DispatchError(f"Cannot connect to ComfyUI service ({base_url})", "connection") from e
+        except requests.exceptions.Timeout as e:
+            raise DispatchError(f"Request to {base_url}/prompt timed out", "timeout") from e
+        PROMPT_REQUEST.observe(time.perf_counter() - started)
+
+        if response.status_code != 200:
+            raise DispatchError(f"Status: {response.status_code}", "http_status")
+        return response.json().get('prompt_id', 'unknown')
+
+    def backend_for(self, prompt_id):
+        """URL of the backend a prompt was posted to (forgotten after the first lookup)"""
+        with self._lock:
+            return self._routes.pop(prompt_id, self.base_url)
+
+    def post_many(self, bodies, window=4, pins=None):
+        """
+        Post (tag, body) pairs with up to `window` requests in flight.
+
+        Bodies are pulled lazily, so the iterable can stop early. Yields
+        (tag, prompt_id, error) in submission order; error is a
+        DispatchError or None.
+        """
+        bodies = iter(bodies)
+        in_flight = deque()
+        exhausted = False
+        while True:
+            while not exhausted and len(in_flight) < window:
+                try:
+                    tag, body = next(bodies)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight.append((tag, self._batch_executor.submit(self.post_body, body, pins)))
+            if not in_flight:
+                return
+            tag, future = in_flight.popleft()
+            try:
+                yield tag, future.result(), None
+            except DispatchError as e:
+                yield tag, None, e
+            except Exception as e:
+                yield tag, None, DispatchError(str(e))
+
+    def get_json(self, path, timeout=5, base_url=None):
+        """GET a ComfyUI API path and return the decoded JSON body"""
+        base_url = base_url or self.base_url
+        try:
+            response = self.session.get(f"{base_url}{path}", timeout=timeout)
+        except requests.exceptions.ConnectionError as e:
+            raise DispatchError(f"Cannot connect to ComfyUI service ({base_url})", "connection") from e
+        except requests.exceptions.Timeout as e:
+            raise DispatchError(f"Request to {base_url}{path} timed out", "timeout") from e
+        if response.status_code != 200:
+            raise DispatchError(f"Status: {response.status_code}", "http_status")
+        return response.json()
+
+    def post_json(self, path, data, timeout=5, base_url=None):
+        """POST JSON to a ComfyUI API path, e.g. /queue deletions"""
+        base_url = base_url or self.base_url
+        try:
+            response = self.session.post(f"{base_url}{path}", json=data, timeout=timeout)
+        except requests.exceptions.ConnectionError as e:
+            raise DispatchError(f"Cannot connect to ComfyUI service ({base_url})", "connection") from e
+        except requests.exceptions.Timeout as e:
+            raise DispatchError(f"Request to {base_url}{path} timed out", "timeout") from e
+        if response.status_code != 200:
+            raise DispatchError(f"Status: {response.status_code}", "http_status")
+
+    def _probe(self, backend):
+        """Health check: a backend is up if it answers /queue; returns its depth"""
+        queue = self.get_json("/queue", timeout=3, base_url=backend.url)
+        return len(queue.get('queue_running', [])) + len(queue.get('queue_pending', []))
+
+    def get_queue(self):
+        """
+        /queue of every healthy backend merged into one.
+
+        Each reading also refreshes that backend's depth for routing.
+        Raises the last DispatchError if no backend answered.
+        """
+        merged = {'queue_running': [], 'queue_pending': []}
+        error = None
+        answered = False
+        for backend in list(self.pool.backends):
+            if not backend.healthy and len(self.pool.backends) > 1:
+                continue
+            try:
+                queue = self.get_json("/queue", base_url=backend.url)
+            except DispatchError as e:
+                error = e
+                if e.cause == "connection":
+                    self.pool.mark_down(backend, e)
+                continue
+            running = queue.get('queue_running', [])
+            pending = queue.get('queue_pending', [])
+            self.pool.observe_queue(backend, len(running) + len(pending))
+            merged['queue_running'].extend(running)
+            merged['queue_pending'].extend(pending)
+            answered = True
+        if not answered and error is not None:
+            raise error
+        return merged
+
+    def shutdown(self, wait=False):
+        """Stop accepting jobs and close the session"""
+        self.pool.stop()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._batch_executor.shutdown(wait=wait, cancel_futures=True)
+        self.session.close()
@@ -0,0 +1,78 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+EVENT_RUN = "scheduledtask.run"
+EVENT_STATE = "scheduledtask.state"
+
+_MISSING = object()
+
+
+try:
+    import server
+    HAS_PROMPT_SERVER = True
+except ImportError:
+    HAS_PROMPT_SERVER = False
+
+
+def _prompt_server():
+    if not HAS_PROMPT_SERVER:
+        return None
+    return getattr(server.PromptServer, 'instance', None)
+
+
+class EventPublisher:
+    """
+    Pushes scheduler events to browser clients over ComfyUI's websocket.
+
+    Run lifecycle events are sent as they happen. State is sent as a diff:
+    publish_state() only transmits the keys whose values changed since the
+    previous call, so clients apply small patches instead of reloading.
+    Outside ComfyUI (benchmarks, scripts) publishing is a no-op apart from
+    local listeners.
+    """
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Call listener(event, data) for every published event"""
+        self._listeners.append(listener)
+
+    def publish(self, event, data):
+        for listener in self._listeners:
+            try:
+                listener(event, data)
+            except Exception as e:
+                logger.error(f"Event listener failed: {e}")
+        instance = _prompt_server()
+        if instance is None:
+            return
+        try:
+            # send_sync hands the message to the server loop thread-safely
+            instance.send_sync(event, data)
+        except Exception as e:
+            logger.debug(f"Failed to push {event}: {e}")
+
+    def publish_run(self, **fields):
+        self.publish(EVENT_RUN, {key: value for key, value in fields.items() if value is not None})
+
+    def publish_state(self, state, full=False):
+        """Send the changed keys of state (or all of it when full)"""
+        with self._lock:
+            if full:
+                changes = dict(state)
+            else:
+                changes = {key: value for key, value in state.items() if self._state.get(key, _MISSING) != value}
+            self._state = dict(state)
+        if changes:
+            self.publish(EVENT_STATE, changes)
+        return changes
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._state)
+
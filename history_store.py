@@ -0,0 +1,169 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'retentionDays': 30,
+    'maxRows': 200000,
+}
+
+# Prune and compact after this many inserts
+PRUNE_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fired_at REAL NOT NULL,
+    schedule TEXT,
+    workflow TEXT NOT NULL,
+    prompt_id TEXT,
+    status TEXT NOT NULL,
+    enqueued_at REAL,
+    started_at REAL,
+    finished_at REAL,
+    queue_wait REAL,
+    execution_time REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_fired_at ON runs (fired_at);
+CREATE INDEX IF NOT EXISTS idx_runs_workflow ON runs (workflow, fired_at);
+CREATE INDEX IF NOT EXISTS idx_runs_prompt_id ON runs (prompt_id) WHERE prompt_id IS NOT NULL;
+"""
+
+COLUMNS = ('id', 'fired_at', 'schedule', 'workflow', 'prompt_id', 'status', 'enqueued_at',
+           'started_at', 'finished_at', 'queue_wait', 'execution_time', 'error')
+
+
+class RunHistoryStore:
+    """
+    SQLite store of every schedule firing.
+
+    Rows are pruned by age and count every PRUNE_EVERY inserts, and the
+    freed pages are returned with an incremental vacuum so the file stays
+    bounded after months of runs.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.settings = dict(DEFAULT_SETTINGS)
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            # auto_vacuum only takes effect on a new database, before the first table
+            self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def configure(self, config):
+        """Apply the 'history' section of schedules.json"""
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(config.get('history', {}) or {})
+        self.settings = settings
+
+    def add(self, workflow, status, schedule=None, prompt_id=None, error=None,
+            fired_at=None, enqueued_at=None):
+        """Record one firing and return its row id"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (fired_at, schedule, workflow, prompt_id, status, enqueued_at, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (fired_at or time.time(), schedule, workflow, prompt_id, status, enqueued_at, error))
+            self._conn.commit()
+            self._inserts += 1
+            if self._inserts % PRUNE_EVERY == 0:
+                self._prune()
+            return cursor.lastrowid
+
+    def update_run(self, record):
+        """Update a dispatched run from a tracker RunRecord"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, started_at = ?, finished_at = ?, queue_wait = ?, "
+                "execution_time = ?, error = ? WHERE prompt_id = ?",
+                (record.status, record.started_at, record.finished_at, record.queue_wait,
+                 record.execution_time, record.error, record.prompt_id))
+            self._conn.commit()
+
+    def query(self, limit=50, before=None, workflow=None, status=None, since=None, until=None):
+        """
+        Return one page of runs, newest first.
+
+        Pagination is keyset based: pass the returned 'next_before' as
+        `before` to fetch the following page.
+        """
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("id < ?")
+            params.append(before)
+        if workflow:
+            clauses.append("workflow = ?")
+            params.append(workflow)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since is not None:
+            clauses.append("fired_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("fired_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM runs {where} ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, params + [limit + 1]).fetchall()
+        runs = [dict(zip(COLUMNS, row)) for row in rows[:limit]]
+        return {
+            'runs': runs,
+            'next_before': runs[-1]['id'] if len(rows) > limit else None,
+        }
+
+    def duration_estimates(self, since=None):
+        """Per-workflow execution time stats of finished runs: {workflow: {median, p95, samples}}"""
+        sql = "SELECT workflow, execution_time FROM runs WHERE execution_time IS NOT NULL"
+        params = []
+        if since is not None:
+            sql += " AND fired_at >= ?"
+            params.append(since)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY workflow, execution_time", params).fetchall()
+        samples = {}
+        for workflow, execution_time in rows:
+            samples.setdefault(workflow, []).append(execution_time)
+        return {
+            workflow: {
+                'median': values[(len(values) - 1) // 2],
+                'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'samples': len(values),
+            }
+            for workflow, values in samples.items()
+        }
+    
+    def _prune(self):
+        """Apply retention limits and release freed pages (caller holds the lock)"""
+        try:
+            retention_days = self.settings.get('retentionDays')
+            if retention_days:
+                cutoff = time.time() - retention_days * 86400
+                self._conn.execute("DELETE FROM runs WHERE fired_at < ?", (cutoff,))
+            max_rows = self.settings.get('maxRows')
+            if max_rows:
+                self._conn.execute(
+                    "DELETE FROM runs WHERE id <= (SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (max_rows,))
+            self._conn.commit()
+            # The pragma frees one page per step and execute() steps only once;
+            # executescript() runs it to completion
+            self._conn.executescript("PRAGMA incremental_vacuum;")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logger.error(f"Failed to prune run history: {e}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,222 @@
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from .config_store import atomic_write_json
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+try:
+    import msvcrt
+    HAS_MSVCRT = True
+except ImportError:
+    HAS_MSVCRT = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'heartbeat': 2,   # seconds between lease renewals / takeover attempts
+    'ttl': 10,        # a lease not renewed for this long may be taken over
+}
+
+
+def _try_lock(fd):
+    if HAS_FCNTL:
+        # flock locks belong to the open file, so they also exclude other
+        # managers in the same process and vanish when the process dies
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+    os.lseek(fd, 0, os.SEEK_SET)
+    try:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fd):
+    if HAS_FCNTL:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class LeaderLease:
+    """
+    Elects one dispatching process among ComfyUI processes sharing an install.
+
+    The leader holds an exclusive lock on `<path>.lock` and renews a
+    heartbeat in `<path>` every `heartbeat` seconds. A standby takes over
+    once it gets the lock and the recorded lease has expired or was
+    released, so a crashed leader is replaced within `ttl` seconds and a
+    cleanly stopped one immediately. The lease check also covers file
+    systems where locks are not shared between hosts. Without fcntl or
+    msvcrt every process is its own leader.
+    """
+
+    def __init__(self, path, on_change=None, settings=None):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.on_change = on_change
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.supported = HAS_FCNTL or HAS_MSVCRT
+        self._leader = not self.supported
+        self._expires_at = float('inf') if self._leader else 0.0
+        self._acquired_at = time.time() if self._leader else None
+        self._fd = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self):
+        # A leader whose heartbeat stalled past the ttl stops acting as one
+        return self._leader and time.time() < self._expires_at
+
+    def read(self):
+        """The lease as last written by any process, or None"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"Unreadable leader lease: {e}")
+            return None
+
+    def _write(self, now, expires_at):
+        atomic_write_json(self.path, {
+            'owner': self.owner,
+            'pid': os.getpid(),
+            'host': socket.gethostname(),
+            'acquired_at': self._acquired_at,
+            'renewed_at': now,
+            'expires_at': expires_at,
+        }, indent=None)
+
+    def _try_acquire(self):
+        now = time.time()
+        if self._fd is None:
+            self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        if not _try_lock(self._fd):
+            return False
+        lease = self.read()
+        if lease and lease.get('owner') != self.owner and lease.get('expires_at', 0) > now:
+            # Lock is free but the lease is still live: the leader is on a
+            # host that does not share our locks, or died moments ago
+            _unlock(self._fd)
+            return False
+        self._acquired_at = now
+        self._write(now, now + self.settings['ttl'])
+        self._expires_at = now + self.settings['ttl']
+        self._leader = True
+        logger.info(f"👑 Scheduler leadership acquired ({self.owner})")
+        return True
+
+    def _renew(self):
+        now = time.time()
+        lease = self.read()
+        if lease and lease.get('owner') != self.owner and lease.get('expires_at', 0) > now:
+            self._step_down(f"lease taken over by {lease.get('owner')}")
+            return
+        try:
+            self._write(now, now + self.settings['ttl'])
+            self._expires_at = now + self.settings['ttl']
+        except Exception as e:
+            logger.error(f"Failed to renew leader lease: {e}")
+            if now >= self._expires_at:
+                self._step_down("lease could not be renewed")
+
+    def _step_down(self, reason, release=False):
+        if release:
+            try:
+                now = time.time()
+                self._write(now, 0)
+            except Exception as e:
+                logger.error(f"Failed to release leader lease: {e}")
+        self._leader = False
+        self._expires_at = 0.0
+        if self._fd is not None:
+            try:
+                _unlock(self._fd)
+            except OSError:
+                pass
+        (logger.info if release else logger.warning)(f"Scheduler leadership released: {reason}")
+
+    def tick(self):
+        """One election round; returns True if leadership changed"""
+        with self._lock:
+            if self._stop_event.is_set():
+                return False
+            was_leader = self._leader
+            try:
+                if self._leader:
+                    self._renew()
+                else:
+                    self._try_acquire()
+            except Exception as e:
+                logger.error(f"Leader election failed: {e}")
+            changed = self._leader != was_leader
+        if changed and self.on_change is not None:
+            try:
+                self.on_change(self._leader)
+            except Exception as e:
+                logger.error(f"Leadership change handler failed: {e}")
+        return changed
+
+    def start(self):
+        """Try to become leader now, then keep electing in the background"""
+        if not self.supported:
+            logger.info("File locking unavailable, this process always dispatches")
+            return True
+        with self._lock:
+            try:
+                self._try_acquire()
+            except Exception as e:
+                logger.error(f"Leader election failed: {e}")
+        if not self._leader:
+            lease = self.read() or {}
+            logger.info(f"Standing by, schedules are dispatched by {lease.get('owner', 'another process')}")
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="ScheduledTaskLeader", daemon=True)
+            self._thread.start()
+        return self._leader
+
+    def _run(self):
+        while not self._stop_event.wait(self.settings['heartbeat']):
+            self.tick()
+
+    def stop(self):
+        """Stop electing and hand leadership over immediately"""
+        self._stop_event.set()
+        self._thread = None
+        with self._lock:
+            if self._leader and self.supported:
+                self._step_down("shutting down", release=True)
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def status(self):
+        lease = self.read() or {}
+        return {
+            'leader': self.is_leader,
+            'owner': self.owner,
+            'current_owner': lease.get('owner') if self.supported else self.owner,
+            'expires_at': lease.get('expires_at'),
+            'locking': 'fcntl' if HAS_FCNTL else 'msvcrt' if HAS_MSVCRT else None,
+        }
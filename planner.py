@@ -0,0 +1,255 @@
+import logging
+import time
+from collections import defaultdict, deque
+
+from .batch import BatchSpec
+from .tracker import percentile
+from .triggers import build_trigger, has_trigger
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'defaultDuration': 60,    # seconds, for workflows without history or an estimate
+    'horizon': 86400,         # simulated span in seconds
+    'minIdleGap': 300,        # idle periods shorter than this are not reported
+    'historyDays': 14,        # window of past runs used for estimates
+    'spread': 0,              # spread window (seconds) for items without their own
+    'affinity': False,        # group firings due together by model signature
+    'affinityWindow': 2,      # seconds the affinity lane collects runs before posting them
+}
+
+# Safety limits so a pathological schedule cannot stall the request
+MAX_FIRINGS = 200000
+MAX_TIMELINE = 500
+MAX_GAPS = 50
+
+
+def spread_window(item, default=0, key='spread'):
+    """Seconds a schedule item's start may be pushed back to smooth load"""
+    try:
+        return max(0.0, float(item.get(key, default) or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def affinity_key(signatures, leading=()):
+    """
+    Sort key grouping workflows by model signature.
+
+    Signatures in `leading` (models already loaded) sort first; workflows
+    without a signature sort last.
+    """
+    def key(workflow):
+        signature = signatures.get(workflow)
+        return (signature is None, signature not in leading, signature or '')
+    return key
+
+
+def spread_offsets(entries, durations, default_duration, signatures=None):
+    """
+    Start offsets spreading firings due in the same minute over their windows.
+
+    `entries` are (id, workflow, window, nominal_ts). Within each minute,
+    fixed entries (window 0) keep their time and go first, then spread
+    entries follow shortest expected duration first, each starting when
+    the ones before it should be done. With `signatures` (workflow ->
+    model signature) spread entries are grouped by model first, starting
+    with the models of the fixed entries. If the starts would overrun the
+    window, they are compressed evenly into it. Returns {id: offset} for
+    spread entries only; the result depends only on the inputs.
+    """
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[int(entry[3] // 60)].append(entry)
+
+    offsets = {}
+    for group in groups.values():
+        if len(group) < 2 or not any(window for _, _, window, _ in group):
+            continue
+        if signatures:
+            fixed = {signatures.get(entry[1]) for entry in group if not entry[2]}
+            models = affinity_key(signatures, fixed)
+        else:
+            models = lambda workflow: ()
+        ordered = sorted(group, key=lambda entry: (
+            entry[2] > 0, models(entry[1]), float(durations.get(entry[1], default_duration)),
+            entry[1], str(entry[0])))
+        starts = []
+        elapsed = 0.0
+        for _, workflow, _, _ in ordered:
+            starts.append(elapsed)
+            elapsed += float(durations.get(workflow, default_duration))
+        window = max(entry[2] for entry in group)
+        scale = min(1.0, window / starts[-1]) if starts[-1] else 1.0
+        base = min(entry[3] for entry in group)
+        for (entry_id, _, entry_window, nominal), begin in zip(ordered, starts):
+            if entry_window > 0:
+                offsets[entry_id] = max(0.0, min(base + begin * scale - nominal, entry_window))
+    return offsets
+
+
+def firings_between(schedules, start, end, durations=None, default_duration=60, spread=0, signatures=None):
+    """
+    (fire_ts, workflow, prompt_count) for every enabled item firing in [start, end).
+
+    Items with a spread window (their own `spread`, or `spread` as the
+    default) are shifted as the scheduler would shift them.
+    """
+    firings = []
+    windows = []
+    for item in schedules:
+        if not item.get('enabled') or not item.get('workflow') or not has_trigger(item):
+            continue
+        try:
+            trigger = build_trigger(item)
+            batch = BatchSpec.from_item(item)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Planner skipping invalid schedule for {item.get('workflow')}: {e}")
+            continue
+        prompts = batch.count - batch.offset if batch else 1
+        window = spread_window(item, spread)
+        fire_ts = trigger.next_fire(start - 1e-6)
+        while fire_ts < end and len(firings) < MAX_FIRINGS:
+            firings.append((fire_ts, item['workflow'], prompts))
+            windows.append(window)
+            fire_ts = trigger.next_fire(fire_ts)
+    if any(windows):
+        offsets = spread_offsets(
+            [(index, firing[1], window, firing[0]) for index, (firing, window) in enumerate(zip(firings, windows))],
+            durations or {}, default_duration, signatures)
+        for index, offset in offsets.items():
+            fire_ts, workflow, prompts = firings[index]
+            firings[index] = (fire_ts + offset, workflow, prompts)
+    firings.sort(key=lambda firing: firing[0])
+    return firings
+
+
+def order_by_affinity(firings, signatures, window=0):
+    """
+    Group firings by model the way the scheduler's affinity lane does.
+
+    Firings of workflows with a model signature that are due within
+    `window` seconds of the first one are posted together when the window
+    closes, grouped by model and continuing with the last model used.
+    Firings without a signature bypass the lane and keep their time.
+    """
+    ordered = [firing for firing in firings if signatures.get(firing[1]) is None]
+    held = [firing for firing in firings if signatures.get(firing[1]) is not None]
+    loaded = ()
+    index = 0
+    while index < len(held):
+        flush_at = held[index][0] + window
+        end = index + 1
+        while end < len(held) and held[end][0] <= flush_at:
+            end += 1
+        group = sorted(held[index:end], key=lambda firing: affinity_key(signatures, loaded)(firing[1]))
+        ordered.extend((flush_at,) + tuple(firing[1:]) for firing in group)
+        loaded = (signatures[group[-1][1]],)
+        index = end
+    # Stable: a flushed group keeps its model order
+    ordered.sort(key=lambda firing: firing[0])
+    return ordered
+
+
+def _summary(delays):
+    ordered = sorted(delays)
+    if not ordered:
+        return {'count': 0, 'mean': 0, 'p50': 0, 'p95': 0, 'max': 0}
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered),
+        'p50': percentile(ordered, 50),
+        'p95': percentile(ordered, 95),
+        'max': ordered[-1],
+    }
+
+
+def simulate(schedules, durations, start=None, settings=None, signatures=None):
+    """
+    Replay a span of firings against ComfyUI's single FIFO queue on a virtual clock.
+
+    `durations` maps workflow -> estimated execution seconds. Returns
+    predicted start delays (overall and per workflow), peak queue depth,
+    utilization, idle gaps and the first MAX_TIMELINE simulated prompts.
+    With `signatures` (workflow -> model signature) model swaps between
+    consecutive prompts are counted, and with the `affinity` setting on,
+    firings due together are grouped by model like the scheduler does.
+    """
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+    start = time.time() if start is None else start
+    end = start + settings['horizon']
+    default_duration = float(settings['defaultDuration'])
+
+    grouping = signatures if settings['affinity'] else None
+    firings = firings_between(schedules, start, end, durations, default_duration, settings['spread'], grouping)
+    if grouping:
+        firings = order_by_affinity(firings, signatures, float(settings['affinityWindow']))
+    loaded = None
+    swaps = 0
+    free_at = start
+    busy = 0.0
+    waiting = deque()       # start times of prompts still queued
+    peak_depth, peak_at = 0, None
+    delays = []
+    per_workflow = defaultdict(list)
+    gaps = []
+    idle = 0.0
+    timeline = []
+
+    for fire_ts, workflow, prompts in firings:
+        duration = float(durations.get(workflow, default_duration))
+        if signatures and signatures.get(workflow) is not None:
+            if loaded is not None and signatures[workflow] != loaded:
+                swaps += 1
+            loaded = signatures[workflow]
+        for _ in range(prompts):
+            while waiting and waiting[0] <= fire_ts:
+                waiting.popleft()
+            if fire_ts > free_at:
+                idle += fire_ts - free_at
+                if fire_ts - free_at >= settings['minIdleGap']:
+                    gaps.append({'start': free_at, 'end': fire_ts, 'seconds': fire_ts - free_at})
+            begin = max(fire_ts, free_at)
+            free_at = begin + duration
+            busy += duration
+            delay = begin - fire_ts
+            delays.append(delay)
+            per_workflow[workflow].append(delay)
+            if begin > fire_ts:
+                waiting.append(begin)
+            # Queued prompts plus the one running
+            depth = len(waiting) + 1
+            if depth > peak_depth:
+                peak_depth, peak_at = depth, fire_ts
+            if len(timeline) < MAX_TIMELINE:
+                timeline.append({'workflow': workflow, 'fire': fire_ts, 'start': begin,
+                                 'end': free_at, 'delay': delay})
+
+    if end > free_at:
+        idle += end - free_at
+        if end - free_at >= settings['minIdleGap']:
+            gaps.append({'start': free_at, 'end': end, 'seconds': end - free_at})
+    gaps.sort(key=lambda gap: gap['seconds'], reverse=True)
+
+    return {
+        'start': start,
+        'end': end,
+        'firings': len(firings),
+        'prompts': len(delays),
+        'truncated': len(firings) >= MAX_FIRINGS,
+        'busy_seconds': busy,
+        'utilization': busy / settings['horizon'] if settings['horizon'] else 0,
+        'drains_at': free_at,
+        'delay': _summary(delays),
+        'workflows': {
+            workflow: dict(_summary(values), duration=float(durations.get(workflow, default_duration)))
+            for workflow, values in sorted(per_workflow.items())
+        },
+        'model_swaps': swaps if signatures else None,
+        'peak_queue_depth': peak_depth,
+        'peak_queue_at': peak_at,
+        'idle_seconds': idle,
+        'idle_gaps': gaps[:MAX_GAPS],
+        'timeline': timeline,
+        'settings': settings,
+    }
@@ -0,0 +1,145 @@
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from itertools import accumulate
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b'STLIDX2\0'
+# magic, source mtime_ns, source size, line count
+HEADER = struct.Struct('<8sQQQ')
+ENTRY = struct.Struct('<QQ')
+
+LINE_END = re.compile(rb'\r\n?|\n')
+# What str.strip() removes in the ASCII range (bytes.strip() misses \x1c-\x1f)
+ASCII_WHITESPACE = b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f'
+
+
+def _is_blank(raw):
+    if raw.isascii():
+        return not raw.strip(ASCII_WHITESPACE)
+    # Non-ASCII lines may consist of Unicode whitespace (e.g. full-width spaces)
+    return not raw.decode('utf-8', errors='replace').strip()
+
+
+def build_line_index(txt_path, index_path):
+    """Scan txt_path once and write the (start, end) byte offsets of its non-blank lines"""
+    stat = os.stat(txt_path)
+    # One bulk read and split at build time; lookups never read the whole file again
+    with open(txt_path, 'rb') as f:
+        data = f.read()
+    offsets = array('Q')
+    if data.count(b'\r') != data.count(b'\r\n'):
+        # Lone \r line endings: split like a text-mode read (universal newlines) does
+        start = 0
+        for match in LINE_END.finditer(data):
+            if not _is_blank(data[start:match.start()]):
+                offsets.append(start)
+                offsets.append(match.start())
+            start = match.end()
+        if not _is_blank(data[start:]):
+            offsets.append(start)
+            offsets.append(len(data))
+    else:
+        # \r of \r\n endings is stripped with the rest of the line's whitespace
+        lines = data.split(b'\n')
+        lengths = list(map(len, lines))
+        starts = accumulate((length + 1 for length in lengths), initial=0)
+        for start, length, raw in zip(starts, lengths, lines):
+            if not _is_blank(raw):
+                offsets.append(start)
+                offsets.append(start + length)
+        del lines
+    del data
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    directory = os.path.dirname(os.path.abspath(index_path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(index_path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(INDEX_MAGIC, stat.st_mtime_ns, stat.st_size, len(offsets) // 2))
+            offsets.tofile(f)
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    logger.info(f"🗂️ Indexed {len(offsets) // 2} prompts in {os.path.basename(txt_path)}")
+
+
+class PromptLineIndex:
+    """
+    Random access to the non-blank lines of a prompt file.
+
+    Line offsets live in a sidecar index file that is rebuilt only when
+    the prompt file's mtime or size changes. Both files are memory-mapped,
+    so reading k lines touches O(k) pages regardless of the file size.
+    """
+
+    def __init__(self, txt_path, index_path):
+        self.txt_path = txt_path
+        self.index_path = index_path
+        self._text = None
+        self._index = None
+        self._text_file = None
+        self._index_file = None
+        self.count = 0
+        self._open()
+
+    def _header_matches(self, stat):
+        try:
+            with open(self.index_path, 'rb') as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            return False
+        if len(header) != HEADER.size:
+            return False
+        magic, mtime_ns, size, count = HEADER.unpack(header)
+        if magic != INDEX_MAGIC or mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+            return False
+        return os.path.getsize(self.index_path) == HEADER.size + count * ENTRY.size
+
+    def _open(self):
+        stat = os.stat(self.txt_path)
+        if not self._header_matches(stat):
+            build_line_index(self.txt_path, self.index_path)
+
+        self._index_file = open(self.index_path, 'rb')
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = HEADER.unpack_from(self._index, 0)[3]
+        if self.count and stat.st_size:
+            self._text_file = open(self.txt_path, 'rb')
+            self._text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.count
+
+    def line(self, i):
+        """Stripped text of non-blank line i"""
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start, end = ENTRY.unpack_from(self._index, HEADER.size + i * ENTRY.size)
+        return self._text[start:end].decode('utf-8', errors='replace').strip()
+
+    def lines(self, indexes):
+        return [self.line(i) for i in indexes]
+
+    def close(self):
+        for handle in (self._text, self._text_file, self._index, self._index_file):
+            if handle is not None:
+                handle.close()
+        self._text = self._text_file = self._index = self._index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,129 @@
+import hashlib
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+MASK64 = 0xffffffffffffffff
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def splitmix64(x):
+    """SplitMix64 finalizer: a well-mixed 64-bit function of x"""
+    x = (x + GOLDEN_GAMMA) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def stable_key(*parts):
+    """64-bit key from strings/ints that, unlike hash(), is the same in every process"""
+    digest = hashlib.sha256('\0'.join(str(part) for part in parts).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+class FeistelPermutation:
+    """
+    Pseudo-random bijection on range(n), evaluated one index at a time.
+
+    A balanced Feistel network permutes the smallest even-bit domain
+    covering n; indexes that land outside range(n) are walked through
+    the network again (cycle walking). Memory is O(1) and each lookup
+    takes a few rounds on average, independent of n.
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, n, key):
+        if n <= 0:
+            raise ValueError("Permutation size must be positive")
+        self.n = n
+        bits = max(2, (n - 1).bit_length())
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        self.round_keys = [splitmix64(key + r) for r in range(self.ROUNDS)]
+
+    def _encrypt(self, value):
+        left, right = value >> self.half_bits, value & self.half_mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ (splitmix64(right ^ round_key) & self.half_mask)
+        return (left << self.half_bits) | right
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.n:
+            raise IndexError(index)
+        value = self._encrypt(index)
+        while value >= self.n:
+            value = self._encrypt(value)
+        return value
+
+
+def rotation_indexes(n, per_day, day, key):
+    """
+    Indexes for `day` when walking a shuffled order `per_day` items at a time.
+
+    Day d takes positions [d*per_day, (d+1)*per_day) of an endless sequence
+    of shuffled cycles; every index appears exactly once per cycle and each
+    cycle is shuffled differently.
+    """
+    indexes = []
+    permutation = None
+    cycle = None
+    for position in range(day * per_day, (day + 1) * per_day):
+        position_cycle, offset = divmod(position, n)
+        if position_cycle != cycle:
+            cycle = position_cycle
+            permutation = FeistelPermutation(n, stable_key(key, cycle))
+        indexes.append(permutation[offset])
+    return indexes
+
+
+class SeedStream:
+    """
+    Counter-based seed generator with its own state.
+
+    Seed i is SplitMix64 output i for the stream key, computed directly
+    from (key, i): any offset is reachable in O(1), ranges of one stream
+    never overlap, and blocks are generated vectorized when numpy is
+    available. Outputs are the top `bits` bits of each 64-bit value.
+    """
+
+    def __init__(self, key, bits=32):
+        if not 1 <= bits <= 64:
+            raise ValueError("bits must be between 1 and 64")
+        self.key = key & MASK64
+        self.shift = 64 - bits
+
+    def seed_at(self, index):
+        return splitmix64((self.key + index * GOLDEN_GAMMA) & MASK64) >> self.shift
+
+    def seeds(self, offset, count):
+        """
+        Seeds offset .. offset+count-1 as a list of ints.
+
+        Indexes wrap modulo 2**64, so a range may run past the last index
+        (the stream is periodic in the counter).
+        """
+        if offset < 0 or count < 0:
+            raise ValueError("Seed offset and count must not be negative")
+        offset &= MASK64
+        if not HAS_NUMPY or count < 64:
+            return [self.seed_at(i) for i in range(offset, offset + count)]
+        with np.errstate(over='ignore'):
+            x = np.arange(count, dtype=np.uint64)
+            x += np.uint64(offset)
+            x *= np.uint64(GOLDEN_GAMMA)
+            x += np.uint64((self.key + GOLDEN_GAMMA) & MASK64)
+            x ^= x >> np.uint64(30)
+            x *= np.uint64(0xBF58476D1CE4E5B9)
+            x ^= x >> np.uint64(27)
+            x *= np.uint64(0x94D049BB133111EB)
+            x ^= x >> np.uint64(31)
+            x >>= np.uint64(self.shift)
+        return x.tolist()
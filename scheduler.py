@@ -1,14 +1,31 @@
 import os
 import json
-import schedule
 import time
+import itertools
 import threading
-import requests
 import logging
 import subprocess
 import platform
 from datetime import datetime
 
+from .config_store import ConfigStore
+from .catchup import WatermarkStore, plan_catch_up, DEFAULT_SETTINGS as CATCHUP_DEFAULTS
+from .admission import AdmissionController, POLICY_COALESCE, POLICY_DROP, DEDUP_ALLOW, DEDUP_SKIP
+from .dispatcher import WorkflowDispatcher, DispatchError, with_front
+from .workflow_cache import WorkflowPayloadCache
+from .batch import BatchSpec, BatchTemplate
+from .workflow_index import WorkflowIndex
+from .history_store import RunHistoryStore
+from .tracker import CompletionTracker, FINAL_STATUSES, STATUS_QUEUED, STATUS_RUNNING
+from .timer_engine import TimerEngine
+from .triggers import build_trigger, describe_schedule, has_trigger, validate_schedules
+from .prompt_index import PromptLineIndex
+from .events import EventPublisher
+from .leader import LeaderLease
+from .metrics import REGISTRY, Gauge, DISPATCHES, DISPATCH_FAILURES, RUN_EXECUTION, RUN_QUEUE_WAIT
+from .planner import affinity_key, simulate, spread_offsets, spread_window, DEFAULT_SETTINGS as PLANNER_DEFAULTS
+from .rng import SeedStream, rotation_indexes, stable_key
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -22,6 +39,19 @@ class AnyType(str):
 
 any_typ = AnyType("*")
 
+# Run history statuses for firings that never reached ComfyUI
+RUN_FAILED = "failed"
+RUN_DEFERRED = "deferred"
+RUN_COALESCED = "coalesced"
+RUN_DROPPED = "dropped"
+RUN_SKIPPED = "skipped"
+
+# Schedule items with this priority go to the front of ComfyUI's queue
+PRIORITY_HIGH = "high"
+
+# Timer key that flushes the affinity lane
+AFFINITY_LANE_KEY = ('affinity', 0)
+
 class DailyPromptScheduler:
     def __init__(self):
         self.node_dir = os.path.dirname(os.path.abspath(__file__))
@@ -51,6 +81,22 @@ class DailyPromptScheduler:
         seed_filename = f"{base_name}_time_seed.json"
         return os.path.join(self.prompt_dir, seed_filename)
     
+    def get_index_file_path(self, txt_filename):
+        """Get the line-offset index path for specific txt file"""
+        base_name = os.path.splitext(txt_filename)[0]
+        return os.path.join(self.prompt_dir, f"{base_name}_lines.idx")
+    
+    def open_prompt_index(self, filename):
+        """Open the line index of a txt file, (re)building it if the file changed"""
+        txt_path = os.path.join(self.prompt_dir, filename)
+        if not os.path.exists(txt_path):
+            return None
+        try:
+            return PromptLineIndex(txt_path, self.get_index_file_path(filename))
+        except Exception as e:
+            logger.error(f"Error reading file: {e}")
+            return None
+    
     def load_time_seed(self, txt_filename):
         """Load time seed for specific txt file"""
         seed_file = self.get_seed_file_path(txt_filename)
@@ -89,6 +135,13 @@ class DailyPromptScheduler:
                     "label_on": "Set Time Seed",
                     "label_off": "Random Mode"
                 }),
+            },
+            "optional": {
+                "no_repeat": ("BOOLEAN", {
+                    "default": False,
+                    "label_on": "No-Repeat Shuffle",
+                    "label_off": "Off"
+                }),
             }
         }
     
@@ -98,7 +151,7 @@ class DailyPromptScheduler:
     FUNCTION = "get_daily_prompts"
     CATEGORY = "text/scheduled"
     
-    def IS_CHANGED(self, txt_file, daily_count, scheduled):
+    def IS_CHANGED(self, txt_file, daily_count, scheduled, no_repeat=False):
         """Ensure node is not cached"""
         current_time = datetime.now()
         current_date = current_time.strftime("%Y%m%d")
@@ -111,46 +164,44 @@ class DailyPromptScheduler:
         # Combine file modification time, current date and settings to generate identifier
         try:
             file_mtime = os.path.getmtime(txt_path)
-            unique_id = f"{file_mtime}_{current_date}_{daily_count}_{scheduled}_{txt_file}"
+            unique_id = f"{file_mtime}_{current_date}_{daily_count}_{scheduled}_{no_repeat}_{txt_file}"
             return hashlib.md5(unique_id.encode()).hexdigest()
         except:
             return str(current_time.timestamp())
     
     def read_txt_file(self, filename):
         """Read and parse txt file"""
-        txt_path = os.path.join(self.prompt_dir, filename)
-        
-        if not os.path.exists(txt_path):
-            return []
-        
-        try:
-            with open(txt_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Split by newlines, filter empty lines
-            lines = [line.strip() for line in content.split('\n') if line.strip()]
-            return lines
-        except Exception as e:
-            logger.error(f"Error reading file: {e}")
+        index = self.open_prompt_index(filename)
+        if index is None:
             return []
+        with index:
+            return index.lines(range(len(index)))
     
-    def get_daily_prompts(self, txt_file, daily_count, scheduled):
+    def get_daily_prompts(self, txt_file, daily_count, scheduled, no_repeat=False):
         # Check if file exists
         if txt_file == "Please place txt files in Prompt folder":
             return (["Error: Please place txt files in Prompt folder"], 0)
         
-        # Read prompt list
-        all_prompts = self.read_txt_file(txt_file)
+        # Open prompt list; only the selected lines are read
+        index = self.open_prompt_index(txt_file)
         
-        if not all_prompts:
+        if index is None or len(index) == 0:
+            if index is not None:
+                index.close()
             error_msg = f"Error: Unable to read file {txt_file} or file is empty"
             return ([error_msg], 0)
         
+        with index:
+            return self.select_daily_prompts(index, txt_file, daily_count, scheduled, no_repeat)
+    
+    def select_daily_prompts(self, index, txt_file, daily_count, scheduled, no_repeat=False):
+        total_prompts = len(index)
+        
         current_time = datetime.now()
         current_date = current_time.strftime("%Y%m%d")
         
         # Ensure not exceeding available prompts count
-        actual_count = min(daily_count, len(all_prompts))
+        actual_count = min(daily_count, total_prompts)
         
         # Handle scheduling logic
         if scheduled:
@@ -173,28 +224,34 @@ class DailyPromptScheduler:
             except:
                 days_diff = 0
             
-            # Calculate starting index for sequential selection
-            total_prompts = len(all_prompts)
-            start_index = (days_diff * actual_count) % total_prompts
+            if no_repeat:
+                selected_prompts = index.lines(rotation_indexes(total_prompts, actual_count, days_diff, stable_key(txt_file)))
+                status += f" (no-repeat shuffle, day {days_diff})"
+            else:
+                # Calculate starting index for sequential selection
+                start_index = (days_diff * actual_count) % total_prompts
+                
+                # Sequential selection with wrapping
+                selected_prompts = index.lines((start_index + i) % total_prompts for i in range(actual_count))
             
-            # Sequential selection with wrapping
-            selected_prompts = []
-            for i in range(actual_count):
-                index = (start_index + i) % total_prompts
-                selected_prompts.append(all_prompts[index])
+        elif no_repeat:
+            # Shuffled rotation: every prompt once per cycle, any day computable directly
+            day = current_time.date().toordinal()
+            status = f"No-repeat shuffle - Day {day} for {txt_file}"
+            selected_prompts = index.lines(rotation_indexes(total_prompts, actual_count, day, stable_key(txt_file)))
             
         else:
-            # Random mode: use different random seed each day
-            random_seed = int(current_date) + hash(txt_file)
-            random.seed(random_seed)
+            # Random mode: use different random seed each day (stable across restarts,
+            # and a private generator so the global random state is left alone)
+            random_seed = int(current_date) + stable_key(txt_file)
             status = f"Random mode - Date seed: {current_date} for {txt_file}"
             
             # Randomly select prompts without replacement
-            selected_prompts = random.sample(all_prompts, actual_count)
+            selected_prompts = index.lines(random.Random(random_seed).sample(range(total_prompts), actual_count))
         
         # Output debug information
         logger.info(f"DailyPromptScheduler: {status}")
-        logger.info(f"DailyPromptScheduler: Selected {actual_count} from {len(all_prompts)} prompts")
+        logger.info(f"DailyPromptScheduler: Selected {actual_count} from {total_prompts} prompts")
         logger.info(f"DailyPromptScheduler: Selected prompts: {selected_prompts}")
         
         return (selected_prompts, actual_count)
@@ -205,6 +262,9 @@ class TimeToSeedList:
     Generate random seed list based on current time
     """
     
+    # Distinguishes runs started within the same clock tick
+    _run_counter = itertools.count()
+    
     def __init__(self):
         self.last_execution_time = None
     
@@ -219,6 +279,18 @@ class TimeToSeedList:
                     "step": 1,
                     "display": "number"
                 }),
+            },
+            "optional": {
+                "stream_key": ("STRING", {
+                    "default": "",
+                    "multiline": False
+                }),
+                "offset": ("INT", {
+                    "default": 0,
+                    "min": 0,
+                    "max": 0xffffffffffffffff,
+                    "step": 1
+                }),
             }
         }
     
@@ -229,22 +301,26 @@ class TimeToSeedList:
     CATEGORY = "utils"
     
     @classmethod
-    def IS_CHANGED(cls, count):
+    def IS_CHANGED(cls, count, stream_key="", offset=0):
         """
         Method used by ComfyUI to determine if node needs re-execution
-        Always return different value to force re-execution
+        With a stream key the output is reproducible; otherwise force re-execution
         """
+        if stream_key:
+            return f"{stream_key}_{offset}_{count}"
         now = datetime.now()
         # Use timestamp to ensure re-calculation every execution
         timestamp = now.strftime("%Y%m%d%H%M%S%f")
         return timestamp
     
-    def generate_seed_list(self, count):
+    def generate_seed_list(self, count, stream_key="", offset=0):
         """
         Generate random seed list based on current time
         
         Args:
             count (int): Number of random seeds to generate
+            stream_key (str): Optional key for a reproducible seed stream
+            offset (int): Position in the stream of the first seed
             
         Returns:
             tuple: Tuple containing random seed list
@@ -253,30 +329,29 @@ class TimeToSeedList:
             # Get current time
             now = datetime.now()
             
-            # Convert to numeric format (HHMMSS)
-            time_seed = int(now.strftime("%H%M%S"))
-            
             # Record execution time
             self.last_execution_time = now.strftime("%H:%M:%S.%f")[:-3]  # Include milliseconds
             
-            # Use time as random seed
-            random.seed(time_seed)
+            if stream_key:
+                # Same key and offset always give the same seeds; disjoint offsets never overlap
+                stream = SeedStream(stable_key(stream_key))
+                source = f"Stream key={stream_key!r}, Offset={offset}"
+            else:
+                # Unique per run, even for runs within the same second
+                stream = SeedStream(stable_key(time.time_ns(), os.getpid(), next(self._run_counter)))
+                source = "Time-based stream"
             
-            # Generate random seed list
-            seed_list = []
-            for i in range(count):
-                # Generate random number between 0 and 4294967295 (32-bit unsigned int max)
-                seed = random.randint(0, 4294967295)
-                seed_list.append(seed)
+            # Seeds between 0 and 4294967295 (32-bit unsigned int max)
+            seed_list = stream.seeds(offset, count)
             
-            logger.info(f"TimeToSeedList: Execution time={self.last_execution_time}, Time seed={time_seed}, Generated {count} random seeds")
+            logger.info(f"TimeToSeedList: Execution time={self.last_execution_time}, {source}, Generated {count} random seeds")
             
             return (seed_list,)
             
         except Exception as e:
+            # A constant fallback would give every image the same seed; fail the node instead
             logger.error(f"TimeToSeedList generation failed: {e}")
-            # Return default value
-            return ([42] * count,)
+            raise
 
 class ShutdownNode:
     """
@@ -365,84 +440,196 @@ class ShutdownNode:
             logger.error(error_msg)
             return (error_msg,)
 
+# Above this many new jobs in one save, log a summary instead of one line per job
+VERBOSE_JOB_LOG_LIMIT = 20
+
+# Past-run durations used for spread offsets are re-read at most this often
+DURATION_CACHE_SECONDS = 600
+
+# Above this many remembered schedules, ones without active runs are forgotten
+DEDUP_PRUNE_LIMIT = 4096
+
+# Above this many schedules, schedules.json is written compactly (the
+# indented encoder is pure Python and dominates save time at scale)
+PRETTY_CONFIG_LIMIT = 1000
+
+
+def schedule_content_key(item):
+    """Hashable key identifying a schedule item by its content"""
+    try:
+        key = tuple(sorted(item.items()))
+        hash(key)
+        return key
+    except TypeError:
+        # Nested values (lists/dicts) are not hashable
+        return json.dumps(item, sort_keys=True, separators=(',', ':'))
+
+
+class ScheduleJob:
+    """Compact record of one registered schedule item"""
+    
+    __slots__ = ('key', 'item', 'trigger', 'offset', 'window', 'nominal')
+    
+    def __init__(self, key, item, window=0.0):
+        self.key = key
+        self.item = item
+        self.trigger = build_trigger(item)
+        self.offset = 0.0
+        # Spread window, and the unshifted time of the pending fire (for same-minute grouping)
+        self.window = window
+        self.nominal = None
+    
+    def next_fire(self, after=None):
+        if not self.offset:
+            return self.trigger.next_fire(after)
+        # Fire `offset` seconds after each nominal time, counting a nominal
+        # time that already passed if its shifted time has not
+        after = time.time() if after is None else after
+        return self.trigger.next_fire(after - self.offset) + self.offset
+
+
 class SchedulerManager:
-    def __init__(self):
+    def __init__(self, base_dir=None, comfyui_url=None):
         self.running = False
-        self.thread = None
-        self.base_dir = os.path.dirname(__file__)
+        self.timer = TimerEngine(self._on_timer)
+        self.jobs = {}
+        self.deferred = {}
+        self._defer_lock = threading.Lock()
+        self._config_lock = threading.RLock()
+        self._job_ids = itertools.count(1)
+        self._dedup_runs = {}
+        self._dedup_lock = threading.Lock()
+        self._counts_cache = None
+        self.base_dir = base_dir or os.path.dirname(__file__)
         self.workflow_dir = os.path.join(self.base_dir, "Workflow")
         self.config_file = os.path.join(self.base_dir, "schedules.json")
-        self.comfyui_url = "http://127.0.0.1:8188"
+        self.config_store = ConfigStore(self.config_file, on_change=self._on_config_reload)
+        self.watermark = WatermarkStore(os.path.join(self.base_dir, "scheduler_state.json"))
+        self.catchup_settings = dict(CATCHUP_DEFAULTS)
+        self.spread_window = 0.0
+        self._spread_applied = None
+        self._minute_jobs = {}
+        self._minute_lock = threading.Lock()
+        self._duration_cache = None
+        self.affinity_enabled = False
+        self.affinity_window = PLANNER_DEFAULTS['affinityWindow']
+        self._loaded_signature = None
+        self._lane = []
+        self._lane_lock = threading.Lock()
+        self._lane_armed = False
+        self.workflow_index = WorkflowIndex(self.workflow_dir)
+        self.history = RunHistoryStore(os.path.join(self.base_dir, "run_history.db"))
+        self.comfyui_url = comfyui_url or "http://127.0.0.1:8188"
+        self.dispatcher = WorkflowDispatcher(self.comfyui_url)
+        self.admission = AdmissionController(self.dispatcher)
+        self.payload_cache = WorkflowPayloadCache()
+        self.tracker = CompletionTracker(self.dispatcher)
+        self.tracker.add_listener(self._on_run_update)
         self.global_enabled = False
+        self.events = EventPublisher()
+        # Only the lease holder dispatches when several ComfyUI processes share this folder
+        self.lease = LeaderLease(os.path.join(self.base_dir, "scheduler_leader.json"),
+                                 on_change=self._on_leadership_change,
+                                 settings=self.load_config().get('leader'))
+        self.register_metrics()
         
         # 確保工作流資料夾存在
         os.makedirs(self.workflow_dir, exist_ok=True)
         
         # 自動啟動
+        self.lease.start()
         self.load_and_start()
         
+    def register_metrics(self):
+        """Expose live scheduler state as gauges, read at scrape time"""
+        for name, documentation, callback in (
+            ("scheduledtask_prompts_in_flight", "Prompts submitted and not finished yet", self.admission.in_flight),
+            ("scheduledtask_comfyui_queue_depth", "ComfyUI queue depth at the last admission check",
+             lambda: self.admission.status()['queue_depth']),
+            ("scheduledtask_dispatch_pending", "Dispatch jobs waiting for or using a worker",
+             lambda: self.dispatcher.pending),
+            ("scheduledtask_scheduled_jobs", "Registered schedule jobs", lambda: len(self.jobs)),
+            ("scheduledtask_running", "Whether the scheduler service is running", lambda: int(self.running)),
+            ("scheduledtask_leader", "Whether this process holds the dispatch lease",
+             lambda: int(self.lease.is_leader)),
+        ):
+            REGISTRY.register(Gauge(name, documentation, callback))
+    
     def load_and_start(self):
         """Load settings and auto-start"""
         config = self.load_config()
         schedules = config.get('schedules', [])
-        self.global_enabled = config.get('globalEnabled', False)
+        last_tick = self.watermark.value
+        self.apply_config(config)
+        self.config_store.start_watching()
         
-        if schedules and self.global_enabled:
-            self.setup_schedules(schedules)
-            self.start()
+        if self.running:
             active_count = len([s for s in schedules if s.get('enabled', False)])
             logger.info(f"Auto-loaded {active_count}/{len(schedules)} active schedules and started service")
+            if last_tick is not None and self.lease.is_leader:
+                self.catch_up(last_tick)
         else:
             logger.info("Scheduler service disabled or no active schedules")
+        self._advance_watermark(time.time())
     
-    def get_workflows(self):
-        """Get all json files in Workflow folder"""
-        workflows = []
-        try:
-            if os.path.exists(self.workflow_dir):
-                for filename in os.listdir(self.workflow_dir):
-                    if filename.endswith('.json'):
-                        name = filename.replace('.json', '')
-                        workflows.append({
-                            'name': name,
-                            'filename': filename
-                        })
-        except Exception as e:
-            logger.error(f"Failed to scan workflow folder: {e}")
-        
-        return workflows
+    def _advance_watermark(self, timestamp):
+        """Only the leader moves the shared watermark; standbys never fire"""
+        if self.lease.is_leader:
+            self.watermark.advance(timestamp)
     
-    def load_config(self):
-        """Load complete settings from file"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-        except Exception as e:
-            logger.error(f"Failed to load config file: {e}")
-        return {}
+    def _on_leadership_change(self, leader):
+        """Lease listener: a new leader replays what the previous one missed"""
+        if leader:
+            # The previous leader advanced the shared watermark file
+            self.watermark.reload()
+            if self.running and self.watermark.value is not None:
+                self.catch_up(self.watermark.value)
+            self._advance_watermark(time.time())
+        else:
+            with self._defer_lock:
+                self.timer.cancel_many(list(self.deferred))
+                self.deferred.clear()
+            self._clear_lane()
+            # Hand the latest fire time to the next leader
+            self.watermark.flush()
+        self.publish_state()
     
-    def load_schedules(self):
-        """Load schedule settings from file (for compatibility)"""
-        config = self.load_config()
-        return config.get('schedules', [])
+    def catch_up(self, since):
+        """Replay runs missed since the last handled tick, per each schedule's catch-up policy"""
+        now = time.time()
+        settings = self.catchup_settings
+        plan = plan_catch_up(list(self.jobs.values()), since, now, settings)
+        if not plan:
+            return 0
+        
+        # Space replays out so a long outage does not flood the queue
+        entries = []
+        with self._defer_lock:
+            for index, (schedule_item, missed_ts) in enumerate(plan):
+                key = ('catchup', next(self._job_ids))
+                self.deferred[key] = (schedule_item['workflow'], schedule_item, 0)
+                entries.append((key, now + settings['replayDelay'] + index * settings['replayInterval']))
+            self.timer.schedule_many(entries)
+        logger.info(f"⏪ Scheduler was down since {datetime.fromtimestamp(since)}, replaying {len(plan)} missed runs "
+                    f"every {settings['replayInterval']}s")
+        return len(plan)
     
-    def save_schedules(self, schedules, global_enabled=None):
-        """Save schedule settings"""
-        try:
-            # Update global_enabled if provided
-            if global_enabled is not None:
-                self.global_enabled = global_enabled
-            
-            # Prepare data for saving
-            data = {
-                'schedules': schedules,
-                'globalEnabled': self.global_enabled,
-                'updated_at': datetime.now().isoformat()
-            }
-            
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    def apply_config(self, config):
+        """Apply a complete config to the running scheduler"""
+        with self._config_lock:
+            schedules = config.get('schedules', [])
+            self.global_enabled = config.get('globalEnabled', False)
+            self.admission.configure(config)
+            self.dispatcher.pool.configure(config)
+            self.history.configure(config)
+            self.catchup_settings = dict(CATCHUP_DEFAULTS, **(config.get('catchup') or {}))
+            self.spread_window = spread_window(config.get('spread') or {}, key='window')
+            affinity = config.get('affinity') or {}
+            self.affinity_enabled = bool(affinity.get('enabled', False))
+            self.affinity_window = spread_window(affinity, PLANNER_DEFAULTS['affinityWindow'], key='window')
+            if self.affinity_enabled:
+                # Loader signatures are read here and on workflow saves, never at fire time
+                self.workflow_index.refresh()
             
             # Reconfigure schedules
             if self.global_enabled:
@@ -453,9 +640,55 @@ class SchedulerManager:
             else:
                 # Stop all schedules if globally disabled
                 self.stop()
+        self.publish_state()
+    
+    def _on_config_reload(self, config):
+        """Apply an externally edited config"""
+        with self._config_lock:
+            # A save may have landed since the reload; apply whatever is current
+            self.apply_config(self.config_store.get())
+        self._advance_watermark(time.time())
+    
+    def get_workflows(self):
+        """Get all json files in Workflow folder with their metadata"""
+        return self.workflow_index.list()
+    
+    def load_config(self):
+        """Get complete settings from the in-memory config store"""
+        return self.config_store.get()
+    
+    def load_schedules(self):
+        """Load schedule settings (for compatibility)"""
+        config = self.load_config()
+        return config.get('schedules', [])
+    
+    def save_schedules(self, schedules, global_enabled=None):
+        """
+        Save schedule settings.
+        
+        Raises ValueError, before anything is written, if an item's trigger
+        is invalid; returns False if saving or applying fails.
+        """
+        validate_schedules(schedules)
+        try:
+            # Update global_enabled if provided
+            if global_enabled is None:
+                global_enabled = self.global_enabled
+            
+            # Atomically persist, keeping other top-level settings. One lock
+            # spans write and apply, so concurrent saves apply in file order
+            with self._config_lock:
+                config = self.config_store.update({
+                    'schedules': schedules,
+                    'globalEnabled': global_enabled,
+                    'updated_at': datetime.now().isoformat()
+                }, indent=2 if len(schedules) <= PRETTY_CONFIG_LIMIT else None)
+                self.apply_config(config)
+            # Times that passed before this save were never missed, so a restart must not replay them
+            self._advance_watermark(time.time())
             
             active_count = len([s for s in schedules if s.get('enabled', False)]) if self.global_enabled else 0
-            logger.info(f"Settings saved - Global status: {'Enabled' if self.global_enabled else 'Disabled'}, Active schedules: {active_count}/{len(schedules)}")
+            logger.info(f"Settings saved - Global status: {'Enabled' if self.global_enabled else 'Disabled'}, Active schedules: {active_count}/{len(schedules)} (version {self.config_store.version})")
             return True
         except Exception as e:
             logger.error(f"Failed to save schedule settings: {e}")
@@ -472,106 +705,542 @@ class SchedulerManager:
             logger.error(f"Failed to load workflow file {filename}: {e}")
         return None
     
-    def execute_workflow(self, workflow_filename):
+    def load_workflow_payload(self, filename):
+        """Get the cached, pre-encoded /prompt body for a workflow file"""
+        try:
+            filepath = os.path.join(self.workflow_dir, filename)
+            if os.path.exists(filepath):
+                return self.payload_cache.get(filepath)
+        except Exception as e:
+            logger.error(f"Failed to load workflow file {filename}: {e}")
+        return None
+    
+    def execute_workflow(self, workflow_filename, schedule_item=None, attempt=0):
         """Execute workflow using HTTP POST"""
         # Check global switch
         if not self.global_enabled:
             logger.warning(f"Scheduler system disabled, skipping workflow execution: {workflow_filename}")
             return False
+        
+        # A resumed batch is the rest of a run already checked for duplicates
+        if schedule_item and not (schedule_item.get('batch') or {}).get('offset'):
+            mode = self.admission.dedup_for(schedule_item)
+            if mode != DEDUP_ALLOW and not self.resolve_duplicate(workflow_filename, schedule_item, mode):
+                return False
+        
+        if schedule_item and schedule_item.get('batch'):
+            return self.execute_batch(workflow_filename, schedule_item, attempt)
             
+        token = None
+        schedule_label = describe_schedule(schedule_item) if schedule_item else None
         try:
-            # Load workflow JSON
-            workflow_data = self.load_workflow_json(workflow_filename)
-            if not workflow_data:
+            # Load pre-encoded workflow payload
+            payload = self.load_workflow_payload(workflow_filename)
+            if not payload:
                 logger.error(f"Cannot load workflow: {workflow_filename}")
+                DISPATCH_FAILURES.inc(cause="load")
+                self.record_run(workflow_filename, RUN_FAILED, schedule_label, error="Cannot load workflow")
                 return False
             
-            # Prepare ComfyUI API request
-            payload = {
-                "prompt": workflow_data,
-                "client_id": "scheduled_task"
-            }
-            
-            # Send HTTP POST request
-            response = requests.post(
-                f"{self.comfyui_url}/prompt",
-                json=payload,
-                timeout=30,
-                headers={'Content-Type': 'application/json'}
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                prompt_id = result.get('prompt_id', 'unknown')
-                logger.info(f"✅ Successfully executed workflow: {workflow_filename} (ID: {prompt_id})")
-                return True
-            else:
-                logger.error(f"❌ Failed to execute workflow: {workflow_filename} (Status: {response.status_code})")
+            # Admission control against ComfyUI queue depth
+            token = self.admission.reserve(workflow_filename, schedule_item)
+            if token is None:
+                outcome = self.handle_overflow(workflow_filename, schedule_item, attempt)
+                self.record_run(workflow_filename, outcome, schedule_label, error="Queue cap reached")
                 return False
+            
+            if schedule_item and schedule_item.get('priority') == PRIORITY_HIGH:
+                payload = with_front(payload)
+            enqueued_at = time.time()
+            prompt_id = self.dispatcher.post_body(
+                payload, self.dispatcher.pool.pins_for(workflow_filename, schedule_item))
+            self.admission.commit(token, prompt_id)
+            token = None
+            self.record_queued(workflow_filename, schedule_label, prompt_id, enqueued_at)
+            self._remember_runs(workflow_filename, schedule_item, [prompt_id])
+            logger.info(f"✅ Successfully executed workflow: {workflow_filename} (ID: {prompt_id})")
+            return True
                 
-        except requests.exceptions.ConnectionError:
-            logger.error(f"❌ Cannot connect to ComfyUI service ({self.comfyui_url})")
+        except DispatchError as e:
+            if e.cause == "connection":
+                logger.error(f"❌ {e}")
+            else:
+                logger.error(f"❌ Failed to execute workflow: {workflow_filename} ({e})")
+            DISPATCH_FAILURES.inc(cause=e.cause)
+            self.record_run(workflow_filename, RUN_FAILED, schedule_label, error=str(e))
             return False
         except Exception as e:
             logger.error(f"❌ Error occurred while executing workflow: {e}")
+            DISPATCH_FAILURES.inc(cause="error")
+            self.record_run(workflow_filename, RUN_FAILED, schedule_label, error=str(e))
             return False
+        finally:
+            if token is not None:
+                self.admission.release(token)
     
-    def create_job(self, schedule_item):
-        """Create scheduled task"""
-        def job():
-            # Check global switch and individual enable status again
-            if not self.global_enabled:
-                logger.warning(f"Scheduler system disabled, skipping task: {schedule_item['workflow']}")
-                return
-                
-            if not schedule_item.get('enabled', False):
-                logger.info(f"Schedule disabled, skipping task: {schedule_item['workflow']}")
-                return
-                
-            logger.info(f"🕒 Executing schedule: {schedule_item['time']} - {schedule_item['workflow']}")
-            self.execute_workflow(schedule_item['workflow'])
+    def execute_batch(self, workflow_filename, schedule_item, attempt=0):
+        """Submit the variants of a batch schedule item through the pipelined post path"""
+        schedule_label = describe_schedule(schedule_item)
+        try:
+            spec = BatchSpec.from_item(schedule_item)
+            # Parsed and split once per file version and set of varied inputs
+            template = self.payload_cache.template(
+                os.path.join(self.workflow_dir, workflow_filename),
+                json.dumps(schedule_item['batch'].get('vary'), sort_keys=True),
+                lambda workflow_data: BatchTemplate(workflow_data, spec.resolve_fields(workflow_data)))
+        except FileNotFoundError:
+            logger.error(f"Cannot load workflow: {workflow_filename}")
+            DISPATCH_FAILURES.inc(cause="load")
+            self.record_run(workflow_filename, RUN_FAILED, schedule_label, error="Cannot load workflow")
+            return False
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            logger.error(f"❌ Invalid batch for workflow {workflow_filename}: {e}")
+            DISPATCH_FAILURES.inc(cause="load")
+            self.record_run(workflow_filename, RUN_FAILED, schedule_label, error=str(e))
+            return False
+        
+        reserved = set()
+        state = {'blocked_at': None, 'stop': False}
+        front = schedule_item.get('priority') == PRIORITY_HIGH
+        
+        def variant_bodies():
+            for index, _, body in template.variants(spec.count, spec.offset):
+                if state['stop']:
+                    return
+                token = self.admission.reserve(workflow_filename, schedule_item)
+                if token is None:
+                    state['blocked_at'] = index
+                    return
+                reserved.add(token)
+                # ComfyUI puts each "front" prompt ahead of the previous one, so
+                # only the first variant jumps the queue and the rest keep their order
+                yield (index, token, time.time()), with_front(body) if front and index == 0 else body
+        
+        submitted = failed = 0
+        prompt_ids = []
+        try:
+            pins = self.dispatcher.pool.pins_for(workflow_filename, schedule_item)
+            for (index, token, enqueued_at), prompt_id, error in self.dispatcher.post_many(
+                    variant_bodies(), spec.window, pins):
+                reserved.discard(token)
+                label = f"{schedule_label} #{index + 1}/{spec.count}"
+                if error is not None:
+                    self.admission.release(token)
+                    failed += 1
+                    DISPATCH_FAILURES.inc(cause=error.cause)
+                    self.record_run(workflow_filename, RUN_FAILED, label, error=str(error))
+                    if error.cause == "connection":
+                        # ComfyUI is down, the rest would fail the same way
+                        state['stop'] = True
+                    continue
+                self.admission.commit(token, prompt_id)
+                self.record_queued(workflow_filename, label, prompt_id, enqueued_at)
+                prompt_ids.append(prompt_id)
+                submitted += 1
+        except Exception as e:
+            logger.error(f"❌ Error occurred while executing batch: {e}")
+            DISPATCH_FAILURES.inc(cause="error")
+            self.record_run(workflow_filename, RUN_FAILED, schedule_label, error=str(e))
+            return False
+        finally:
+            for token in reserved:
+                self.admission.release(token)
+            self._remember_runs(workflow_filename, schedule_item, prompt_ids, resume=spec.offset > 0)
+        
+        blocked_at = state['blocked_at']
+        if blocked_at is not None:
+            # Resume the remaining variants later, per the overflow policy
+            remaining = dict(schedule_item, batch=dict(schedule_item['batch'], offset=blocked_at))
+            outcome = self.handle_overflow(workflow_filename, remaining, attempt)
+            self.record_run(workflow_filename, outcome, f"{schedule_label} #{blocked_at + 1}/{spec.count}",
+                            error=f"Queue cap reached, {spec.count - blocked_at} variants left")
         
-        schedule.every().day.at(schedule_item['time']).do(job)
-        logger.info(f"📅 Schedule set: Daily at {schedule_item['time']} execute {schedule_item['workflow']} (Enabled: {schedule_item.get('enabled', False)})")
+        logger.info(f"📦 Batch submitted {submitted}/{spec.count - spec.offset} variants of {workflow_filename}"
+                    + (f" ({failed} failed)" if failed else ""))
+        return failed == 0 and blocked_at is None
     
-    def setup_schedules(self, schedules):
-        """Setup all scheduled tasks"""
-        schedule.clear()  # Clear existing schedules
+    def record_run(self, workflow_filename, status, schedule_label=None, **fields):
+        """Write one firing to the run history store"""
+        DISPATCHES.inc(outcome=status)
+        try:
+            self.history.add(workflow_filename, status, schedule=schedule_label, **fields)
+        except Exception as e:
+            logger.error(f"Failed to record run history: {e}")
+        self.events.publish_run(workflow=workflow_filename, status=status, schedule=schedule_label,
+                                prompt_id=fields.get('prompt_id'), error=fields.get('error'),
+                                at=time.time())
+        self.publish_state()
+    
+    def record_queued(self, workflow_filename, schedule_label, prompt_id, enqueued_at):
+        """
+        Follow a prompt ComfyUI accepted, then record it.
         
-        if not self.global_enabled:
-            logger.info("Scheduler system disabled, no schedules will be set")
+        Tracking starts first: an idle ComfyUI reports execution_start right
+        away, and the tracker drops messages for prompts it does not know
+        yet. A run that progressed before its history row was written is
+        written again once the row exists.
+        """
+        record = self.tracker.track(prompt_id, workflow_filename, enqueued_at)
+        self.record_run(workflow_filename, STATUS_QUEUED, schedule_label,
+                        prompt_id=prompt_id, enqueued_at=enqueued_at)
+        if record.status != STATUS_QUEUED:
+            self._save_run(record)
+    
+    def dispatch_workflow(self, workflow_filename, schedule_item=None, attempt=0):
+        """Queue workflow execution on the dispatcher without blocking the timer"""
+        future = self.dispatcher.submit(self.execute_workflow, workflow_filename, schedule_item, attempt)
+        if future is None:
+            self.record_run(workflow_filename, RUN_DROPPED,
+                            describe_schedule(schedule_item) if schedule_item else None,
+                            error="Dispatch queue full")
+            return False
+        return True
+    
+    def _on_run_update(self, record):
+        """Tracker listener: persist run progress and release finished admission slots"""
+        if record.status in FINAL_STATUSES:
+            self.admission.complete(record.prompt_id)
+            if record.queue_wait is not None:
+                RUN_QUEUE_WAIT.observe(record.queue_wait)
+            if record.execution_time is not None:
+                RUN_EXECUTION.observe(record.execution_time, status=record.status)
+        self.events.publish_run(**record.to_dict(), at=time.time())
+        self.publish_state()
+        if record.status != STATUS_QUEUED:
+            self._save_run(record)
+    
+    def _save_run(self, record):
+        try:
+            self.history.update_run(record)
+        except Exception as e:
+            logger.error(f"Failed to update run history: {e}")
+    
+    def _dedup_key(self, workflow_filename, schedule_item):
+        """Runs sharing this key count as duplicates: the dedupKey, else the schedule item itself"""
+        if schedule_item.get('dedupKey'):
+            return ('key', schedule_item['dedupKey'])
+        if schedule_item.get('id') is not None:
+            return ('id', schedule_item['id'])
+        batch = schedule_item.get('batch')
+        if isinstance(batch, dict) and 'offset' in batch:
+            # A resumed batch is the same schedule as the run it continues
+            schedule_item = dict(schedule_item, batch={k: v for k, v in batch.items() if k != 'offset'})
+        return ('item', schedule_content_key(schedule_item))
+    
+    def _remember_runs(self, workflow_filename, schedule_item, prompt_ids, resume=False):
+        """
+        Note the prompts of a schedule's latest firing for later duplicate checks.
+        
+        Every schedule's runs are recorded, including "allow" ones, so a
+        "skip" or "replace" schedule sharing their key can see them.
+        """
+        if not schedule_item:
             return
+        key = self._dedup_key(workflow_filename, schedule_item)
+        with self._dedup_lock:
+            if resume:
+                self._dedup_runs.setdefault(key, []).extend(prompt_ids)
+            elif prompt_ids:
+                self._dedup_runs[key] = list(prompt_ids)
+            if len(self._dedup_runs) > DEDUP_PRUNE_LIMIT:
+                # Forget schedules whose runs all finished (e.g. edited or removed items)
+                active = self.tracker.active
+                self._dedup_runs = {k: ids for k, ids in self._dedup_runs.items()
+                                    if any(prompt_id in active for prompt_id in ids)}
+    
+    def resolve_duplicate(self, workflow_filename, schedule_item, mode):
+        """
+        Apply a schedule's dedup mode before submitting a new run.
         
-        active_schedules = 0
-        for item in schedules:
-            if item.get('time') and item.get('workflow'):
-                self.create_job(item)
-                if item.get('enabled', False):
-                    active_schedules += 1
+        The previous firing's prompts are looked up in the tracker and
+        confirmed against the owning backend's /queue. "skip" drops the new
+        run while any of them is queued or running; "replace" deletes the
+        queued ones and lets the new run through. Returns False if the new
+        run must not be submitted.
+        """
+        key = self._dedup_key(workflow_filename, schedule_item)
+        schedule_label = describe_schedule(schedule_item)
+        with self._dedup_lock:
+            prompt_ids = list(self._dedup_runs.get(key, ()))
+        records = [record for record in map(self.tracker.active.get, prompt_ids) if record is not None]
+        if not records:
+            return True
+        
+        pending, running = [], []
+        for backend in {record.backend for record in records}:
+            tracked = [record for record in records if record.backend == backend]
+            try:
+                queue = self.dispatcher.get_json("/queue", base_url=backend)
+                queued_ids = {entry[1] for entry in queue.get('queue_pending', []) if len(entry) > 1}
+                running_ids = {entry[1] for entry in queue.get('queue_running', []) if len(entry) > 1}
+            except (DispatchError, ValueError) as e:
+                # Trust the tracker when the queue cannot be read
+                logger.debug(f"Failed to read ComfyUI queue for dedup: {e}")
+                queued_ids = {record.prompt_id for record in tracked if record.status == STATUS_QUEUED}
+                running_ids = {record.prompt_id for record in tracked if record.status == STATUS_RUNNING}
+            pending.extend(record for record in tracked if record.prompt_id in queued_ids)
+            running.extend(record for record in tracked if record.prompt_id in running_ids)
+        if not pending and not running:
+            return True
         
-        logger.info(f"📋 Set up {len(schedules)} scheduled tasks, {active_schedules} are enabled")
+        if mode == DEDUP_SKIP:
+            state = 'queued' if pending else 'running'
+            logger.info(f"⏭️ Previous run of {schedule_label} is still {state}, skipping: {workflow_filename}")
+            self.record_run(workflow_filename, RUN_SKIPPED, schedule_label, error=f"Previous run still {state}")
+            return False
+        
+        for backend in {record.backend for record in pending}:
+            ids = [record.prompt_id for record in pending if record.backend == backend]
+            try:
+                self.dispatcher.post_json("/queue", {'delete': ids}, base_url=backend)
+            except DispatchError as e:
+                # Better a skipped run than the duplicate this schedule asked to avoid
+                logger.error(f"Failed to remove queued run of {schedule_label}, skipping new run: {e}")
+                self.record_run(workflow_filename, RUN_SKIPPED, schedule_label,
+                                error=f"Could not replace queued run: {e}")
+                return False
+            for prompt_id in ids:
+                self.tracker.cancel(prompt_id, "replaced by a newer run")
+        if pending:
+            logger.info(f"🔁 Replaced {len(pending)} queued run(s) of {schedule_label}: {workflow_filename}")
+        return True
+    
+    def handle_overflow(self, workflow_filename, schedule_item, attempt):
+        """Defer, coalesce or drop a run that would exceed an admission cap"""
+        policy = self.admission.policy_for(schedule_item)
+        settings = self.admission.settings
+        
+        if policy == POLICY_DROP or attempt >= settings['maxDeferrals']:
+            logger.warning(f"⏭️ Queue cap reached, dropping run: {workflow_filename} (Policy: {policy}, Attempts: {attempt})")
+            return RUN_DROPPED
+        
+        with self._defer_lock:
+            if policy == POLICY_COALESCE:
+                key = ('coalesce', workflow_filename)
+                if key in self.timer:
+                    logger.info(f"🔗 Queue cap reached, coalesced with pending run: {workflow_filename}")
+                    return RUN_COALESCED
+            else:
+                key = ('defer', next(self._job_ids))
+            self.deferred[key] = (workflow_filename, schedule_item, attempt + 1)
+            self.timer.schedule(key, time.time() + settings['deferSeconds'])
+        logger.info(f"⏳ Queue cap reached, deferring run by {settings['deferSeconds']}s: {workflow_filename} (Policy: {policy})")
+        return RUN_DEFERRED
     
-    def run_loop(self):
-        """Schedule execution loop"""
-        logger.info("🚀 Scheduler service started")
-        while self.running:
+    def create_job(self, schedule_item, key=None):
+        """Create scheduled task"""
+        if key is None:
+            key = ('manual', next(self._job_ids))
+        built = self._build_job(key, schedule_item)
+        if built is None:
+            return None
+        job, fire_ts = built
+        self.jobs[key] = job
+        self._index_job(job, time.time())
+        self.timer.schedule(key, fire_ts)
+        self.apply_spread({self._job_minute(job)})
+        logger.info(f"📅 Schedule set: {job.trigger.describe()} execute {schedule_item['workflow']} (Enabled: {schedule_item.get('enabled', False)})")
+        return key
+    
+    def _build_job(self, key, schedule_item):
+        """Build a job record and its first fire time, or None if the item is invalid"""
+        try:
+            job = ScheduleJob(key, schedule_item, spread_window(schedule_item, self.spread_window))
+            return job, job.next_fire()
+        except (KeyError, ValueError) as e:
+            logger.error(f"Invalid schedule trigger, skipping task {schedule_item['workflow']}: {e}")
+            return None
+    
+    def run_job(self, schedule_item):
+        """Run a single scheduled task"""
+        # Check global switch and individual enable status again
+        if not self.global_enabled:
+            logger.warning(f"Scheduler system disabled, skipping task: {schedule_item['workflow']}")
+            return
+            
+        if not schedule_item.get('enabled', False):
+            logger.info(f"Schedule disabled, skipping task: {schedule_item['workflow']}")
+            return
+            
+        logger.info(f"🕒 Executing schedule: {describe_schedule(schedule_item)} - {schedule_item['workflow']}")
+        if self.affinity_enabled:
+            self.queue_affinity(schedule_item['workflow'], schedule_item)
+        else:
+            self.dispatch_workflow(schedule_item['workflow'], schedule_item)
+    
+    def _on_timer(self, key, fire_ts):
+        """Timer callback: run the job and return its next fire time"""
+        if key == AFFINITY_LANE_KEY:
+            self._flush_lane()
+            return None
+        
+        deferred = self.deferred.pop(key, None)
+        if deferred is not None:
+            if self.global_enabled and self.lease.is_leader:
+                self.dispatch_workflow(*deferred)
+            return None
+        
+        job = self.jobs.get(key)
+        if job is None:
+            return None
+        
+        # Standbys keep their timers (for status and a fast takeover) but never fire
+        if self.lease.is_leader:
+            # Persisted by the watermark's writer thread, off this one
+            self.watermark.advance(fire_ts, defer=True)
             try:
-                if self.global_enabled:
-                    schedule.run_pending()
-                else:
-                    logger.debug("Scheduler system disabled, skipping execution check")
-                time.sleep(60)  # Check every minute
+                self.run_job(job.item)
             except Exception as e:
                 logger.error(f"Schedule execution error: {e}")
-                time.sleep(60)
-        logger.info("⏹️ Scheduler service stopped")
+        next_ts = job.next_fire(after=max(fire_ts, time.time()))
+        if self.jobs.get(key) is job:
+            self._index_job(job, nominal=next_ts - job.offset)
+        return next_ts
+    
+    def queue_affinity(self, workflow_filename, schedule_item=None, attempt=0):
+        """Hold a due run in the affinity lane, to be posted grouped by model"""
+        if self.workflow_index.signatures(refresh=False).get(workflow_filename) is None:
+            # No models to group by: post it right away
+            return self.dispatch_workflow(workflow_filename, schedule_item, attempt)
+        with self._lane_lock:
+            self._lane.append((workflow_filename, schedule_item, attempt))
+            if self._lane_armed:
+                return True
+            self._lane_armed = True
+        # The flush key lands behind every run due within the window
+        self.timer.schedule(AFFINITY_LANE_KEY, time.time() + self.affinity_window)
+        return True
+    
+    def _flush_lane(self):
+        signatures = self.workflow_index.signatures(refresh=False)
+        with self._lane_lock:
+            runs = self._lane
+            grouped = len(runs) > 1 and any(signatures.get(run[0]) is not None for run in runs)
+            if not grouped:
+                # Nothing to reorder: post concurrently like any other run
+                self._lane = []
+                self._lane_armed = False
+        if not grouped:
+            for run in runs:
+                if signatures.get(run[0]) is not None:
+                    self._loaded_signature = signatures[run[0]]
+                self.dispatch_workflow(*run)
+            return
+        if self.dispatcher.submit(self._drain_lane) is None:
+            for workflow_filename, schedule_item, _ in self._clear_lane():
+                self.record_run(workflow_filename, RUN_DROPPED,
+                                describe_schedule(schedule_item) if schedule_item else None,
+                                error="Dispatch queue full")
+    
+    def _clear_lane(self):
+        with self._lane_lock:
+            runs, self._lane = self._lane, []
+            self._lane_armed = False
+        return runs
+    
+    def _drain_lane(self):
+        """
+        Post the affinity lane's runs one after another, grouped by model.
+        
+        The whole lane is one dispatcher job, so the grouping holds all the
+        way to /prompt instead of being reshuffled by the worker pool. Runs
+        that join while it posts are grouped into the next round.
+        """
+        while True:
+            with self._lane_lock:
+                runs, self._lane = self._lane, []
+                if not runs:
+                    self._lane_armed = False
+                    return
+            signatures = self.workflow_index.signatures(refresh=False)
+            # Start with the models the last run left loaded; sorted() keeps fire order within a group
+            key = affinity_key(signatures, (self._loaded_signature,))
+            ordered = sorted(runs, key=lambda run: key(run[0]))
+            if ordered != runs:
+                logger.info(f"🧩 Grouped {len(runs)} due runs by model to avoid checkpoint swaps")
+            for workflow_filename, schedule_item, attempt in ordered:
+                if signatures.get(workflow_filename) is not None:
+                    self._loaded_signature = signatures[workflow_filename]
+                try:
+                    self.execute_workflow(workflow_filename, schedule_item, attempt)
+                except Exception as e:
+                    logger.error(f"Schedule execution error: {e}")
+    
+    def setup_schedules(self, schedules):
+        """
+        Setup all scheduled tasks.
+
+        Only the difference to the currently registered jobs is applied:
+        unchanged items keep their timers, so saving one edit costs
+        O(changed) timer operations.
+        """
+        if not self.global_enabled:
+            self.timer.clear()
+            self.jobs.clear()
+            self._clear_minute_index()
+            self.deferred.clear()
+            self._clear_lane()
+            logger.info("Scheduler system disabled, no schedules will be set")
+            return
+        
+        # Key each runnable item by its content, numbering identical duplicates
+        wanted = {}
+        occurrences = {}
+        for item in schedules:
+            if not (has_trigger(item) and item.get('workflow') and item.get('enabled', False)):
+                continue
+            content = schedule_content_key(item)
+            index = occurrences.get(content, 0)
+            occurrences[content] = index + 1
+            wanted[(content, index)] = item
+        
+        if self.spread_window != self._spread_applied:
+            # The default window changed: every job's window may have moved
+            for job in self.jobs.values():
+                job.window = spread_window(job.item, self.spread_window)
+            touched = None
+        else:
+            touched = set()
+        
+        now = time.time()
+        removed = [key for key in self.jobs if key not in wanted]
+        self.timer.cancel_many(removed)
+        for key in removed:
+            job = self.jobs.pop(key)
+            if touched is not None:
+                touched.add(self._job_minute(job))
+            self._unindex_job(job)
+        
+        entries = []
+        for key, item in wanted.items():
+            if key in self.jobs:
+                continue
+            built = self._build_job(key, item)
+            if built is None:
+                continue
+            self.jobs[key] = built[0]
+            self._index_job(built[0], now)
+            if touched is not None:
+                touched.add(self._job_minute(built[0]))
+            entries.append((key, built[1]))
+        self.timer.schedule_many(entries)
+        self.apply_spread(touched)
+        self._spread_applied = self.spread_window
+        
+        if len(entries) <= VERBOSE_JOB_LOG_LIMIT:
+            for key, _ in entries:
+                job = self.jobs[key]
+                logger.info(f"📅 Schedule set: {job.trigger.describe()} execute {job.item['workflow']}")
+        
+        logger.info(f"📋 Set up {len(schedules)} scheduled tasks, {len(self.jobs)} are enabled "
+                    f"(+{len(entries)} / -{len(removed)})")
     
     def start(self):
         """Start scheduler service"""
         if not self.running:
             self.running = True
-            self.thread = threading.Thread(target=self.run_loop, daemon=True)
-            self.thread.start()
+            self.timer.start()
+            self.publish_state()
             return True
         return False
     
@@ -579,22 +1248,212 @@ class SchedulerManager:
         """Stop scheduler service"""
         if self.running:
             self.running = False
-            schedule.clear()
+            self.timer.stop()
+            self.timer.clear()
+            self.jobs.clear()
+            self._clear_minute_index()
+            self.deferred.clear()
+            self._clear_lane()
             logger.info("Scheduler service stopped, all schedules cleared")
+            self.publish_state()
             return True
         return False
     
+    def shutdown(self):
+        """Stop the scheduler and release dispatcher resources"""
+        self.stop()
+        # Persist the last fire time before another process can take over
+        self.watermark.close()
+        self.lease.stop()
+        self.config_store.stop_watching()
+        self.tracker.stop()
+        self.dispatcher.shutdown()
+        self.history.close()
+    
+    def _schedule_counts(self):
+        """(total, enabled) schedule counts, cached per config version"""
+        version = self.config_store.version
+        if self._counts_cache is None or self._counts_cache[0] != version:
+            schedules = self.load_config().get('schedules', [])
+            enabled_count = sum(1 for s in schedules if s.get('enabled', False))
+            self._counts_cache = (version, len(schedules), enabled_count)
+        return self._counts_cache[1], self._counts_cache[2]
+    
+    def plan_capacity(self, schedules=None, durations=None, start=None, settings=None):
+        """
+        Simulate a day of firings against ComfyUI's queue.
+        
+        Durations come from, in order of precedence: the `durations`
+        argument, the config's planner.durations, the median of past runs,
+        and planner.defaultDuration.
+        """
+        config = self.load_config()
+        planner_config = config.get('planner') or {}
+        plan_settings = dict(PLANNER_DEFAULTS, spread=self.spread_window, affinity=self.affinity_enabled,
+                             affinityWindow=self.affinity_window)
+        plan_settings.update({k: v for k, v in planner_config.items() if k in PLANNER_DEFAULTS})
+        plan_settings.update(settings or {})
+        if schedules is None:
+            schedules = config.get('schedules', [])
+        
+        estimates = self.expected_durations(durations, plan_settings['historyDays'])
+        result = simulate(schedules, {workflow: seconds for workflow, (_, seconds) in estimates.items()},
+                          start=start, settings=plan_settings,
+                          signatures=self.workflow_index.signatures())
+        for workflow, stats in result['workflows'].items():
+            stats['source'] = estimates[workflow][0] if workflow in estimates else 'default'
+        return result
+    
+    def expected_durations(self, durations=None, history_days=None, max_age=None):
+        """
+        {workflow: (source, seconds)} from manual, config or past-run durations.
+        
+        Past-run medians are re-read from history unless the last reading
+        for the same `history_days` is younger than `max_age` seconds.
+        """
+        planner_config = self.load_config().get('planner') or {}
+        if history_days is None:
+            history_days = planner_config.get('historyDays', PLANNER_DEFAULTS['historyDays'])
+        now = time.time()
+        cached = self._duration_cache
+        if max_age is not None and cached is not None and cached[0] == history_days and now - cached[1] < max_age:
+            medians = cached[2]
+        else:
+            medians = {workflow: stats['median']
+                       for workflow, stats in self.history.duration_estimates(now - history_days * 86400).items()}
+            self._duration_cache = (history_days, now, medians)
+        estimates = {workflow: ('history', seconds) for workflow, seconds in medians.items()}
+        for source, overrides in (('config', planner_config.get('durations')), ('manual', durations)):
+            for workflow, seconds in (overrides or {}).items():
+                estimates[workflow] = (source, float(seconds))
+        return estimates
+    
+    def _job_minute(self, job):
+        return int(job.nominal // 60) if job.nominal is not None else None
+    
+    def _index_job(self, job, now=None, nominal=None):
+        """
+        File a job under the minute of its pending nominal fire time.
+        
+        A new job is filed under its next nominal time after `now`: a time
+        that already passed today belongs to tomorrow's bucket, which is
+        when the job will fire.
+        """
+        if nominal is None:
+            nominal = job.trigger.next_fire(now)
+        with self._minute_lock:
+            old = self._job_minute(job)
+            job.nominal = nominal
+            minute = self._job_minute(job)
+            if old == minute:
+                return
+            self._drop_from_minute(job.key, old)
+            self._minute_jobs.setdefault(minute, set()).add(job.key)
+    
+    def _unindex_job(self, job):
+        with self._minute_lock:
+            self._drop_from_minute(job.key, self._job_minute(job))
+            job.nominal = None
+    
+    def _drop_from_minute(self, key, minute):
+        keys = self._minute_jobs.get(minute)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._minute_jobs[minute]
+    
+    def _clear_minute_index(self):
+        with self._minute_lock:
+            self._minute_jobs.clear()
+        self._spread_applied = None
+    
+    def apply_spread(self, minutes=None):
+        """
+        Shift jobs due in the same minute apart inside their spread windows.
+
+        Only the minute buckets in `minutes` are recomputed (all of them
+        when None), so a save costs O(jobs in the minutes it touched).
+        Durations of past runs are cached for DURATION_CACHE_SECONDS; only
+        jobs whose offset moved are rescheduled.
+        """
+        with self._minute_lock:
+            if minutes is None:
+                minutes = list(self._minute_jobs)
+            groups = [[self.jobs[key] for key in self._minute_jobs.get(minute, ()) if key in self.jobs]
+                      for minute in minutes if minute is not None]
+        # Buckets with no spread window and no offset left to undo need no work
+        groups = [jobs for jobs in groups if any(job.window or job.offset for job in jobs)]
+        if not groups:
+            return 0
+        try:
+            durations = {workflow: seconds for workflow, (_, seconds)
+                         in self.expected_durations(max_age=DURATION_CACHE_SECONDS).items()}
+        except Exception as e:
+            logger.error(f"Failed to estimate workflow durations: {e}")
+            durations = {}
+        default_duration = (self.load_config().get('planner') or {}).get(
+            'defaultDuration', PLANNER_DEFAULTS['defaultDuration'])
+        jobs = [job for group in groups for job in group]
+        offsets = spread_offsets(
+            [(job.key, job.item['workflow'], job.window, job.nominal) for job in jobs],
+            durations, default_duration,
+            self.workflow_index.signatures(refresh=False) if self.affinity_enabled else None)
+        
+        now = time.time()
+        entries = []
+        for job in jobs:
+            offset = offsets.get(job.key, 0.0)
+            if offset != job.offset:
+                job.offset = offset
+                # Fire on the nominal time the offset was computed for, if still ahead
+                fire_ts = job.nominal + offset if job.nominal + offset > now else job.next_fire(now)
+                entries.append((job.key, fire_ts))
+                self._index_job(job, nominal=fire_ts - offset)
+        self.timer.schedule_many(entries)
+        if entries:
+            logger.info(f"↔️ Spread {sum(1 for offset in offsets.values() if offset)} schedules over their windows "
+                        f"({len(entries)} rescheduled)")
+        return len(entries)
+    
+    def live_state(self):
+        """Small, cheap status dict pushed to the UI as diffs"""
+        next_fire = self.timer.next_fire_time()
+        return {
+            'running': self.running,
+            'globalEnabled': self.global_enabled,
+            'config_version': self.config_store.version,
+            'schedule_count': len(self.jobs),
+            'next_run': next_fire,
+            'in_flight': self.admission.in_flight(),
+            'active_runs': len(self.tracker.active),
+            'deferred': len(self.deferred),
+            'leader': self.lease.is_leader,
+        }
+    
+    def publish_state(self):
+        """Push changed status fields to connected browsers"""
+        try:
+            self.events.publish_state(self.live_state())
+        except Exception as e:
+            logger.error(f"Failed to publish scheduler state: {e}")
+    
     def get_status(self):
         """Get service status"""
-        config = self.load_config()
-        schedules = config.get('schedules', [])
-        enabled_count = len([s for s in schedules if s.get('enabled', False)])
+        total_count, enabled_count = self._schedule_counts()
+        next_fire = self.timer.next_fire_time()
         
         return {
             'running': self.running,
             'globalEnabled': self.global_enabled,
-            'schedule_count': len(schedule.jobs),
-            'total_schedules': len(schedules),
+            'config_version': self.config_store.version,
+            'schedule_count': len(self.jobs),
+            'total_schedules': total_count,
             'enabled_schedules': enabled_count,
-            'next_run': str(schedule.next_run()) if schedule.jobs else None
+            'next_run': str(datetime.fromtimestamp(next_fire)) if next_fire is not None else None,
+            'drift': self.timer.drift.summary(),
+            'admission': self.admission.status(),
+            'backends': self.dispatcher.pool.status(),
+            'leader': self.lease.status(),
+            'runs': self.tracker.status(),
+            'payload_cache': self.payload_cache.status()
         }
\ No newline at end of file
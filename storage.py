@@ -0,0 +1,106 @@
+import asyncio
+import functools
+import gzip
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Workflows whose compact encoding is larger than this are saved compactly;
+# smaller ones stay indented so they remain easy to edit by hand
+PRETTY_WORKFLOW_LIMIT = 256 * 1024
+
+# Response bodies larger than this are gzipped for clients that accept it
+COMPRESS_MIN_BYTES = 64 * 1024
+
+# Request bodies are read in chunks of this size, up to MAX_BODY_BYTES
+CHUNK_SIZE = 64 * 1024
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+def encode_json(data):
+    """Compact UTF-8 JSON, as sent over HTTP"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compress(body):
+    return gzip.compress(body, compresslevel=5)
+
+
+def write_workflow_file(path, workflow_data):
+    """
+    Create a workflow file, failing if it already exists.
+
+    Returns the number of bytes written. The file is created exclusively,
+    so two concurrent saves of the same name cannot overwrite each other.
+    """
+    body = encode_json(workflow_data)
+    if len(body) <= PRETTY_WORKFLOW_LIMIT:
+        body = json.dumps(workflow_data, ensure_ascii=False, indent=2).encode('utf-8')
+    f = open(path, 'xb')
+    try:
+        with f:
+            f.write(body)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return len(body)
+
+
+class AsyncStorage:
+    """
+    Runs the web routes' file and encoding work off the event loop.
+
+    ComfyUI serves its websocket and API from one asyncio loop, so disk
+    writes, fsyncs, SQLite queries and encoding of large JSON bodies go
+    to a small dedicated thread pool instead.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ScheduledTaskStorage")
+
+    async def run(self, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) on the storage pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def read_json(self, request, limit=MAX_BODY_BYTES):
+        """
+        Read a request body chunk by chunk and decode it on the pool.
+
+        Raises HTTPRequestEntityTooLarge (413) past `limit` bytes and
+        HTTPBadRequest (400) for a body that is not JSON.
+        """
+        if request.content_length is not None and request.content_length > limit:
+            raise web.HTTPRequestEntityTooLarge(max_size=limit, actual_size=request.content_length)
+        body = bytearray()
+        async for chunk in request.content.iter_chunked(CHUNK_SIZE):
+            body.extend(chunk)
+            if len(body) > limit:
+                raise web.HTTPRequestEntityTooLarge(max_size=limit, actual_size=len(body))
+        if not body:
+            return {}
+        try:
+            return await self.run(json.loads, bytes(body))
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=json.dumps({'error': f"Invalid JSON body: {e}"}),
+                                     content_type='application/json')
+
+    async def encode(self, data, gzip_ok=False):
+        """(body, encoding) for a JSON response; large bodies are gzipped when allowed"""
+        def work():
+            body = encode_json(data)
+            if gzip_ok and len(body) >= COMPRESS_MIN_BYTES:
+                return compress(body), 'gzip'
+            return body, None
+        return await self.run(work)
+
+    async def save_workflow(self, path, workflow_data):
+        return await self.run(write_workflow_file, path, workflow_data)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,23 @@
+import logging
+import os
+import sys
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import the extension modules as a package without running its ComfyUI __init__
+package = types.ModuleType("scheduledtask")
+package.__path__ = [ROOT]
+sys.modules.setdefault("scheduledtask", package)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    from scheduledtask.scheduler import SchedulerManager
+    logging.disable(logging.INFO)
+    manager = SchedulerManager(base_dir=str(tmp_path))
+    yield manager
+    manager.shutdown()
+    logging.disable(logging.NOTSET)
@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+
+from scheduledtask.admission import AdmissionController
+from scheduledtask.dispatcher import DispatchError
+
+
+class FakeQueue:
+    """Stands in for the dispatcher's merged /queue read"""
+
+    def __init__(self, pending=0, error=None):
+        self.pending = pending
+        self.error = error
+        self.calls = 0
+        self.controller = None
+        self.locked_during_fetch = False
+
+    def get_queue(self):
+        self.calls += 1
+        if self.controller is not None and self.controller._lock.locked():
+            self.locked_during_fetch = True
+        if self.error is not None:
+            raise self.error
+        return {'queue_running': [], 'queue_pending': [[i, f"other-{i}"] for i in range(self.pending)]}
+
+
+def make_controller(queue, admission=None, refresh_interval=60.0):
+    controller = AdmissionController(queue, refresh_interval=refresh_interval)
+    controller.configure({'admission': admission or {}})
+    queue.controller = controller
+    return controller
+
+
+def test_no_cap_skips_queue_reads():
+    queue = FakeQueue()
+    controller = make_controller(queue)
+    assert all(controller.reserve('a.json') is not None for _ in range(5))
+    assert queue.calls == 0
+
+
+def test_queue_depth_cap():
+    queue = FakeQueue(pending=2)
+    controller = make_controller(queue, {'maxQueueDepth': 3})
+    token = controller.reserve('a.json')
+    assert token is not None
+    assert controller.reserve('a.json') is None
+    controller.commit(token, 'p1')
+    controller.complete('p1')
+    assert queue.calls == 1
+    assert not queue.locked_during_fetch
+
+
+def test_counters_read_under_the_lock():
+    controller = make_controller(FakeQueue(), {'maxInFlightPerWorkflow': 2})
+    controller.commit(controller.reserve('a.json'), 'p1')
+    controller.reserve('b.json')
+    assert controller.in_flight() == 2
+    assert controller.in_flight('a.json') == 1
+    assert controller.status() == {'queue_depth': 0, 'in_flight': 2}
+
+    # Status readers on other threads wait for the dispatcher's mutation
+    results = []
+    with controller._lock:
+        readers = [threading.Thread(target=lambda: results.append(controller.in_flight())),
+                   threading.Thread(target=lambda: results.append(controller.status()['in_flight']))]
+        for reader in readers:
+            reader.start()
+        time.sleep(0.05)
+        assert results == []
+        controller._in_flight['p2'] = ('a.json', time.time())
+    for reader in readers:
+        reader.join()
+    assert results == [3, 3]
+
+
+def test_failed_reads_are_rate_limited():
+    queue = FakeQueue(error=DispatchError("timed out", "timeout"))
+    controller = make_controller(queue, {'maxQueueDepth': 10})
+    for _ in range(5):
+        assert controller.reserve('a.json') is not None
+    assert queue.calls == 1
+
+
+def test_slow_read_does_not_block_other_workers():
+    release = threading.Event()
+
+    class SlowQueue(FakeQueue):
+        def get_queue(self):
+            release.wait(5)
+            return super().get_queue()
+
+    queue = SlowQueue()
+    controller = make_controller(queue, {'maxQueueDepth': 10})
+    worker = threading.Thread(target=controller.reserve, args=('a.json',))
+    worker.start()
+    time.sleep(0.1)
+    started = time.time()
+    # A second worker decides on the previous snapshot instead of waiting
+    assert controller.reserve('b.json') is not None
+    assert time.time() - started < 1.0
+    release.set()
+    worker.join()
+    assert queue.calls == 1
+
+
+def test_scheduled_run_uses_item_overflow_policy(manager, monkeypatch):
+    with open(os.path.join(manager.workflow_dir, 'a.json'), 'w') as f:
+        json.dump({'1': {'class_type': 'KSampler', 'inputs': {}}}, f)
+    monkeypatch.setattr(manager.dispatcher, 'submit', lambda fn, *args: fn(*args) or True)
+    manager.global_enabled = True
+    manager.affinity_enabled = False
+    manager.run_job({'workflow': 'a.json', 'enabled': True, 'time': '08:30',
+                     'maxInFlight': 0, 'overflowPolicy': 'drop'})
+    # The default policy would have deferred it
+    assert manager.history.query()['runs'][0]['status'] == 'dropped'
+    assert not manager.deferred
@@ -0,0 +1,44 @@
+from scheduledtask.planner import order_by_affinity
+
+
+def test_order_by_affinity_holds_only_signed_runs():
+    firings = [(0, 'a', 1), (0.5, 'x', 1), (1, 'b', 1), (1.5, 'a', 1), (10, 'b', 1)]
+    signatures = {'a': 'm1', 'b': 'm2'}
+    assert order_by_affinity(firings, signatures, window=2) == [
+        (0.5, 'x', 1), (2, 'a', 1), (2, 'a', 1), (2, 'b', 1), (12, 'b', 1)]
+
+
+def capture_dispatches(manager, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(manager, 'dispatch_workflow', lambda *run: dispatched.append(run[0]) or True)
+    monkeypatch.setattr(manager.dispatcher, 'submit', lambda fn, *args: dispatched.append(fn.__name__))
+    return dispatched
+
+
+def test_affinity_is_opt_in(manager, monkeypatch):
+    dispatched = capture_dispatches(manager, monkeypatch)
+    manager.global_enabled = True
+    assert not manager.affinity_enabled
+    manager.run_job({'workflow': 'a.json', 'enabled': True, 'time': '08:30'})
+    assert dispatched == ['a.json']
+
+
+def test_lane_is_skipped_when_there_is_nothing_to_reorder(manager, monkeypatch):
+    dispatched = capture_dispatches(manager, monkeypatch)
+    monkeypatch.setattr(manager.workflow_index, 'signatures', lambda refresh=True: {'a.json': 'm1', 'b.json': 'm2'})
+
+    # Without loader signatures the run never waits
+    manager.queue_affinity('x.json')
+    assert dispatched == ['x.json'] and not manager._lane
+
+    # A run alone in the window is posted on its own
+    manager.queue_affinity('a.json')
+    assert dispatched == ['x.json']
+    manager._flush_lane()
+    assert dispatched == ['x.json', 'a.json'] and not manager._lane_armed
+
+    # Several signed runs go through the serial lane
+    manager.queue_affinity('b.json')
+    manager.queue_affinity('a.json')
+    manager._flush_lane()
+    assert dispatched[-1] == '_drain_lane'
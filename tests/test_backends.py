@@ -0,0 +1,124 @@
+import pytest
+import requests
+
+from scheduledtask.backends import BackendPool
+from scheduledtask.dispatcher import DispatchError, WorkflowDispatcher
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+
+    def json(self):
+        return self._data
+
+
+class FakeSession:
+    """Answers by backend URL: 'ok', 'refuse', 'timeout' or an HTTP status code"""
+
+    def __init__(self, behaviour=None):
+        self.behaviour = behaviour or {}
+        self.posts = []
+        self.closed = False
+
+    def _answer(self, url, data):
+        base = url.rsplit('/', 1)[0]
+        outcome = self.behaviour.get(base, 'ok')
+        if outcome == 'refuse':
+            raise requests.exceptions.ConnectionError("refused")
+        if outcome == 'timeout':
+            raise requests.exceptions.Timeout("timed out")
+        if outcome != 'ok':
+            return FakeResponse(outcome)
+        return FakeResponse(200, data)
+
+    def post(self, url, data=None, json=None, timeout=None, headers=None):
+        self.posts.append(url)
+        return self._answer(url, {'prompt_id': f"p{len(self.posts)}"})
+
+    def get(self, url, timeout=None):
+        return self._answer(url, {'queue_running': [], 'queue_pending': []})
+
+    def close(self):
+        self.closed = True
+
+
+SERVERS = {'backends': {'servers': [
+    {'name': 'a', 'url': 'http://a'}, {'name': 'b', 'url': 'http://b'}, {'name': 'c', 'url': 'http://c'}]}}
+
+
+def make_pool(config=SERVERS):
+    pool = BackendPool('http://default')
+    pool.configure(config)
+    return pool, {backend.name: backend for backend in pool.backends}
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = WorkflowDispatcher('http://default')
+    dispatcher.session.close()
+    dispatcher.session = FakeSession()
+    dispatcher.pool.configure(SERVERS)
+    yield dispatcher
+    dispatcher.shutdown()
+
+
+def test_least_queue_routing():
+    pool, backends = make_pool()
+    for name, depth in (('a', 5), ('b', 0), ('c', 2)):
+        pool.observe_queue(backends[name], depth)
+    assert [backend.name for backend in pool.route()] == ['b', 'c', 'a']
+    # Routed prompts count until the next queue reading
+    assert [pool.route()[0].name for _ in range(3)] == ['b', 'b', 'c']
+    assert backends['b'].assigned == 3
+
+
+def test_smooth_weighted_round_robin():
+    pool, _ = make_pool({'backends': {'routing': 'weighted', 'servers': [
+        {'name': 'a', 'url': 'http://a', 'weight': 5}, {'name': 'b', 'url': 'http://b'},
+        {'name': 'c', 'url': 'http://c'}]}})
+    picks = [pool.route()[0].name for _ in range(14)]
+    # Interleaved rather than five a's in a row
+    assert picks[:7] == ['a', 'a', 'b', 'a', 'c', 'a', 'a']
+    assert picks[7:] == picks[:7]
+
+
+def test_pins():
+    pool, backends = make_pool({'backends': dict(SERVERS['backends'], pins={'x.json': ['b', 'c']})})
+    pool.observe_queue(backends['c'], 0)
+    pool.observe_queue(backends['b'], 3)
+    assert pool.pins_for('x.json') == ['b', 'c']
+    assert pool.pins_for('x.json', {'backends': 'a'}) == ['a']
+    assert pool.pins_for('y.json') is None
+    assert [backend.name for backend in pool.route(pool.pins_for('x.json'))] == ['c', 'b']
+
+
+def test_unknown_pin_is_an_error(dispatcher):
+    with pytest.raises(DispatchError, match="No ComfyUI backend named z"):
+        dispatcher.post_body(b'{}', pins=['z'])
+    assert dispatcher.session.posts == []
+
+
+def test_refused_connection_fails_over(dispatcher):
+    dispatcher.session.behaviour['http://a'] = 'refuse'
+    assert dispatcher.post_body(b'{}') == 'p2'
+    assert dispatcher.session.posts == ['http://a/prompt', 'http://b/prompt']
+    assert dispatcher.backend_for('p2') == 'http://b'
+    backends = {backend.name: backend for backend in dispatcher.pool.backends}
+    assert not backends['a'].healthy
+    # A down backend is only a last resort until it answers again
+    assert [backend.name for backend in dispatcher.pool.route()][-1] == 'a'
+    dispatcher.pool.observe_queue(backends['a'], 0)
+    assert backends['a'].healthy
+
+
+@pytest.mark.parametrize("outcome, cause", [('timeout', 'timeout'), (500, 'http_status')])
+def test_timeouts_and_http_errors_are_not_retried(dispatcher, outcome, cause):
+    # The prompt may have been accepted: posting it elsewhere could run it twice
+    dispatcher.session.behaviour['http://a'] = outcome
+    with pytest.raises(DispatchError) as error:
+        dispatcher.post_body(b'{}')
+    assert error.value.cause == cause
+    assert dispatcher.session.posts == ['http://a/prompt']
+    assert all(backend.healthy for backend in dispatcher.pool.backends)
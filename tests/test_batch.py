@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+from scheduledtask.batch import BatchSpec, BatchTemplate
+from scheduledtask.workflow_cache import WorkflowPayloadCache
+
+
+def workflow():
+    return {
+        '3': {'class_type': 'KSampler', 'inputs': {'seed': 5, 'steps': ['4', 0], 'model': ['4', 0]}},
+        '4': {'class_type': 'CheckpointLoaderSimple', 'inputs': {'ckpt_name': 'a.safetensors'}},
+    }
+
+
+def template(vary):
+    data = workflow()
+    spec = BatchSpec({'count': 3, 'vary': vary})
+    return BatchTemplate(data, spec.resolve_fields(data))
+
+
+def test_increment_from_workflow_value():
+    variants = template([{'node': '3', 'input': 'seed', 'mode': 'increment'}]).variants(3)
+    assert [values for _, values, _ in variants] == [[5], [6], [7]]
+
+
+def test_linked_input_is_rejected_when_built():
+    with pytest.raises(ValueError, match="linked to node 4"):
+        template([{'node': '3', 'input': 'steps', 'mode': 'increment'}])
+
+
+def test_template_cached_until_file_changes(tmp_path):
+    path = str(tmp_path / "a.json")
+    with open(path, 'w') as f:
+        json.dump(workflow(), f)
+    cache = WorkflowPayloadCache()
+    builds = []
+
+    def build(data):
+        builds.append(data)
+        return BatchTemplate(data, BatchSpec({'count': 2}).resolve_fields(data))
+
+    first = cache.template(path, 'default', build)
+    assert cache.template(path, 'default', build) is first
+    assert len(builds) == 1
+
+    os.utime(path, ns=(0, 0))
+    assert cache.template(path, 'default', build) is not first
+    assert len(builds) == 2
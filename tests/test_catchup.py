@@ -0,0 +1,89 @@
+import json
+import time
+from datetime import datetime
+
+from scheduledtask.catchup import DEFAULT_SETTINGS, WatermarkStore, plan_catch_up
+from scheduledtask.triggers import build_trigger
+
+
+def test_save_advances_catch_up_watermark(manager):
+    # A schedule added after its time passed today was never missed
+    manager.watermark.value = time.time() - 3600
+    assert manager.save_schedules([{'workflow': 'a.json', 'enabled': True, 'time': '00:00'}], True)
+    assert manager.watermark.value >= time.time() - 60
+
+
+def test_deferred_watermark_writes_are_coalesced(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = WatermarkStore(path, flush_interval=0.2)
+    try:
+        store.advance(100.0, defer=True)
+        store.advance(200.0, defer=True)
+        assert store.value == 200.0
+        assert WatermarkStore(path).value is None
+        time.sleep(0.5)
+        assert WatermarkStore(path).value == 200.0
+
+        store.advance(300.0, defer=True)
+    finally:
+        store.close()
+    assert WatermarkStore(path).value == 300.0
+
+
+def test_watermark_flush_keeps_later_value(tmp_path):
+    path = str(tmp_path / "state.json")
+    store = WatermarkStore(path, flush_interval=60)
+    store.advance(100.0, defer=True)
+    # Another process advanced the file meanwhile
+    WatermarkStore(path).advance(500.0)
+    store.close()
+    assert WatermarkStore(path).value == 500.0
+
+
+def test_timer_fire_does_not_write_watermark(manager, monkeypatch):
+    assert manager.save_schedules([{'workflow': 'a.json', 'enabled': True, 'time': '00:00'}], True)
+    writes = []
+    monkeypatch.setattr(manager.watermark, 'flush', lambda: writes.append(manager.watermark.value))
+    monkeypatch.setattr(manager, 'run_job', lambda item: None)
+    key = next(iter(manager.jobs))
+    fire_ts = time.time() + 1
+    manager._on_timer(key, fire_ts)
+    assert manager.watermark.value == fire_ts
+    assert writes == []
+
+
+class Job:
+    def __init__(self, item):
+        self.item = item
+        self.trigger = build_trigger(item)
+
+
+HOURLY = {'workflow': 'a.json', 'enabled': True, 'trigger': {'type': 'interval', 'every': 3600}}
+
+
+def test_all_policy_replays_latest_missed_runs():
+    until = datetime(2026, 6, 10, 12, 30).timestamp()
+    plan = plan_catch_up([Job(dict(HOURLY, catchup='all', catchupMax=3))], until - 10 * 3600, until,
+                         dict(DEFAULT_SETTINGS))
+    assert [datetime.fromtimestamp(fire_ts).hour for _, fire_ts in plan] == [10, 11, 12]
+
+
+def test_invalid_catchup_max_falls_back_to_setting():
+    until = datetime(2026, 6, 10, 12, 30).timestamp()
+    plan = plan_catch_up([Job(dict(HOURLY, catchup='all', catchupMax='lots'))], until - 10 * 3600, until,
+                         dict(DEFAULT_SETTINGS, maxReplays=2))
+    assert len(plan) == 2
+
+
+def test_invalid_catchup_max_does_not_block_startup(tmp_path):
+    from scheduledtask.scheduler import SchedulerManager
+    with open(tmp_path / "schedules.json", 'w') as f:
+        json.dump({'globalEnabled': True, 'schedules': [dict(HOURLY, catchup='all', catchupMax='lots')]}, f)
+    with open(tmp_path / "scheduler_state.json", 'w') as f:
+        json.dump({'last_tick': time.time() - 3 * 3600}, f)
+    manager = SchedulerManager(base_dir=str(tmp_path))
+    try:
+        assert manager.running
+        assert len(manager.deferred) == 3
+    finally:
+        manager.shutdown()
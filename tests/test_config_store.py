@@ -0,0 +1,139 @@
+import json
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from scheduledtask.config_store import ConfigStore, atomic_write_json
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX file modes")
+def test_atomic_write_keeps_file_mode(tmp_path):
+    path = str(tmp_path / "schedules.json")
+    with open(path, 'w') as f:
+        f.write('{}')
+    os.chmod(path, 0o664)
+    atomic_write_json(path, {'schedules': []})
+    assert mode(path) == 0o664
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX file modes")
+def test_atomic_write_new_file_follows_umask(tmp_path):
+    path = str(tmp_path / "scheduler_state.json")
+    atomic_write_json(path, {'last_tick': 1})
+    expected_path = str(tmp_path / "plain.json")
+    with open(expected_path, 'w'):
+        pass
+    assert mode(path) == mode(expected_path)
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX file modes")
+def test_atomic_write_never_changes_umask(tmp_path, monkeypatch):
+    def umask(mask):
+        raise AssertionError("os.umask must not be called")
+    monkeypatch.setattr(os, 'umask', umask)
+    atomic_write_json(str(tmp_path / "new.json"), {})
+
+
+def hand_edit(path, config):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def watched(tmp_path):
+    changes = []
+    store = ConfigStore(str(tmp_path / "schedules.json"), on_change=changes.append,
+                        poll_interval=0.05, debounce=0.3)
+    store.changes = changes
+    store.start_watching()
+    yield store
+    store.stop_watching()
+
+
+def test_version_counts_accepted_changes(tmp_path):
+    store = ConfigStore(str(tmp_path / "schedules.json"))
+    assert store.version == 0 and store.get() == {}
+    store.update({'schedules': []})
+    assert store.version == 1
+    # Broken edits keep the previous config and version
+    with open(store.path, 'w', encoding='utf-8') as f:
+        f.write('{"schedules": [')
+    assert store.load() == {'schedules': []}
+    assert store.version == 1
+    hand_edit(store.path, {'schedules': [{}]})
+    assert store.load() == {'schedules': [{}]}
+    assert store.version == 2
+
+
+def test_hand_edit_is_reloaded_and_own_writes_are_not(watched):
+    watched.update({'globalEnabled': False})
+    time.sleep(0.5)
+    assert watched.changes == []
+
+    hand_edit(watched.path, {'globalEnabled': True})
+    assert wait_for(lambda: watched.changes)
+    assert watched.changes == [{'globalEnabled': True}]
+    assert watched.get() == {'globalEnabled': True}
+    assert watched.version == 2
+
+
+def test_edits_in_progress_are_debounced(watched):
+    for i in range(8):
+        hand_edit(watched.path, {'step': 'x' * i})
+        time.sleep(0.1)
+    assert wait_for(lambda: watched.changes)
+    time.sleep(0.5)
+    # One reload, of the final content, once the file stopped changing
+    assert watched.changes == [{'step': 'x' * 7}]
+
+
+def test_manager_applies_hand_edited_schedules(manager):
+    assert manager.save_schedules([{'workflow': 'a.json', 'enabled': True, 'time': '08:00'}], True)
+    version = manager.config_store.version
+    config = dict(manager.load_config(), schedules=[{'workflow': 'b.json', 'enabled': True, 'time': '09:00'}])
+    hand_edit(manager.config_file, config)
+    assert wait_for(lambda: [job.item['workflow'] for job in manager.jobs.values()] == ['b.json'])
+    assert manager.config_store.version == version + 1
+
+
+def test_concurrent_saves_apply_the_saved_config(manager, monkeypatch):
+    first = [{'workflow': 'a.json', 'enabled': True, 'time': '08:00'}]
+    second = [{'workflow': 'b.json', 'enabled': True, 'time': '08:00'}]
+    update = manager.config_store.update
+    written = threading.Event()
+
+    def slow_update(changes, indent=2):
+        config = update(changes, indent)
+        if changes['schedules'] is first:
+            # The second save lands between this write and its apply
+            written.set()
+            time.sleep(0.2)
+        return config
+
+    monkeypatch.setattr(manager.config_store, 'update', slow_update)
+    thread = threading.Thread(target=manager.save_schedules, args=(first, True))
+    thread.start()
+    assert written.wait(2)
+    assert manager.save_schedules(second, True)
+    thread.join()
+
+    with open(manager.config_file, encoding='utf-8') as f:
+        on_disk = [item['workflow'] for item in json.load(f)['schedules']]
+    assert on_disk == ['b.json']
+    assert [job.item['workflow'] for job in manager.jobs.values()] == ['b.json']
@@ -0,0 +1,97 @@
+import json
+import os
+
+from scheduledtask.tracker import RunRecord
+
+BACKEND = 'http://127.0.0.1:8188'
+
+
+def schedule(**fields):
+    return dict({'workflow': 'a.json', 'enabled': True, 'time': '08:00'}, **fields)
+
+
+def remember(manager, item, prompt_id):
+    """Pretend a previous firing of item is still queued in ComfyUI"""
+    manager.tracker.active[prompt_id] = RunRecord(prompt_id, item['workflow'], 100.0, BACKEND)
+    manager._remember_runs(item['workflow'], item, [prompt_id])
+
+
+def fake_queue(manager, monkeypatch, pending=(), running=()):
+    deleted = []
+    monkeypatch.setattr(manager.dispatcher, 'get_json', lambda path, base_url=None: {
+        'queue_pending': [[0, prompt_id] for prompt_id in pending],
+        'queue_running': [[0, prompt_id] for prompt_id in running]})
+    monkeypatch.setattr(manager.dispatcher, 'post_json',
+                        lambda path, data, base_url=None: deleted.extend(data['delete']))
+    return deleted
+
+
+def statuses(manager):
+    return [run['status'] for run in manager.history.query()['runs']]
+
+
+def test_skip_while_previous_run_is_queued(manager, monkeypatch):
+    item = schedule(dedup='skip')
+    remember(manager, item, 'p1')
+    fake_queue(manager, monkeypatch, pending=['p1'])
+    assert not manager.resolve_duplicate('a.json', item, 'skip')
+    assert statuses(manager) == ['skipped']
+
+    # Once it left the queue the next run goes through
+    fake_queue(manager, monkeypatch)
+    assert manager.resolve_duplicate('a.json', item, 'skip')
+
+
+def test_replace_deletes_the_queued_run(manager, monkeypatch):
+    item = schedule(dedup='replace')
+    remember(manager, item, 'p1')
+    deleted = fake_queue(manager, monkeypatch, pending=['p1'])
+    assert manager.resolve_duplicate('a.json', item, 'replace')
+    assert deleted == ['p1']
+    assert 'p1' not in manager.tracker.active
+
+
+def test_schedules_sharing_a_workflow_are_separate(manager, monkeypatch):
+    morning, evening = schedule(dedup='skip'), schedule(dedup='skip', time='20:00')
+    remember(manager, morning, 'p1')
+    fake_queue(manager, monkeypatch, pending=['p1'])
+    assert manager.resolve_duplicate('a.json', evening, 'skip')
+    assert not manager.resolve_duplicate('a.json', morning, 'skip')
+
+
+def test_allow_runs_are_seen_by_a_shared_key(manager, monkeypatch):
+    remember(manager, schedule(dedupKey='report'), 'p1')
+    fake_queue(manager, monkeypatch, running=['p1'])
+    assert not manager.resolve_duplicate('a.json', schedule(time='09:00', dedupKey='report'), 'skip')
+
+
+def write_workflow(manager):
+    with open(os.path.join(manager.workflow_dir, 'a.json'), 'w') as f:
+        json.dump({'3': {'class_type': 'KSampler', 'inputs': {'seed': 1}}}, f)
+
+
+def test_high_priority_goes_to_the_front(manager, monkeypatch):
+    write_workflow(manager)
+    manager.global_enabled = True
+    bodies = []
+    monkeypatch.setattr(manager.dispatcher, 'post_body', lambda body, pins=None: bodies.append(body) or 'p1')
+    monkeypatch.setattr(manager, 'record_queued', lambda *args: None)
+    assert manager.execute_workflow('a.json', schedule(priority='high'))
+    assert json.loads(bodies[0])['front'] is True
+
+
+def test_high_priority_batch_keeps_its_order(manager, monkeypatch):
+    write_workflow(manager)
+    manager.global_enabled = True
+    bodies = []
+
+    def post_many(tagged, window=4, pins=None):
+        for index, (tag, body) in enumerate(tagged):
+            bodies.append(json.loads(body))
+            yield tag, f"p{index}", None
+
+    monkeypatch.setattr(manager.dispatcher, 'post_many', post_many)
+    monkeypatch.setattr(manager, 'record_queued', lambda *args: None)
+    assert manager.execute_workflow('a.json', schedule(priority='high', batch={'count': 3}))
+    # ComfyUI puts every "front" prompt ahead of the previous one
+    assert [body.get('front', False) for body in bodies] == [True, False, False]
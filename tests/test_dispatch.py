@@ -0,0 +1,75 @@
+import threading
+import time
+import types
+
+from scheduledtask import dispatcher as dispatcher_module
+from scheduledtask.dispatcher import WorkflowDispatcher
+from scheduledtask.metrics import DISPATCHES
+
+
+def test_full_dispatch_queue_records_dropped_run(manager, monkeypatch):
+    monkeypatch.setattr(manager.dispatcher, 'submit', lambda *args, **kwargs: None)
+    before = DISPATCHES._values.get(('dropped',), 0)
+    item = {'workflow': 'a.json', 'enabled': True, 'time': '08:30'}
+
+    assert not manager.dispatch_workflow('a.json', item)
+    runs = manager.history.query()['runs']
+    assert [(run['workflow'], run['status'], run['error']) for run in runs] == [
+        ('a.json', 'dropped', 'Dispatch queue full')]
+    assert DISPATCHES._values[('dropped',)] == before + 1
+
+
+class BlockingSession:
+    """Fake requests.Session whose posts wait for a release, counting concurrent requests"""
+
+    instances = []
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+        self.active = self.peak = 0
+        self.posts = 0
+        self.closed = False
+        self.adapters = {}
+        BlockingSession.instances.append(self)
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+    def post(self, url, data=None, timeout=None, headers=None):
+        with self.lock:
+            self.active += 1
+            self.posts += 1
+            self.peak = max(self.peak, self.active)
+        self.release.wait(5)
+        with self.lock:
+            self.active -= 1
+        return types.SimpleNamespace(status_code=200, json=lambda: {'prompt_id': 'p'})
+
+    def close(self):
+        self.closed = True
+
+
+def test_dispatcher_bounds_posts_and_shares_one_session(monkeypatch):
+    BlockingSession.instances.clear()
+    monkeypatch.setattr(dispatcher_module.requests, 'Session', BlockingSession)
+    dispatcher = WorkflowDispatcher('http://comfy', max_workers=2, max_pending=3)
+    try:
+        session, = BlockingSession.instances
+        assert session.adapters['http://']._pool_maxsize == 4
+
+        futures = [dispatcher.submit(dispatcher.post_body, b'{}') for _ in range(5)]
+        # Only max_pending jobs are accepted; the rest are dropped, not queued
+        assert [future is not None for future in futures] == [True, True, True, False, False]
+        assert dispatcher.pending == 3
+        time.sleep(0.1)
+        assert session.active == 2
+
+        session.release.set()
+        assert [future.result(timeout=5) for future in futures[:3]] == ['p', 'p', 'p']
+        assert session.peak == 2 and session.posts == 3
+        assert dispatcher.submit(dispatcher.post_body, b'{}').result(timeout=5) == 'p'
+    finally:
+        dispatcher.shutdown()
+    assert BlockingSession.instances == [session]
+    assert session.closed
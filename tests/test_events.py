@@ -0,0 +1,55 @@
+from scheduledtask.events import EVENT_RUN, EVENT_STATE, EventPublisher
+
+
+def test_publish_state_sends_only_changes():
+    events = []
+    publisher = EventPublisher()
+    publisher.add_listener(lambda event, data: events.append((event, data)))
+
+    assert publisher.publish_state({'running': True, 'in_flight': 0}) == {'running': True, 'in_flight': 0}
+    assert publisher.publish_state({'running': True, 'in_flight': 0}) == {}
+    assert publisher.publish_state({'running': True, 'in_flight': 2}) == {'in_flight': 2}
+    # A key that appears with a falsy value is still a change
+    assert publisher.publish_state({'running': True, 'in_flight': 2, 'next_run': None}) == {'next_run': None}
+    assert publisher.publish_state({'running': True, 'in_flight': 2, 'next_run': None}, full=True) == {
+        'running': True, 'in_flight': 2, 'next_run': None}
+    assert [data for event, data in events if event == EVENT_STATE] == [
+        {'running': True, 'in_flight': 0}, {'in_flight': 2}, {'next_run': None},
+        {'running': True, 'in_flight': 2, 'next_run': None}]
+    assert publisher.snapshot() == {'running': True, 'in_flight': 2, 'next_run': None}
+
+
+def test_publish_run_skips_empty_fields_and_failing_listeners():
+    events = []
+    publisher = EventPublisher()
+
+    def broken(event, data):
+        raise RuntimeError("listener bug")
+
+    publisher.add_listener(broken)
+    publisher.add_listener(lambda event, data: events.append((event, data)))
+    publisher.publish_run(workflow='a.json', status='queued', prompt_id=None)
+    assert events == [(EVENT_RUN, {'workflow': 'a.json', 'status': 'queued'})]
+
+
+def test_manager_publishes_runs_and_state(manager):
+    events = []
+    manager.events.add_listener(lambda event, data: events.append((event, data)))
+
+    manager.record_run('a.json', 'failed', 'Daily 08:00', error="Cannot load workflow")
+    runs = [data for event, data in events if event == EVENT_RUN]
+    assert len(runs) == 1
+    assert runs[0]['workflow'] == 'a.json' and runs[0]['status'] == 'failed'
+    assert runs[0]['error'] == "Cannot load workflow"
+
+    # Unchanged state is not sent again
+    assert not [data for event, data in events if event == EVENT_STATE]
+
+    events.clear()
+    assert manager.save_schedules([{'workflow': 'a.json', 'enabled': True, 'time': '08:00'}], True)
+    state = {}
+    for event, data in events:
+        if event == EVENT_STATE:
+            state.update(data)
+    assert state['schedule_count'] == 1 and state['running'] and state['globalEnabled']
+    assert manager.events.snapshot() == manager.live_state()
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from scheduledtask import history_store
+from scheduledtask.history_store import RunHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RunHistoryStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def pragma(store, name):
+    return store._conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def test_keyset_pages_stay_stable_across_inserts(store):
+    for i in range(10):
+        store.add('a.json' if i % 2 else 'b.json', 'queued' if i < 8 else 'failed')
+
+    page = store.query(limit=4)
+    assert [run['id'] for run in page['runs']] == [10, 9, 8, 7]
+    # New runs arriving between page reads do not shift later pages
+    for _ in range(3):
+        store.add('a.json', 'queued')
+    page = store.query(limit=4, before=page['next_before'])
+    assert [run['id'] for run in page['runs']] == [6, 5, 4, 3]
+    page = store.query(limit=4, before=page['next_before'])
+    assert [run['id'] for run in page['runs']] == [2, 1]
+    assert page['next_before'] is None
+
+    assert [run['id'] for run in store.query(workflow='a.json', status='failed')['runs']] == [10]
+
+
+def test_prune_applies_retention_and_row_limit(store, monkeypatch):
+    monkeypatch.setattr(history_store, 'PRUNE_EVERY', 10)
+    store.configure({'history': {'retentionDays': 1, 'maxRows': 6}})
+    store.add('old.json', 'succeeded', fired_at=time.time() - 3 * 86400)
+    for _ in range(9):
+        store.add('a.json', 'succeeded')
+    runs = store.query()['runs']
+    assert [run['id'] for run in runs] == [10, 9, 8, 7, 6, 5]
+
+
+def test_prune_returns_freed_pages(store, monkeypatch):
+    assert pragma(store, 'auto_vacuum') == 2  # incremental
+    monkeypatch.setattr(history_store, 'PRUNE_EVERY', 2000)
+    store.configure({'history': {'maxRows': 10}})
+    for _ in range(1999):
+        store.add('a.json', 'failed', error='x' * 1000)
+    pages = pragma(store, 'page_count')
+    store.add('a.json', 'failed', error='x' * 1000)
+    assert len(store.query(limit=100)['runs']) == 10
+    assert pragma(store, 'freelist_count') == 0
+    assert pragma(store, 'page_count') < pages / 10
@@ -0,0 +1,79 @@
+import os
+import time
+
+import pytest
+
+from scheduledtask.leader import LeaderLease
+from scheduledtask.scheduler import SchedulerManager
+
+pytestmark = pytest.mark.skipif(not LeaderLease('unused').supported, reason="no file locking")
+
+
+def lease_pair(tmp_path, **settings):
+    changes = {'a': [], 'b': []}
+    path = str(tmp_path / "leader.json")
+    first = LeaderLease(path, on_change=changes['a'].append, settings=settings)
+    second = LeaderLease(path, on_change=changes['b'].append, settings=settings)
+    return first, second, changes
+
+
+def test_only_one_leader(tmp_path):
+    first, second, changes = lease_pair(tmp_path)
+    try:
+        assert first.tick() and first.is_leader
+        assert not second.tick() and not second.is_leader
+        assert second.status()['current_owner'] == first.owner
+        assert changes == {'a': [True], 'b': []}
+    finally:
+        first.stop()
+        second.stop()
+
+
+def test_clean_stop_hands_over_immediately(tmp_path):
+    first, second, changes = lease_pair(tmp_path)
+    try:
+        first.tick()
+        first.stop()
+        assert first.read()['expires_at'] == 0
+        assert second.tick() and second.is_leader
+        assert changes == {'a': [True], 'b': [True]}
+    finally:
+        second.stop()
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    first, second, changes = lease_pair(tmp_path, ttl=0.2)
+    try:
+        first.tick()
+        # The leader hangs: its lock is gone but the lease is still live
+        os.close(first._fd)
+        first._fd = None
+        assert not second.tick()
+        time.sleep(0.25)
+        assert not first.is_leader
+        assert second.tick() and second.is_leader
+        assert second.read()['owner'] == second.owner
+
+        # The old leader wakes up and steps down instead of renewing
+        assert first.tick()
+        assert not first.is_leader
+        assert changes == {'a': [True, False], 'b': [True]}
+    finally:
+        first.stop()
+        second.stop()
+
+
+def test_standby_manager_takes_over(manager):
+    standby = SchedulerManager(base_dir=manager.base_dir)
+    try:
+        assert manager.lease.is_leader
+        assert not standby.lease.is_leader
+        assert standby.live_state()['leader'] is False
+
+        manager.shutdown()
+        # Don't wait for the standby's next heartbeat
+        standby.lease.tick()
+        assert standby.lease.is_leader
+        assert standby.live_state()['leader'] is True
+    finally:
+        standby.shutdown()
@@ -0,0 +1,44 @@
+from scheduledtask.metrics import REGISTRY, Counter, Gauge, Histogram, Registry
+
+
+def test_text_exposition():
+    registry = Registry()
+    runs = registry.register(Counter("test_runs_total", "Runs by outcome\nand cause \\ kind", ('outcome',)))
+    registry.register(Counter("test_idle_total", "Unlabelled counter"))
+    registry.register(Gauge("test_depth", "Queue depth", lambda: 3))
+    registry.register(Gauge("test_broken", "Failing callback", lambda: 1 / 0))
+    latency = registry.register(Histogram("test_latency_seconds", "Latency", ('path',), buckets=(5, 1)))
+    runs.inc(outcome='ok')
+    runs.inc(2, outcome='say "hi"\\\n')
+    for value in (0.5, 1, 7):
+        latency.observe(value, path='/prompt')
+
+    assert registry.render() == '\n'.join([
+        '# HELP test_runs_total Runs by outcome\\nand cause \\\\ kind',
+        '# TYPE test_runs_total counter',
+        'test_runs_total{outcome="ok"} 1',
+        'test_runs_total{outcome="say \\"hi\\"\\\\\\n"} 2',
+        '# HELP test_idle_total Unlabelled counter',
+        '# TYPE test_idle_total counter',
+        'test_idle_total 0',
+        '# HELP test_depth Queue depth',
+        '# TYPE test_depth gauge',
+        'test_depth 3',
+        '# HELP test_broken Failing callback',
+        '# TYPE test_broken gauge',
+        '# HELP test_latency_seconds Latency',
+        '# TYPE test_latency_seconds histogram',
+        # Bucket bounds are inclusive and cumulative
+        'test_latency_seconds_bucket{path="/prompt",le="1"} 2',
+        'test_latency_seconds_bucket{path="/prompt",le="5"} 2',
+        'test_latency_seconds_bucket{path="/prompt",le="+Inf"} 3',
+        'test_latency_seconds_sum{path="/prompt"} 8.5',
+        'test_latency_seconds_count{path="/prompt"} 3',
+    ]) + '\n'
+
+
+def test_scheduler_metrics_are_registered(manager):
+    text = REGISTRY.render()
+    assert '# TYPE scheduledtask_fire_drift_seconds histogram' in text
+    assert 'scheduledtask_fire_drift_seconds_bucket{le="+Inf"}' in text
+    assert '\nscheduledtask_leader 1\n' in text
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from scheduledtask.planner import simulate
+
+START = datetime(2026, 6, 10).timestamp()
+EIGHT = START + 8 * 3600
+
+
+def test_simulate_queues_firings_due_together():
+    schedules = [
+        {'workflow': 'a.json', 'enabled': True, 'time': '08:00'},
+        {'workflow': 'b.json', 'enabled': True, 'time': '08:00'},
+        {'workflow': 'c.json', 'enabled': True, 'time': '08:01'},
+        {'workflow': 'off.json', 'enabled': False, 'time': '08:00'},
+    ]
+    result = simulate(schedules, {'a.json': 120, 'b.json': 60}, start=START, settings={'defaultDuration': 30})
+
+    assert result['firings'] == result['prompts'] == 3
+    assert [(entry['workflow'], entry['start'] - EIGHT) for entry in result['timeline']] == [
+        ('a.json', 0), ('b.json', 120), ('c.json', 180)]
+    assert result['workflows']['b.json']['max'] == 120
+    assert result['workflows']['c.json']['max'] == 120
+    assert result['workflows']['c.json']['duration'] == 30
+    assert result['delay']['max'] == 120
+    assert result['peak_queue_depth'] == 3
+    assert result['peak_queue_at'] == EIGHT + 60
+    assert result['busy_seconds'] == 210
+    assert result['utilization'] == 210 / 86400
+    assert result['drains_at'] == EIGHT + 210
+    assert result['idle_seconds'] == 86400 - 210
+    assert [(gap['start'], gap['end']) for gap in result['idle_gaps']] == [
+        (EIGHT + 210, START + 86400), (START, EIGHT)]
+    assert result['model_swaps'] is None
+
+
+def test_simulate_batches_and_model_swaps():
+    schedules = [
+        {'workflow': 'a.json', 'enabled': True, 'time': '08:00', 'batch': {'count': 3}},
+        {'workflow': 'b.json', 'enabled': True, 'time': '09:00'},
+        {'workflow': 'a.json', 'enabled': True, 'time': '10:00'},
+    ]
+    signatures = {'a.json': 'sdxl', 'b.json': 'flux'}
+    result = simulate(schedules, {'a.json': 60, 'b.json': 60}, start=START, signatures=signatures)
+
+    assert result['firings'] == 3
+    assert result['prompts'] == 5
+    assert [entry['delay'] for entry in result['timeline'][:3]] == [0, 60, 120]
+    assert result['peak_queue_depth'] == 3
+    assert result['model_swaps'] == 2
+
+
+def test_plan_capacity_duration_sources(manager):
+    assert manager.save_schedules([
+        {'workflow': 'a.json', 'enabled': True, 'time': '08:00'},
+        {'workflow': 'b.json', 'enabled': True, 'time': '08:00'},
+    ], False)
+    result = manager.plan_capacity(durations={'a.json': 90}, start=START)
+    assert result['workflows']['a.json']['source'] == 'manual'
+    assert result['workflows']['b.json']['source'] == 'default'
+    assert result['workflows']['b.json']['max'] == 90
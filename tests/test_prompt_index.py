@@ -0,0 +1,61 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from scheduledtask.prompt_index import PromptLineIndex
+from scheduledtask.scheduler import DailyPromptScheduler
+
+CONTENT = ("a cat\r\n\r\n  a dog  \n\t\n　\nfull　width　\rold mac\r\x1c\n"
+           + "".join(f"prompt {i}\n" for i in range(40)) + "last line")
+
+
+def read_txt_file(path):
+    """The scheduler's original reader: whole file in text mode"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return [line.strip() for line in content.split('\n') if line.strip()]
+
+
+@pytest.fixture
+def prompts(tmp_path):
+    scheduler = DailyPromptScheduler()
+    scheduler.prompt_dir = str(tmp_path)
+    with open(tmp_path / "list.txt", 'w', encoding='utf-8', newline='') as f:
+        f.write(CONTENT)
+    return scheduler, read_txt_file(str(tmp_path / "list.txt"))
+
+
+def test_index_lines_match_text_reader(prompts):
+    scheduler, expected = prompts
+    assert scheduler.read_txt_file('list.txt') == expected
+    # A second open reuses the index file
+    assert scheduler.read_txt_file('list.txt') == expected
+
+
+def test_index_is_rebuilt_when_the_file_changes(prompts, tmp_path):
+    scheduler, expected = prompts
+    scheduler.read_txt_file('list.txt')
+    with open(tmp_path / "list.txt", 'a', encoding='utf-8') as f:
+        f.write("\nappended")
+    assert scheduler.read_txt_file('list.txt') == expected + ['appended']
+
+
+def test_scheduled_selection_matches_list_selection(prompts):
+    scheduler, all_prompts = prompts
+    days_diff, count = 3, 7
+    seed_date = (datetime.now() - timedelta(days=days_diff)).strftime("%Y%m%d")
+    scheduler.save_time_seed('list.txt', seed_date)
+
+    selected, actual = scheduler.get_daily_prompts('list.txt', count, True)
+    start = (days_diff * count) % len(all_prompts)
+    assert actual == count
+    assert selected == [all_prompts[(start + i) % len(all_prompts)] for i in range(count)]
+
+
+def test_random_sample_matches_list_sample(prompts, tmp_path):
+    scheduler, all_prompts = prompts
+    with PromptLineIndex(str(tmp_path / "list.txt"), scheduler.get_index_file_path('list.txt')) as index:
+        sampled = index.lines(random.Random(42).sample(range(len(index)), 5))
+    assert sampled == random.Random(42).sample(all_prompts, 5)
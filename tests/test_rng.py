@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from scheduledtask import rng
+from scheduledtask.rng import MASK64, FeistelPermutation, SeedStream, rotation_indexes, stable_key
+from scheduledtask.scheduler import DailyPromptScheduler, TimeToSeedList
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 16, 17, 100, 1000, 4097])
+def test_permutation_covers_range(n):
+    permutation = FeistelPermutation(n, stable_key('list.txt'))
+    assert sorted(permutation[i] for i in range(n)) == list(range(n))
+    with pytest.raises(IndexError):
+        permutation[n]
+
+
+def test_permutation_depends_on_key():
+    first, second = FeistelPermutation(100, 1), FeistelPermutation(100, 2)
+    assert [first[i] for i in range(100)] != [second[i] for i in range(100)]
+    assert [first[i] for i in range(100)] == [FeistelPermutation(100, 1)[i] for i in range(100)]
+
+
+def test_rotation_uses_every_index_once_per_cycle():
+    n, per_day = 10, 3
+    walk = [index for day in range(10) for index in rotation_indexes(n, per_day, day, 7)]
+    cycles = [walk[start:start + n] for start in range(0, len(walk), n)]
+    assert all(sorted(cycle) == list(range(n)) for cycle in cycles)
+    # Each cycle is shuffled differently
+    assert cycles[0] != cycles[1]
+
+
+def test_no_repeat_prompts_until_the_list_is_used_up(tmp_path):
+    scheduler = DailyPromptScheduler()
+    scheduler.prompt_dir = str(tmp_path)
+    with open(tmp_path / "list.txt", 'w', encoding='utf-8') as f:
+        f.write("\n".join(f"prompt {i}" for i in range(20)))
+
+    seen = []
+    for days_ago in range(4):
+        seed_date = (datetime.now() - timedelta(days=days_ago)).strftime("%Y%m%d")
+        scheduler.save_time_seed('list.txt', seed_date)
+        selected, count = scheduler.get_daily_prompts('list.txt', 5, True, no_repeat=True)
+        assert count == 5
+        seen.extend(selected)
+    assert sorted(seen) == sorted(f"prompt {i}" for i in range(20))
+
+
+def test_seed_stream_matches_splitmix64_reference():
+    # Reference SplitMix64 outputs for seed 0
+    assert SeedStream(0, bits=64).seeds(0, 3) == [0xE220A8397B1DCDAF, 0x6E789E6AA1B965F4, 0x06C45D188009454F]
+
+
+def test_seed_stream_is_reproducible_at_any_offset():
+    stream = SeedStream(stable_key('portrait'))
+    block = stream.seeds(0, 200)
+    assert SeedStream(stable_key('portrait')).seeds(0, 200) == block
+    assert stream.seeds(37, 100) == block[37:137]
+    assert [stream.seed_at(i) for i in range(5)] == block[:5]
+    assert all(0 <= seed < 2 ** 32 for seed in block)
+    assert SeedStream(stable_key('landscape')).seeds(0, 200) != block
+
+
+def test_seed_stream_wraps_at_the_last_index():
+    stream = SeedStream(stable_key('portrait'))
+    assert stream.seeds(MASK64 - 1, 4) == stream.seeds(MASK64 - 1, 2) + stream.seeds(0, 2)
+    with pytest.raises(ValueError):
+        stream.seeds(-1, 2)
+
+
+@pytest.mark.skipif(not rng.HAS_NUMPY, reason="numpy not installed")
+def test_seed_stream_numpy_matches_pure_python(monkeypatch):
+    stream = SeedStream(stable_key('portrait'), bits=48)
+    vectorized = stream.seeds(1000, 500)
+    monkeypatch.setattr(rng, 'HAS_NUMPY', False)
+    assert stream.seeds(1000, 500) == vectorized
+
+
+def test_seed_list_with_stream_key():
+    node = TimeToSeedList()
+    (seeds,) = node.generate_seed_list(10, stream_key='portrait', offset=5)
+    assert node.generate_seed_list(10, stream_key='portrait', offset=5) == (seeds,)
+    assert seeds == SeedStream(stable_key('portrait')).seeds(5, 10)
+    # The largest offset the node accepts still gives distinct seeds
+    (seeds,) = node.generate_seed_list(100, stream_key='portrait', offset=MASK64)
+    assert len(set(seeds)) == 100
+    # Without a key every run gets fresh seeds
+    assert node.generate_seed_list(10) != node.generate_seed_list(10)
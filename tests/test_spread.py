@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from scheduledtask import planner, scheduler
+from scheduledtask.triggers import DailyTrigger
+
+
+def test_save_only_respreads_touched_minutes(manager, monkeypatch):
+    calls = []
+    spread_offsets = scheduler.spread_offsets
+    monkeypatch.setattr(scheduler, 'spread_offsets', lambda entries, *args: (
+        calls.append(sorted(entry[1] for entry in entries)), spread_offsets(entries, *args))[1])
+    reads = []
+    duration_estimates = manager.history.duration_estimates
+    monkeypatch.setattr(manager.history, 'duration_estimates', lambda since=None: (
+        reads.append(since), duration_estimates(since))[1])
+
+    schedules = [
+        {'workflow': 'a.json', 'enabled': True, 'time': '08:00', 'spread': 60},
+        {'workflow': 'b.json', 'enabled': True, 'time': '08:00', 'spread': 60},
+        {'workflow': 'c.json', 'enabled': True, 'time': '09:00', 'spread': 60},
+    ]
+    assert manager.save_schedules(schedules, True)
+    assert calls == [['a.json', 'b.json', 'c.json']]
+
+    calls.clear()
+    schedules.append({'workflow': 'd.json', 'enabled': True, 'time': '09:00', 'spread': 60})
+    assert manager.save_schedules(schedules, True)
+    assert calls == [['c.json', 'd.json']]
+    assert len(reads) == 1
+
+    offsets = {job.item['workflow']: job.offset for job in manager.jobs.values()}
+    assert offsets['a.json'] == 0 and offsets['b.json'] > 0
+    assert offsets['c.json'] == 0 and offsets['d.json'] > 0
+
+
+T = 1781078400.0  # a minute boundary
+
+
+def test_spread_offsets_order_fixed_then_shortest_first():
+    durations = {'fixed.json': 100, 'slow.json': 30, 'fast.json': 10}
+    entries = [('slow', 'slow.json', 600, T), ('fixed', 'fixed.json', 0, T), ('fast', 'fast.json', 600, T)]
+    offsets = planner.spread_offsets(entries, durations, 60)
+    assert offsets == {'fast': 100, 'slow': 110}
+    assert planner.spread_offsets(list(reversed(entries)), durations, 60) == offsets
+
+
+def test_spread_offsets_compress_into_window():
+    durations = {'fixed.json': 100, 'slow.json': 30, 'fast.json': 10}
+    entries = [('fixed', 'fixed.json', 0, T), ('fast', 'fast.json', 55, T), ('slow', 'slow.json', 20, T)]
+    offsets = planner.spread_offsets(entries, durations, 60)
+    assert offsets['fast'] == pytest.approx(100 * 55 / 110)
+    # Capped at the entry's own window
+    assert offsets['slow'] == 20
+
+
+def test_spread_offsets_group_by_minute():
+    entries = [('a', 'a.json', 300, T), ('b', 'b.json', 300, T + 30),
+               ('c', 'c.json', 300, T + 60), ('d', 'd.json', 0, T + 180)]
+    offsets = planner.spread_offsets(entries, {}, 60)
+    # a and b share a minute and start relative to the earliest nominal time
+    assert offsets == {'a': 0, 'b': 30}
+    assert planner.spread_offsets([('a', 'a.json', 300, T)], {}, 60) == {}
+
+
+def test_spread_offsets_group_by_model():
+    signatures = {'fixed.json': 'sdxl', 'flux.json': 'flux', 'sdxl.json': 'sdxl'}
+    entries = [('fixed', 'fixed.json', 0, T), ('flux', 'flux.json', 600, T), ('sdxl', 'sdxl.json', 600, T)]
+    durations = {'fixed.json': 60, 'flux.json': 10, 'sdxl.json': 50}
+    # Shortest first, unless the fixed entry's model is already loaded
+    assert planner.spread_offsets(entries, durations, 60) == {'flux': 60, 'sdxl': 70}
+    assert planner.spread_offsets(entries, durations, 60, signatures) == {'sdxl': 60, 'flux': 110}
+
+
+def test_job_added_after_its_time_is_spread_with_the_day_it_fires(manager):
+    passed = (datetime.now() - timedelta(minutes=2)).strftime("%H:%M")
+    schedules = [{'workflow': f'{name}.json', 'enabled': True, 'time': passed, 'spread': 600} for name in 'ab']
+    assert manager.save_schedules(schedules, True)
+
+    tomorrow = DailyTrigger(passed).next_fire()
+    jobs = sorted(manager.jobs.values(), key=lambda job: job.offset)
+    assert [job.nominal for job in jobs] == [tomorrow, tomorrow]
+    assert [job.offset for job in jobs] == [0, 60]
+    # Each timer fires on the nominal time its offset was computed for
+    assert all(manager.timer._due_at[job.key] == job.nominal + job.offset for job in jobs)
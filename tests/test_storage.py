@@ -0,0 +1,87 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+web = pytest.importorskip("aiohttp.web")
+from aiohttp.test_utils import TestClient, TestServer
+
+from scheduledtask.storage import CHUNK_SIZE, COMPRESS_MIN_BYTES, AsyncStorage
+from scheduledtask.web_handler import send_json
+
+
+def serve(handler, scenario, **client_options):
+    """Run scenario(client) against an app routing every path to handler"""
+    async def main():
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handler)
+        async with TestClient(TestServer(app), **client_options) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+def test_read_json_limits_and_errors():
+    storage = AsyncStorage()
+
+    async def echo(request):
+        return web.json_response(await storage.read_json(request, limit=1024))
+
+    async def chunks():
+        # Streamed without a Content-Length
+        for _ in range(8):
+            yield b' ' * 512
+
+    async def scenario(client):
+        results = {}
+        for name, data in (('small', json.dumps({'a': 1})), ('declared', json.dumps({'a': 'x' * 4096})),
+                           ('streamed', chunks()), ('invalid', b'{not json'), ('empty', b'')):
+            response = await client.post('/echo', data=data)
+            results[name] = (response.status, await response.text())
+        return results
+
+    try:
+        results = serve(echo, scenario)
+    finally:
+        storage.shutdown()
+    assert results['small'] == (200, '{"a": 1}')
+    assert results['declared'][0] == 413
+    assert results['streamed'][0] == 413
+    assert results['invalid'][0] == 400
+    assert json.loads(results['invalid'][1])['error'].startswith("Invalid JSON body")
+    assert results['empty'] == (200, '{}')
+
+
+def test_send_json_gzips_and_streams_large_bodies():
+    data = {'items': [f"item {i}" for i in range(20000)]}
+    body = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    assert len(body) > max(CHUNK_SIZE, COMPRESS_MIN_BYTES)
+
+    async def handler(request):
+        return await send_json(request, data if request.path == '/large' else {'ok': True})
+
+    async def scenario(client):
+        results = {}
+        for name, path, encoding in (('small', '/small', 'gzip'), ('plain', '/large', 'identity'),
+                                     ('gzip', '/large', 'gzip')):
+            response = await client.get(path, headers={'Accept-Encoding': encoding})
+            results[name] = (response.headers.copy(), await response.read())
+        return results
+
+    results = serve(handler, scenario, auto_decompress=False)
+
+    headers, raw = results['small']
+    assert 'Content-Encoding' not in headers
+    assert json.loads(raw) == {'ok': True}
+
+    # Larger than one chunk: streamed, but with a known length
+    headers, raw = results['plain']
+    assert 'Content-Encoding' not in headers
+    assert int(headers['Content-Length']) == len(raw) == len(body)
+    assert json.loads(raw) == data
+
+    headers, raw = results['gzip']
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['Vary'] == 'Accept-Encoding'
+    assert len(raw) < len(body)
+    assert json.loads(gzip.decompress(raw)) == data
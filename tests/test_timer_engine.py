@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from scheduledtask.timer_engine import DriftStats, TimerEngine
+
+
+def test_pop_due_in_fire_order_across_buckets():
+    engine = TimerEngine(lambda key, fire_ts: None)
+    engine.schedule_many([('late', 30.0), ('b', 10.0), ('mid', 20.0)])
+    engine.schedule('a', 10.0)
+    # Moving a key leaves its old bucket
+    engine.schedule('b', 15.0)
+    assert engine.pop_due(25.0) == [('a', 10.0), ('b', 15.0), ('mid', 20.0)]
+    assert len(engine) == 1 and 'late' in engine
+    assert engine.next_fire_time() == 30.0
+
+
+def test_reschedule_after_fire():
+    engine = TimerEngine(lambda key, fire_ts: None)
+    engine.schedule_many([('a', 10.0), ('b', 10.0)])
+    assert engine.pop_due(10.0) == [('a', 10.0), ('b', 10.0)]
+    engine.reschedule_fired('a', 70.0)
+    engine.reschedule_fired('b', None)
+    assert 'a' in engine and 'b' not in engine
+    assert engine.next_fire_time() == 70.0
+
+
+def test_cancel_or_reschedule_during_fire_wins():
+    engine = TimerEngine(lambda key, fire_ts: None)
+    engine.schedule_many([('cancelled', 10.0), ('moved', 10.0), ('cleared', 10.0)])
+    engine.pop_due(10.0)
+    engine.cancel('cancelled')
+    engine.schedule('moved', 500.0)
+    engine.reschedule_fired('cancelled', 70.0)
+    engine.reschedule_fired('moved', 70.0)
+    assert 'cancelled' not in engine
+    assert engine.next_fire_time() == 500.0
+
+    engine.clear()
+    engine.reschedule_fired('cleared', 70.0)
+    assert len(engine) == 0
+
+
+def test_thread_fires_and_wakes_for_earlier_schedules():
+    fired = []
+    done = threading.Event()
+
+    def callback(key, fire_ts):
+        fired.append(key)
+        if len(fired) < 2:
+            return time.time() + 0.05
+        done.set()
+        return None
+
+    engine = TimerEngine(callback)
+    engine.schedule('far', time.time() + 3600)
+    assert engine.start()
+    try:
+        # The thread is asleep until 'far'; new, earlier keys must wake it
+        time.sleep(0.05)
+        engine.schedule('repeat', time.time() + 0.05)
+        assert done.wait(2)
+    finally:
+        engine.stop(timeout=2)
+    assert fired == ['repeat', 'repeat']
+    assert 'far' in engine
+    summary = engine.drift.summary()
+    assert summary['count'] == 2
+    assert 0 <= summary['max'] < 1
+
+
+def test_drift_stats():
+    stats = DriftStats(window=2)
+    assert stats.summary() == {'count': 0, 'mean': None, 'max': None, 'last': None}
+    for drift in (0.5, 0.1, 0.3):
+        stats.record(drift)
+    assert stats.summary() == {'count': 3, 'mean': pytest.approx(0.3), 'max': 0.5, 'last': 0.3}
+    assert list(stats.recent) == [0.1, 0.3]
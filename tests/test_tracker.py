@@ -0,0 +1,48 @@
+from scheduledtask.tracker import CompletionTracker, RunRecord, STATUS_SUCCESS
+
+
+def history_entry(started_ms, finished_ms):
+    return {'status': {'completed': True, 'status_str': 'success', 'messages': [
+        ['execution_start', {'prompt_id': 'p1', 'timestamp': started_ms}],
+        ['execution_success', {'prompt_id': 'p1', 'timestamp': finished_ms}],
+    ]}}
+
+
+def make_tracker():
+    tracker = CompletionTracker(dispatcher=None)
+    tracker.active['p1'] = RunRecord('p1', 'a.json', 100.0)
+    return tracker
+
+
+def test_websocket_lifecycle():
+    tracker = make_tracker()
+    tracker.handle_message({'type': 'execution_start', 'data': {'prompt_id': 'p1'}})
+    tracker.handle_message({'type': 'execution_success', 'data': {'prompt_id': 'p1'}})
+    record = tracker.recent[-1]
+    assert record.status == STATUS_SUCCESS
+    assert record.queue_wait is not None and record.execution_time is not None
+    assert not tracker.active
+
+
+def test_missed_start_is_filled_from_history():
+    tracker = make_tracker()
+    # execution_start arrived before the prompt was tracked
+    tracker.handle_message({'type': 'execution_success', 'data': {'prompt_id': 'p1'}})
+    assert tracker.active['p1'].pending is not None
+
+    tracker.apply_history('p1', history_entry(103000, 110000))
+    record = tracker.recent[-1]
+    assert record.status == STATUS_SUCCESS
+    assert record.queue_wait == 3.0
+    assert record.execution_time == 7.0
+    assert tracker.workflow_stats()['a.json']['execution_p50'] == 7.0
+
+
+def test_held_status_applies_without_history():
+    tracker = make_tracker()
+    tracker.handle_message({'type': 'execution_error', 'data': {'prompt_id': 'p1', 'exception_message': 'boom'}})
+    tracker._apply_pending('p1')
+    record = tracker.recent[-1]
+    assert record.status == 'error'
+    assert record.error == 'boom'
+    assert record.started_at is None
@@ -0,0 +1,159 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from scheduledtask.triggers import INTERVAL_EPOCH, CronTrigger, IntervalTrigger, RateTrigger, DailyTrigger, build_trigger
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+@pytest.mark.parametrize("expr, after, expected", [
+    ("*/15 * * * *", (2026, 6, 10, 10, 7, 30), (2026, 6, 10, 10, 15)),
+    ("*/15 * * * *", (2026, 6, 10, 10, 15), (2026, 6, 10, 10, 30)),
+    ("0 * * * *", (2026, 6, 10, 23, 30), (2026, 6, 11, 0, 0)),
+    ("30 2 * * mon", (2026, 6, 10, 12, 0), (2026, 6, 15, 2, 30)),
+    ("0 0 31 * *", (2026, 6, 10, 0, 0), (2026, 7, 31, 0, 0)),
+    ("0 12 29 feb *", (2026, 1, 1, 0, 0), (2028, 2, 29, 12, 0)),
+    ("0 9-17/4 * * 1-5", (2026, 6, 12, 17, 0), (2026, 6, 15, 9, 0)),
+    # Day of month and weekday both restricted: either matches
+    ("0 9 1 * 0", (2026, 6, 12, 10, 0), (2026, 6, 14, 9, 0)),
+    ("0 9 1 * 7", (2026, 6, 12, 10, 0), (2026, 6, 14, 9, 0)),
+    # A stepped '*' counts as unrestricted: both fields must match, not either
+    ("0 9 */2 * tue", (2026, 6, 12, 10, 0), (2026, 6, 23, 9, 0)),
+    ("0 9 1-31/2 * tue", (2026, 6, 12, 10, 0), (2026, 6, 13, 9, 0)),
+    ("59 23 31 dec *", (2026, 12, 31, 23, 59), (2027, 12, 31, 23, 59)),
+])
+def test_cron_next_fire(expr, after, expected):
+    assert CronTrigger(expr).next_fire(ts(*after)) == ts(*expected)
+
+
+@pytest.mark.parametrize("expr", ["* * * *", "60 * * * *", "* 24 * * *", "5-1 * * * *", "*/0 * * * *"])
+def test_cron_rejects_invalid(expr):
+    with pytest.raises(ValueError):
+        CronTrigger(expr)
+
+
+@pytest.mark.parametrize("after, expected", [
+    ((2026, 6, 10, 0, 0), (2026, 6, 10, 0, 5)),
+    ((2026, 6, 10, 10, 7), (2026, 6, 10, 10, 20)),
+    ((2026, 6, 10, 10, 5), (2026, 6, 10, 10, 20)),
+    # The sequence restarts at midnight
+    ((2026, 6, 10, 23, 55), (2026, 6, 11, 0, 5)),
+])
+def test_interval_next_fire(after, expected):
+    assert IntervalTrigger(900, offset=300).next_fire(ts(*after)) == ts(*expected)
+
+
+def test_interval_longer_than_a_day_keeps_its_spacing():
+    trigger = IntervalTrigger(2 * 86400 + 3600)
+    fires = [trigger.next_fire(ts(2026, 6, 10, 12, 0))]
+    for _ in range(3):
+        fires.append(trigger.next_fire(fires[-1]))
+    assert {later - earlier for earlier, later in zip(fires, fires[1:])} == {2 * 86400 + 3600}
+    assert (fires[0] - INTERVAL_EPOCH) % (2 * 86400 + 3600) == 0
+
+
+def test_rate_window_longer_than_a_day():
+    trigger = RateTrigger(1, 172800)
+    first = trigger.next_fire(ts(2026, 6, 10, 12, 0))
+    assert trigger.next_fire(first) == first + 172800
+    # Three per two days, not three per day
+    trigger = RateTrigger(3, 172800, offset=90000)
+    start = ts(2026, 6, 10)
+    fire_ts, count = trigger.next_fire(start), 0
+    while fire_ts < start + 172800:
+        count += 1
+        fire_ts = trigger.next_fire(fire_ts)
+    assert count == 3
+
+
+def test_interval_rejects_invalid():
+    with pytest.raises(ValueError):
+        IntervalTrigger(0)
+    with pytest.raises(ValueError):
+        IntervalTrigger(0.001)
+    with pytest.raises(ValueError):
+        RateTrigger(100, 'minute')
+    with pytest.raises(ValueError):
+        IntervalTrigger(3 * 86400, offset=3 * 86400)
+    with pytest.raises(ValueError):
+        IntervalTrigger(60, offset=86400)
+
+
+def test_rate_next_fire():
+    assert RateTrigger(4, 'hour').next_fire(ts(2026, 6, 10, 10, 0)) == ts(2026, 6, 10, 10, 15)
+    assert RateTrigger(2, 'minute').next_fire(ts(2026, 6, 10, 10, 0, 40)) == ts(2026, 6, 10, 10, 1)
+    assert RateTrigger(3, 7200, offset=60).next_fire(ts(2026, 6, 10, 0, 0, 30)) == ts(2026, 6, 10, 0, 1)
+    with pytest.raises(ValueError):
+        RateTrigger(0, 'hour')
+
+
+def test_build_trigger():
+    assert isinstance(build_trigger({'time': '08:30'}), DailyTrigger)
+    assert isinstance(build_trigger({'trigger': {'type': 'cron', 'expr': '0 * * * *'}}), CronTrigger)
+    assert isinstance(build_trigger({'trigger': {'type': 'interval', 'every': 60}}), IntervalTrigger)
+    assert isinstance(build_trigger({'trigger': {'type': 'rate', 'count': 6}}), RateTrigger)
+    with pytest.raises(ValueError):
+        build_trigger({'trigger': {'type': 'weekly'}})
+
+
+@pytest.mark.parametrize("trigger", [
+    {'type': 'interval', 'every': None},
+    {'type': 'interval', 'every': 'often'},
+    {'type': 'interval', 'every': 60, 'offset': [1]},
+    {'type': 'rate', 'count': None},
+    {'type': 'rate', 'count': 1.5},
+    {'type': 'rate', 'count': 2, 'window': {}},
+    {'type': 'cron'},
+    {'type': 'daily'},
+])
+def test_build_trigger_rejects_bad_fields(trigger):
+    with pytest.raises(ValueError):
+        build_trigger({'workflow': 'a.json', 'trigger': trigger})
+
+
+def test_save_rejects_invalid_trigger_without_persisting(manager):
+    good = [{'workflow': 'a.json', 'enabled': True, 'time': '08:00'}]
+    assert manager.save_schedules(good, True)
+    with pytest.raises(ValueError, match="Schedule 2"):
+        manager.save_schedules(good + [{'workflow': 'b.json', 'enabled': True,
+                                        'trigger': {'type': 'interval', 'every': None}}], True)
+    assert manager.load_schedules() == good
+    assert len(manager.jobs) == 1
+
+
+def test_startup_skips_invalid_trigger_in_config(tmp_path):
+    from scheduledtask.scheduler import SchedulerManager
+    with open(tmp_path / "schedules.json", 'w', encoding='utf-8') as f:
+        json.dump({'globalEnabled': True, 'schedules': [
+            {'workflow': 'a.json', 'enabled': True, 'trigger': {'type': 'rate', 'count': None}},
+            {'workflow': 'b.json', 'enabled': True, 'time': '08:00'},
+        ]}, f)
+    manager = SchedulerManager(base_dir=str(tmp_path))
+    try:
+        assert [job.item['workflow'] for job in manager.jobs.values()] == ['b.json']
+    finally:
+        manager.shutdown()
+
+
+def test_save_trigger_items(manager):
+    schedules = [
+        {'workflow': 'a.json', 'enabled': True, 'trigger': {'type': 'cron', 'expr': '0 * * * *'}},
+        {'workflow': 'b.json', 'enabled': True, 'trigger': {'type': 'interval', 'every': 600}},
+        {'workflow': 'c.json', 'enabled': True, 'trigger': {'type': 'rate', 'count': 4, 'window': 'hour'}},
+        {'workflow': 'd.json', 'enabled': True, 'time': '08:30'},
+    ]
+    assert manager.save_schedules(schedules, True)
+    assert manager.running
+    triggers = {job.item['workflow']: type(job.trigger) for job in manager.jobs.values()}
+    assert triggers == {'a.json': CronTrigger, 'b.json': IntervalTrigger,
+                        'c.json': RateTrigger, 'd.json': DailyTrigger}
+    assert manager.load_schedules() == schedules
+
+    # Saving the same items again keeps their jobs
+    keys = set(manager.jobs)
+    assert manager.save_schedules(schedules, True)
+    assert set(manager.jobs) == keys
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import sys
+import types
+
+import pytest
+
+from scheduledtask.workflow_index import WorkflowIndex
+
+CHECKPOINT = {'1': {'class_type': 'CheckpointLoaderSimple', 'inputs': {'ckpt_name': 'sdxl.safetensors'}}}
+
+
+def write(folder, name, data):
+    with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = WorkflowIndex(str(tmp_path), min_interval=0)
+    reads = []
+    read_entry = index._read_entry
+    monkeypatch.setattr(index, '_read_entry', lambda path, filename, stat: (
+        reads.append(filename), read_entry(path, filename, stat))[1])
+    index.reads = reads
+    return index
+
+
+def test_refresh_rereads_only_changed_files(tmp_path, index):
+    write(tmp_path, 'a.json', CHECKPOINT)
+    write(tmp_path, 'b.json', {})
+    (tmp_path / 'notes.txt').write_text('ignored')
+    assert index.refresh()
+    assert sorted(index.reads) == ['a.json', 'b.json']
+    assert index.get('a.json').signature == 'checkpoint:sdxl.safetensors'
+    etag = index.etag
+
+    index.reads.clear()
+    assert not index.refresh()
+    assert index.reads == [] and index.etag == etag
+
+    # Touched but unchanged content: re-read, same ETag
+    stat = os.stat(tmp_path / 'b.json')
+    os.utime(tmp_path / 'b.json', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    index.refresh()
+    assert index.reads == ['b.json'] and index.etag == etag
+
+    index.reads.clear()
+    write(tmp_path, 'a.json', {'1': {'class_type': 'KSampler', 'inputs': {}}})
+    assert index.refresh()
+    assert index.reads == ['a.json'] and index.etag != etag
+    assert index.get('a.json').signature is None
+
+    etag = index.etag
+    write(tmp_path, 'c.json', CHECKPOINT)
+    index.refresh()
+    assert index.etag != etag
+    etag = index.etag
+    os.remove(tmp_path / 'b.json')
+    assert index.refresh()
+    assert index.etag != etag
+    assert [entry['filename'] for entry in index.list()] == ['a.json', 'c.json']
+
+
+def test_refresh_is_rate_limited(tmp_path):
+    index = WorkflowIndex(str(tmp_path), min_interval=60)
+    write(tmp_path, 'a.json', {})
+    assert index.refresh()
+    write(tmp_path, 'b.json', {})
+    assert not index.refresh()
+    assert index.refresh(force=True)
+    assert set(index.entries) == {'a.json', 'b.json'}
+
+
+def test_unreadable_workflow_is_listed_with_error(tmp_path, index):
+    (tmp_path / 'broken.json').write_text('{not json')
+    index.refresh()
+    entry = index.get('broken.json').to_dict()
+    assert entry['error'] and entry['hash'] and entry['node_count'] == 0
+
+
+def test_get_workflows_route_answers_304(manager, monkeypatch):
+    web = pytest.importorskip("aiohttp.web")
+    from aiohttp.test_utils import TestClient, TestServer
+    import scheduledtask
+    from scheduledtask import web_handler
+
+    # Stand-in for ComfyUI's PromptServer, collecting the extension's routes
+    routes = web.RouteTableDef()
+    server = types.ModuleType("server")
+    server.PromptServer = types.SimpleNamespace(instance=types.SimpleNamespace(routes=routes))
+    monkeypatch.setitem(sys.modules, "server", server)
+    monkeypatch.setattr(scheduledtask, 'get_scheduler', lambda: manager, raising=False)
+    web_handler.setup_routes()
+    manager.workflow_index.min_interval = 0
+    write(manager.workflow_dir, 'a.json', CHECKPOINT)
+
+    async def scenario(client):
+        first = await client.get('/scheduledtask/get_workflows')
+        etag = first.headers['ETag']
+        listing = await first.json()
+        cached = await client.get('/scheduledtask/get_workflows', headers={'If-None-Match': etag})
+        write(manager.workflow_dir, 'b.json', {})
+        changed = await client.get('/scheduledtask/get_workflows', headers={'If-None-Match': etag})
+        return listing, cached.status, cached.headers.get('ETag') == etag, changed.status, \
+            changed.headers['ETag'] != etag
+
+    async def main():
+        app = web.Application()
+        app.add_routes(routes)
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client)
+
+    listing, cached_status, same_etag, changed_status, new_etag = asyncio.run(main())
+    assert [entry['filename'] for entry in listing['workflows']] == ['a.json']
+    assert (cached_status, same_etag) == (304, True)
+    assert (changed_status, new_etag) == (200, True)
@@ -0,0 +1,220 @@
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+
+from .metrics import FIRE_DRIFT, FIRES
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for a single sleep, so wall-clock adjustments (NTP, DST)
+# are picked up without waiting for a far-away fire time.
+MAX_SLEEP_SECONDS = 60.0
+
+
+class DriftStats:
+    """Fire drift (actual - scheduled, in seconds) of recent timer firings"""
+
+    def __init__(self, window=256):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+        self.recent = deque(maxlen=window)
+
+    def record(self, drift):
+        self.count += 1
+        self.total += drift
+        self.max = max(self.max, drift)
+        self.last = drift
+        self.recent.append(drift)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': (self.total / self.count) if self.count else None,
+            'max': self.max if self.count else None,
+            'last': self.last,
+        }
+
+
+class TimerEngine:
+    """
+    Heap-based timer that sleeps exactly until the next due fire time.
+
+    Keys due at the same timestamp share one bucket, so the heap holds one
+    entry per distinct fire time rather than one per key; with minute-level
+    schedules it stays small no matter how many keys are registered.
+
+    The callback is invoked as callback(key, fire_ts) on the timer thread
+    and returns the next fire timestamp for that key, or None to drop it.
+    Any change to the pending set wakes the thread through a condition
+    variable.
+    """
+
+    def __init__(self, callback, name="ScheduledTaskTimer"):
+        self.callback = callback
+        self.name = name
+        self.drift = DriftStats()
+        self._cond = threading.Condition()
+        self._heap = []
+        self._buckets = {}
+        self._due_at = {}
+        self._firing = {}
+        self._running = False
+        self._thread = None
+
+    def schedule(self, key, fire_ts):
+        """Schedule (or reschedule) key to fire at fire_ts"""
+        with self._cond:
+            self._add(key, fire_ts)
+            self._cond.notify()
+
+    def schedule_many(self, entries):
+        """Schedule an iterable of (key, fire_ts) pairs under one lock"""
+        with self._cond:
+            for key, fire_ts in entries:
+                self._add(key, fire_ts)
+            self._cond.notify()
+
+    def cancel(self, key):
+        """Cancel a pending key"""
+        self.cancel_many((key,))
+
+    def cancel_many(self, keys):
+        """Cancel several pending keys under one lock"""
+        with self._cond:
+            for key in keys:
+                if key in self._firing:
+                    self._firing[key] = False
+                self._remove(key)
+            self._cond.notify()
+
+    def clear(self):
+        """Drop all pending timers"""
+        with self._cond:
+            self._heap.clear()
+            self._buckets.clear()
+            self._due_at.clear()
+            for key in self._firing:
+                self._firing[key] = False
+            self._cond.notify()
+
+    def wake(self):
+        """Force the timer thread to re-evaluate its next deadline"""
+        with self._cond:
+            self._cond.notify()
+
+    def __len__(self):
+        return len(self._due_at)
+
+    def __contains__(self, key):
+        return key in self._due_at
+
+    def next_fire_time(self):
+        """Timestamp of the next pending key, or None"""
+        with self._cond:
+            self._discard_stale()
+            return self._heap[0] if self._heap else None
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return False
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        with self._cond:
+            if not self._running:
+                return False
+            self._running = False
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self._thread = None
+        return True
+
+    def _add(self, key, fire_ts):
+        self._remove(key)
+        bucket = self._buckets.get(fire_ts)
+        if bucket is None:
+            bucket = self._buckets[fire_ts] = {}
+            heapq.heappush(self._heap, fire_ts)
+        # dict keeps insertion order within a bucket
+        bucket[key] = None
+        self._due_at[key] = fire_ts
+
+    def _remove(self, key):
+        fire_ts = self._due_at.pop(key, None)
+        if fire_ts is None:
+            return
+        bucket = self._buckets[fire_ts]
+        del bucket[key]
+        if not bucket:
+            # The heap entry is discarded lazily
+            del self._buckets[fire_ts]
+
+    def _discard_stale(self):
+        heap = self._heap
+        while heap and heap[0] not in self._buckets:
+            heapq.heappop(heap)
+
+    def pop_due(self, now):
+        """Pop every key due at or before now as (key, fire_ts) pairs, in fire order"""
+        with self._cond:
+            due = []
+            while True:
+                self._discard_stale()
+                if not self._heap or self._heap[0] > now:
+                    return due
+                fire_ts = heapq.heappop(self._heap)
+                for key in self._buckets.pop(fire_ts):
+                    del self._due_at[key]
+                    self._firing[key] = True
+                    due.append((key, fire_ts))
+
+    def reschedule_fired(self, key, next_ts):
+        """Re-arm a key popped by pop_due unless it was cancelled, cleared or rescheduled meanwhile"""
+        with self._cond:
+            still_valid = self._firing.pop(key, False)
+            if next_ts is not None and still_valid and key not in self._due_at:
+                self._add(key, next_ts)
+
+    def _take_due(self):
+        """Wait for and pop the entries due now; returns None when stopped"""
+        with self._cond:
+            while self._running:
+                self._discard_stale()
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0] - time.time()
+                if delay > 0:
+                    self._cond.wait(min(delay, MAX_SLEEP_SECONDS))
+                    continue
+                return self.pop_due(time.time())
+            return None
+
+    def _run(self):
+        logger.info("🚀 Scheduler service started")
+        while True:
+            due = self._take_due()
+            if due is None:
+                break
+            for key, fire_ts in due:
+                drift = time.time() - fire_ts
+                self.drift.record(drift)
+                FIRE_DRIFT.observe(drift)
+                FIRES.inc()
+                try:
+                    next_ts = self.callback(key, fire_ts)
+                except Exception as e:
+                    logger.error(f"Schedule execution error: {e}")
+                    next_ts = None
+                self.reschedule_fired(key, next_ts)
+        logger.info("⏹️ Scheduler service stopped")
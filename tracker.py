@@ -0,0 +1,376 @@
+import asyncio
+import functools
+import json
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from .dispatcher import CLIENT_ID, DispatchError
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCESS = "success"
+STATUS_ERROR = "error"
+STATUS_INTERRUPTED = "interrupted"
+FINAL_STATUSES = (STATUS_SUCCESS, STATUS_ERROR, STATUS_INTERRUPTED)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class RunRecord:
+    """Lifecycle timestamps of one dispatched prompt"""
+
+    __slots__ = ('prompt_id', 'workflow', 'status', 'enqueued_at', 'started_at',
+                 'finished_at', 'error', 'last_checked', 'backend', 'pending')
+
+    def __init__(self, prompt_id, workflow, enqueued_at, backend=None):
+        self.prompt_id = prompt_id
+        self.workflow = workflow
+        self.backend = backend
+        self.status = STATUS_QUEUED
+        self.enqueued_at = enqueued_at
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.last_checked = enqueued_at
+        # Final (status, at, error) seen on /ws while the start is still unknown
+        self.pending = None
+
+    @property
+    def queue_wait(self):
+        if self.started_at is None:
+            return None
+        return max(0.0, self.started_at - self.enqueued_at)
+
+    @property
+    def execution_time(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return max(0.0, self.finished_at - self.started_at)
+
+    def to_dict(self):
+        return {
+            'prompt_id': self.prompt_id,
+            'workflow': self.workflow,
+            'backend': self.backend,
+            'status': self.status,
+            'enqueued_at': self.enqueued_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queue_wait': self.queue_wait,
+            'execution_time': self.execution_time,
+            'error': self.error,
+        }
+
+
+class CompletionTracker:
+    """
+    Follows dispatched prompts to completion.
+
+    Listens on each backend's /ws for the scheduler's client_id and falls
+    back to polling /history/{prompt_id} while that backend's websocket is
+    down or a run has not reported for a while. Listeners registered with
+    add_listener(fn) are called as fn(record) on every status change.
+    """
+
+    def __init__(self, dispatcher, poll_interval=5.0, stale_after=30.0, window=200):
+        self.dispatcher = dispatcher
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.window = window
+        self.active = {}
+        self.recent = deque(maxlen=window)
+        self._durations = {}
+        self._waits = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+        self._stopping = False
+        self._ws_connected = {}
+
+    @property
+    def ws_connected(self):
+        return bool(self._ws_connected) and all(self._ws_connected.values())
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def track(self, prompt_id, workflow, enqueued_at=None):
+        """Start following a prompt submitted to ComfyUI"""
+        record = RunRecord(prompt_id, workflow, enqueued_at or time.time(),
+                           self.dispatcher.backend_for(prompt_id))
+        with self._lock:
+            self.active[prompt_id] = record
+        self._notify(record)
+        self.start()
+        return record
+
+    def cancel(self, prompt_id, error):
+        """Stop following a prompt removed from ComfyUI's queue by us"""
+        self._update(prompt_id, STATUS_INTERRUPTED, error=error)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="ScheduledTaskTracker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        loop, event = self._loop, self._stop_event
+        if loop is not None and event is not None:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+        self._thread = None
+
+    def _notify(self, record):
+        for fn in self._listeners:
+            try:
+                fn(record)
+            except Exception as e:
+                logger.error(f"Run listener failed: {e}")
+
+    def _update(self, prompt_id, status, at=None, error=None):
+        with self._lock:
+            record = self.active.get(prompt_id)
+            if record is None:
+                return
+            at = at or time.time()
+            record.last_checked = time.time()
+            if status == STATUS_RUNNING:
+                if record.started_at is not None:
+                    return
+                record.started_at = at
+            else:
+                record.finished_at = at
+                record.error = error
+                del self.active[prompt_id]
+                self.recent.append(record)
+                if status == STATUS_SUCCESS:
+                    self._record_sample(self._durations, record.workflow, record.execution_time)
+                self._record_sample(self._waits, record.workflow, record.queue_wait)
+            record.status = status
+        self._notify(record)
+        if status in FINAL_STATUSES:
+            run_time = record.execution_time
+            logger.info(f"🏁 Workflow {record.workflow} finished: {status} (ID: {prompt_id}"
+                        + (f", run {run_time:.1f}s)" if run_time is not None else ")"))
+
+    def _record_sample(self, samples, workflow, value):
+        if value is None:
+            return
+        if workflow not in samples:
+            samples[workflow] = deque(maxlen=self.window)
+        samples[workflow].append(value)
+
+    def _finish(self, prompt_id, status, error=None):
+        """
+        Apply a final websocket status.
+
+        If the run's execution_start was missed (ComfyUI can send it before
+        the submitting thread has tracked the prompt), the status is held
+        until /history supplies the start time, so queue wait and
+        execution time are not lost.
+        """
+        with self._lock:
+            record = self.active.get(prompt_id)
+            if record is None:
+                return
+            if record.started_at is None:
+                if record.pending is None:
+                    record.pending = (status, time.time(), error)
+                return
+        self._update(prompt_id, status, error=error)
+
+    def _apply_pending(self, prompt_id):
+        """Finish a held run with its websocket status once /history was tried"""
+        with self._lock:
+            record = self.active.get(prompt_id)
+            pending = record.pending if record is not None else None
+        if pending is not None:
+            status, at, error = pending
+            self._update(prompt_id, status, at=at, error=error)
+
+    def handle_message(self, message):
+        """Apply one decoded ComfyUI websocket message"""
+        msg_type = message.get('type')
+        data = message.get('data') or {}
+        prompt_id = data.get('prompt_id')
+        if prompt_id is None or prompt_id not in self.active:
+            return
+        if msg_type == 'execution_start':
+            self._update(prompt_id, STATUS_RUNNING)
+        elif msg_type == 'execution_success':
+            self._finish(prompt_id, STATUS_SUCCESS)
+        elif msg_type == 'executing' and data.get('node') is None:
+            # Older ComfyUI signals completion with an empty "executing" node
+            self._finish(prompt_id, STATUS_SUCCESS)
+        elif msg_type == 'execution_error':
+            self._finish(prompt_id, STATUS_ERROR, error=data.get('exception_message') or 'execution_error')
+        elif msg_type == 'execution_interrupted':
+            self._finish(prompt_id, STATUS_INTERRUPTED, error='interrupted')
+
+    def apply_history(self, prompt_id, entry):
+        """Apply a /history entry for a prompt"""
+        status = entry.get('status') or {}
+        started = finished = None
+        outcome = None
+        error = None
+        for name, data in status.get('messages', []):
+            timestamp = data.get('timestamp')
+            at = timestamp / 1000.0 if timestamp else None
+            if name == 'execution_start':
+                started = at
+            elif name == 'execution_success':
+                finished, outcome = at, STATUS_SUCCESS
+            elif name == 'execution_error':
+                finished, outcome = at, STATUS_ERROR
+                error = data.get('exception_message') or 'execution_error'
+            elif name == 'execution_interrupted':
+                finished, outcome = at, STATUS_INTERRUPTED
+                error = 'interrupted'
+        if outcome is None and status.get('completed'):
+            outcome = STATUS_SUCCESS if status.get('status_str') == 'success' else STATUS_ERROR
+        if started is not None:
+            self._update(prompt_id, STATUS_RUNNING, at=started)
+        if outcome is not None:
+            self._update(prompt_id, outcome, at=finished, error=error)
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        self._loop = loop
+        try:
+            loop.run_until_complete(self._main())
+        except Exception as e:
+            logger.error(f"Completion tracker stopped: {e}")
+        finally:
+            loop.close()
+            self._loop = None
+
+    async def _main(self):
+        self._stop_event = asyncio.Event()
+        if self._stopping:
+            return
+        poller = asyncio.ensure_future(self._poll_history())
+        listeners = {}
+        try:
+            while not self._stopping:
+                if HAS_AIOHTTP:
+                    # Follow backends added or removed by a config reload
+                    urls = set(self.dispatcher.pool.urls())
+                    for url in urls - set(listeners):
+                        listeners[url] = asyncio.ensure_future(self._listen_ws(url))
+                    for url in set(listeners) - urls:
+                        listeners.pop(url).cancel()
+                        self._ws_connected.pop(url, None)
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            tasks = [poller] + list(listeners.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _listen_ws(self, base_url):
+        backoff = 1.0
+        self._ws_connected[base_url] = False
+        url = base_url.replace('http', 'ws', 1) + f"/ws?clientId={CLIENT_ID}"
+        while not self._stopping:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(url, heartbeat=30) as ws:
+                        self._ws_connected[base_url] = True
+                        backoff = 1.0
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                try:
+                                    self.handle_message(json.loads(msg.data))
+                                except ValueError:
+                                    continue
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"ComfyUI websocket unavailable ({base_url}): {e}")
+            self._ws_connected[base_url] = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _poll_history(self):
+        loop = asyncio.get_event_loop()
+        while not self._stopping:
+            await asyncio.sleep(self.poll_interval)
+            now = time.time()
+            with self._lock:
+                due = [(record.prompt_id, record.backend) for record in self.active.values()
+                       if not self._ws_connected.get(record.backend)
+                       or record.pending is not None
+                       or now - record.last_checked >= self.stale_after]
+            unreachable = set()
+            for prompt_id, backend in due:
+                if backend in unreachable:
+                    self._apply_pending(prompt_id)
+                    continue
+                try:
+                    history = await loop.run_in_executor(
+                        None, functools.partial(self.dispatcher.get_json, f"/history/{prompt_id}", base_url=backend))
+                except (DispatchError, ValueError) as e:
+                    logger.debug(f"History lookup failed for {prompt_id}: {e}")
+                    unreachable.add(backend)
+                    self._apply_pending(prompt_id)
+                    continue
+                with self._lock:
+                    record = self.active.get(prompt_id)
+                    if record is not None:
+                        record.last_checked = time.time()
+                if prompt_id in history:
+                    self.apply_history(prompt_id, history[prompt_id])
+                self._apply_pending(prompt_id)
+
+    def workflow_stats(self):
+        """p50/p95 execution and queue wait times per workflow"""
+        with self._lock:
+            workflows = set(self._durations) | set(self._waits)
+            stats = {}
+            for workflow in workflows:
+                durations = sorted(self._durations.get(workflow, ()))
+                waits = sorted(self._waits.get(workflow, ()))
+                stats[workflow] = {
+                    'runs': len(durations),
+                    'execution_p50': percentile(durations, 50),
+                    'execution_p95': percentile(durations, 95),
+                    'queue_wait_p50': percentile(waits, 50),
+                    'queue_wait_p95': percentile(waits, 95),
+                }
+        return stats
+
+    def status(self):
+        return {
+            'ws_connected': self.ws_connected,
+            'active_runs': len(self.active),
+            'workflows': self.workflow_stats(),
+        }
@@ -0,0 +1,303 @@
+import math
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+TRIGGER_DAILY = "daily"
+TRIGGER_CRON = "cron"
+TRIGGER_INTERVAL = "interval"
+TRIGGER_RATE = "rate"
+
+SECONDS_PER_DAY = 86400
+
+MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'])}
+WEEKDAY_NAMES = {name: i for i, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+
+# Shortest interval a trigger may fire at
+MIN_INTERVAL = 1.0
+
+# Intervals and rate windows longer than a day count from here (local midnight)
+INTERVAL_EPOCH = datetime(2000, 1, 1).timestamp()
+
+WINDOW_ALIASES = {'minute': 60, 'hour': 3600, 'day': SECONDS_PER_DAY}
+
+
+def parse_daily_time(value):
+    """Parse "HH:MM" or "HH:MM:SS" into (hour, minute, second)"""
+    parts = str(value).strip().split(':')
+    if len(parts) not in (2, 3):
+        raise ValueError(f"Invalid time format: {value!r}")
+    hour, minute = int(parts[0]), int(parts[1])
+    second = int(parts[2]) if len(parts) == 3 else 0
+    if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+        raise ValueError(f"Invalid time value: {value!r}")
+    return hour, minute, second
+
+
+def next_daily_fire(time_str, after=None):
+    """Return the next local timestamp strictly after `after` matching time_str"""
+    return DailyTrigger(time_str).next_fire(after)
+
+
+def _number(value, name):
+    """value as a finite float; raises ValueError for anything else (None, bools, text)"""
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number: {value!r}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number: {value!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite: {value!r}")
+    return number
+
+
+def _local_now(after):
+    return datetime.fromtimestamp(time.time() if after is None else after)
+
+
+class DailyTrigger:
+    """Fires once a day at a local HH:MM[:SS]"""
+
+    def __init__(self, time_str):
+        self.time_str = time_str
+        self.hour, self.minute, self.second = parse_daily_time(time_str)
+
+    def next_fire(self, after=None):
+        now = _local_now(after)
+        candidate = now.replace(hour=self.hour, minute=self.minute, second=self.second, microsecond=0)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        return candidate.timestamp()
+
+    def describe(self):
+        return self.time_str
+
+
+class IntervalTrigger:
+    """
+    Fires every `every` seconds, anchored at local midnight plus `offset`.
+
+    The sequence restarts each day, so every=900, offset=300 fires at
+    00:05, 00:20, 00:35, ... regardless of when the scheduler started.
+    Sequences whose period is longer than a day cannot restart daily;
+    they run continuously from INTERVAL_EPOCH plus `offset` instead.
+    """
+
+    def __init__(self, every, offset=0, period=None):
+        self.every = _number(every, "Interval")
+        self.offset = _number(offset, "Offset")
+        if self.every < MIN_INTERVAL:
+            raise ValueError(f"Interval must be at least {MIN_INTERVAL:g} seconds")
+        # Span after which the sequence may restart (a rate's window)
+        self.period = self.every if period is None else period
+        self.daily = self.period <= SECONDS_PER_DAY
+        if not 0 <= self.offset < (SECONDS_PER_DAY if self.daily else self.period):
+            raise ValueError("Offset must be within one day" if self.daily else "Offset must be within one period")
+
+    def next_fire(self, after=None):
+        if not self.daily:
+            after = time.time() if after is None else after
+            start = INTERVAL_EPOCH + self.offset
+            if after < start:
+                return start
+            return start + (math.floor((after - start) / self.every) + 1) * self.every
+        now = _local_now(after)
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (now - midnight).total_seconds()
+        if elapsed < self.offset:
+            second_of_day = self.offset
+        else:
+            second_of_day = self.offset + (int((elapsed - self.offset) // self.every) + 1) * self.every
+        if second_of_day >= SECONDS_PER_DAY:
+            midnight += timedelta(days=1)
+            second_of_day = self.offset
+        return (midnight + timedelta(seconds=second_of_day)).timestamp()
+
+    def describe(self):
+        return f"every {self.every:g}s" + (f" +{self.offset:g}s" if self.offset else "")
+
+
+class RateTrigger(IntervalTrigger):
+    """Fires `count` times per `window` seconds, evenly spaced"""
+
+    def __init__(self, count, window, offset=0):
+        count = _number(count, "Rate count")
+        if isinstance(window, str):
+            window = WINDOW_ALIASES.get(window, window)
+        window = _number(window, "Rate window")
+        if count != int(count):
+            raise ValueError(f"Rate count must be a whole number: {count:g}")
+        self.count = int(count)
+        self.window = int(window)
+        if self.count <= 0 or self.window <= 0:
+            raise ValueError("Rate count and window must be positive")
+        super().__init__(self.window / self.count, offset, period=self.window)
+
+    def describe(self):
+        return f"{self.count}x per {self.window}s"
+
+
+def _parse_cron_value(token, names):
+    token = token.lower()
+    if token in names:
+        return names[token]
+    return int(token)
+
+
+def _parse_cron_field(field, low, high, names=None):
+    """Expand one cron field into a sorted tuple of allowed values"""
+    names = names or {}
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_str = part.split('/', 1)
+            step = int(step_str)
+            if step <= 0:
+                raise ValueError(f"Invalid cron step in {field!r}")
+        if part in ('*', ''):
+            start, end = low, high
+        elif '-' in part:
+            start_str, end_str = part.split('-', 1)
+            start, end = _parse_cron_value(start_str, names), _parse_cron_value(end_str, names)
+        else:
+            start = _parse_cron_value(part, names)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Cron field {field!r} out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return tuple(sorted(values))
+
+
+class CronTrigger:
+    """
+    Standard five-field cron expression (minute hour day month weekday).
+
+    Field values are expanded once into sorted tuples; the next fire time
+    is found by bisecting each field and carrying into the next larger
+    unit, so it never iterates minute by minute.
+    """
+
+    def __init__(self, expr):
+        fields = str(expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expr!r}")
+        self.expr = ' '.join(fields)
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12, MONTH_NAMES)
+        weekdays = _parse_cron_field(fields[4], 0, 7, WEEKDAY_NAMES)
+        # Cron counts Sunday as 0 or 7
+        self.weekdays = frozenset(7 if d == 0 else d for d in weekdays)
+        # Like vixie cron, a field starting with '*' (including '*/2') is unrestricted
+        self.any_day = fields[2].startswith('*')
+        self.any_weekday = fields[4].startswith('*')
+
+    def _day_matches(self, day):
+        dom = day.day in self.days
+        dow = day.isoweekday() in self.weekdays
+        if self.any_day or self.any_weekday:
+            return dom and dow
+        # Both restricted: cron matches either
+        return dom or dow
+
+    def next_fire(self, after=None):
+        now = _local_now(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year, month, day = now.year, now.month, now.day
+        hour, minute = now.hour, now.minute
+
+        # Bounded search: any valid expression matches within a few years
+        for _ in range(366 * 5):
+            i = bisect_left(self.months, month)
+            if i == len(self.months):
+                year, month, day, hour, minute = year + 1, self.months[0], 1, 0, 0
+                continue
+            if self.months[i] != month:
+                month, day, hour, minute = self.months[i], 1, 0, 0
+            try:
+                candidate = datetime(year, month, day)
+            except ValueError:
+                # Day overflowed the month
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+                day, hour, minute = 1, 0, 0
+                continue
+            if not self._day_matches(candidate):
+                candidate += timedelta(days=1)
+                year, month, day, hour, minute = candidate.year, candidate.month, candidate.day, 0, 0
+                continue
+            i = bisect_left(self.hours, hour)
+            if i == len(self.hours):
+                candidate += timedelta(days=1)
+                year, month, day, hour, minute = candidate.year, candidate.month, candidate.day, 0, 0
+                continue
+            if self.hours[i] != hour:
+                hour, minute = self.hours[i], 0
+            i = bisect_left(self.minutes, minute)
+            if i == len(self.minutes):
+                hour += 1
+                minute = 0
+                if hour == 24:
+                    candidate += timedelta(days=1)
+                    year, month, day, hour = candidate.year, candidate.month, candidate.day, 0
+                continue
+            return candidate.replace(hour=hour, minute=self.minutes[i]).timestamp()
+        raise ValueError(f"Cron expression never fires: {self.expr!r}")
+
+    def describe(self):
+        return f"cron {self.expr}"
+
+
+def build_trigger(schedule_item):
+    """Build the trigger for a schedule item; raises ValueError if invalid"""
+    spec = schedule_item.get('trigger')
+    if not spec:
+        return DailyTrigger(schedule_item.get('time'))
+    if not isinstance(spec, dict):
+        raise ValueError(f"Invalid trigger: {spec!r}")
+    kind = spec.get('type', TRIGGER_DAILY)
+    # Missing fields arrive as None and are rejected by the trigger itself
+    if kind == TRIGGER_DAILY:
+        return DailyTrigger(spec.get('time') or schedule_item.get('time'))
+    if kind == TRIGGER_CRON:
+        return CronTrigger(spec.get('expr'))
+    if kind == TRIGGER_INTERVAL:
+        return IntervalTrigger(spec.get('every'), spec.get('offset', 0))
+    if kind == TRIGGER_RATE:
+        return RateTrigger(spec.get('count'), spec.get('window', 'hour'), spec.get('offset', 0))
+    raise ValueError(f"Unknown trigger type: {kind!r}")
+
+
+def validate_schedules(schedules):
+    """
+    Check every schedule item before it is saved.
+
+    Raises ValueError naming the first item that is not an object or
+    whose trigger cannot be built, so nothing unloadable is persisted.
+    """
+    if not isinstance(schedules, list):
+        raise ValueError("schedules must be a list")
+    for index, item in enumerate(schedules, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Schedule {index} must be an object")
+        if not has_trigger(item):
+            continue
+        try:
+            build_trigger(item)
+        except ValueError as e:
+            raise ValueError(f"Schedule {index} ({item.get('workflow')}): {e}") from None
+
+
+def has_trigger(schedule_item):
+    """Whether an item defines when to run (daily time or trigger)"""
+    return bool(schedule_item.get('time') or schedule_item.get('trigger'))
+
+
+def describe_schedule(schedule_item):
+    """Short human-readable label for logs and run history"""
+    try:
+        return build_trigger(schedule_item).describe()
+    except ValueError:
+        return str(schedule_item.get('time') or schedule_item.get('trigger'))
@@ -1,10 +1,17 @@
 import { app } from "../../scripts/app.js";
+import { api } from "../../scripts/api.js";
 
 let globalEnabled = false;
 let schedules = [];
 let workflows = [];
 let settingsContainer = null;
 
+// Live state pushed by the backend over ComfyUI's websocket
+const LIVE_RUN_LIMIT = 20;
+let liveState = {};
+let liveRuns = [];
+let renderLive = null;
+
 // Detect if we're in dark mode
 function isDarkMode() {
     // Check ComfyUI's theme
@@ -410,7 +417,7 @@ async function saveSchedules() {
     try {
         // If globally disabled, clear all schedules
         const finalSchedules = globalEnabled ? schedules.filter(s => 
-            s.time && s.workflow && s.enabled
+            (s.time || s.trigger) && s.workflow && s.enabled
         ) : [];
         
         const response = await fetch('/scheduledtask/save_schedules', {
@@ -429,7 +436,8 @@ async function saveSchedules() {
             showNotification("Schedule settings saved and applied!", "success");
             return true;
         } else {
-            throw new Error(`HTTP ${response.status}`);
+            const data = await response.json().catch(() => ({}));
+            throw new Error(data.error || `HTTP ${response.status}`);
         }
     } catch (error) {
         console.error("Save failed:", error);
@@ -438,6 +446,219 @@ async function saveSchedules() {
     return false;
 }
 
+// Simulate a day of the current (possibly unsaved) schedules
+async function planCapacity(durations) {
+    try {
+        const response = await fetch('/scheduledtask/plan', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ schedules: schedules, durations: durations })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || `HTTP ${response.status}`);
+        }
+        return data;
+    } catch (error) {
+        console.error("Capacity planning failed:", error);
+        showNotification("Capacity planning failed: " + error.message, "error");
+    }
+    return null;
+}
+
+function formatClock(timestamp) {
+    return new Date(timestamp * 1000).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+}
+
+function formatDuration(seconds) {
+    if (seconds < 60) return `${Math.round(seconds)}s`;
+    if (seconds < 3600) return `${Math.round(seconds / 60)}m`;
+    return `${(seconds / 3600).toFixed(1)}h`;
+}
+
+// Render planner results with editable per-workflow durations
+function renderPlan(container, plan, durations, rerun) {
+    const colors = getThemeColors();
+    container.innerHTML = '';
+    container.style.display = 'block';
+    
+    const title = document.createElement('div');
+    title.innerHTML = '<strong>📈 Predicted Next 24 Hours</strong>';
+    title.style.cssText = 'margin-bottom: 8px; font-size: 13px;';
+    container.appendChild(title);
+    
+    const summary = document.createElement('div');
+    summary.style.cssText = 'display: flex; flex-wrap: wrap; gap: 12px; font-size: 12px; margin-bottom: 10px;';
+    [
+        ['Runs', `${plan.prompts}`],
+        ['Utilization', `${(plan.utilization * 100).toFixed(1)}%`],
+        ['Start delay p50 / p95 / max', `${formatDuration(plan.delay.p50)} / ${formatDuration(plan.delay.p95)} / ${formatDuration(plan.delay.max)}`],
+        ['Peak queue', plan.peak_queue_at ? `${plan.peak_queue_depth} at ${formatClock(plan.peak_queue_at)}` : '0'],
+        ['Idle', formatDuration(plan.idle_seconds)],
+        ['Model swaps', plan.model_swaps ?? '-'],
+    ].forEach(([label, value]) => {
+        const item = document.createElement('div');
+        item.innerHTML = `<span style="color: ${colors.textSecondary};">${label}:</span> <strong>${value}</strong>`;
+        summary.appendChild(item);
+    });
+    container.appendChild(summary);
+    
+    const table = document.createElement('table');
+    table.style.cssText = 'width: 100%; border-collapse: collapse; font-size: 11px; margin-bottom: 8px;';
+    const header = document.createElement('tr');
+    ['Workflow', 'Runs', 'Duration (s)', 'Delay p95', 'Delay max'].forEach(text => {
+        const th = document.createElement('th');
+        th.textContent = text;
+        th.style.cssText = `text-align: left; padding: 4px; border-bottom: 1px solid ${colors.border};`;
+        header.appendChild(th);
+    });
+    table.appendChild(header);
+    
+    Object.entries(plan.workflows).forEach(([workflow, stats]) => {
+        const tr = document.createElement('tr');
+        const durationInput = document.createElement('input');
+        durationInput.type = 'number';
+        durationInput.min = '1';
+        durationInput.value = Math.round(stats.duration);
+        durationInput.title = `Source: ${stats.source}`;
+        durationInput.style.cssText = `width: 70px; padding: 2px 4px; font-size: 11px; background: ${colors.input}; color: ${colors.text}; border: 1px solid ${colors.inputBorder};`;
+        durationInput.onchange = (e) => {
+            durations[workflow] = Math.max(1, parseInt(e.target.value, 10) || 1);
+            rerun();
+        };
+        [workflow, `${stats.count}`, durationInput, formatDuration(stats.p95), formatDuration(stats.max)].forEach(value => {
+            const td = document.createElement('td');
+            td.style.cssText = 'padding: 4px;';
+            if (value instanceof HTMLElement) {
+                td.appendChild(value);
+            } else {
+                td.textContent = value;
+            }
+            tr.appendChild(td);
+        });
+        table.appendChild(tr);
+    });
+    container.appendChild(table);
+    
+    if (plan.idle_gaps.length > 0) {
+        const gaps = document.createElement('div');
+        gaps.style.cssText = `font-size: 11px; color: ${colors.textSecondary};`;
+        gaps.textContent = 'Longest idle gaps: ' + plan.idle_gaps.slice(0, 5)
+            .map(gap => `${formatClock(gap.start)}–${formatClock(gap.end)} (${formatDuration(gap.seconds)})`)
+            .join(', ');
+        container.appendChild(gaps);
+    }
+}
+
+// Merge a run lifecycle event into the recent runs list (newest first)
+function applyRunEvent(run) {
+    const index = run.prompt_id ? liveRuns.findIndex(r => r.prompt_id === run.prompt_id) : -1;
+    if (index >= 0) {
+        liveRuns[index] = { ...liveRuns[index], ...run };
+    } else {
+        liveRuns.unshift(run);
+        liveRuns.length = Math.min(liveRuns.length, LIVE_RUN_LIMIT);
+    }
+}
+
+// Subscribe once to pushed state diffs and run events
+function setupLiveUpdates() {
+    api.addEventListener("scheduledtask.state", (event) => {
+        Object.assign(liveState, event.detail);
+        if (renderLive) renderLive();
+    });
+    api.addEventListener("scheduledtask.run", (event) => {
+        applyRunEvent(event.detail);
+        if (renderLive) renderLive();
+    });
+}
+
+// Initial snapshot; everything after arrives as pushed diffs
+async function loadLiveState() {
+    try {
+        const response = await fetch('/scheduledtask/live');
+        if (response.ok) {
+            const data = await response.json();
+            liveState = data.state || {};
+            liveRuns = (data.runs || []).reverse();
+            if (renderLive) renderLive();
+        }
+    } catch (error) {
+        console.error("Failed to load live status:", error);
+    }
+}
+
+const RUN_STATUS_ICONS = {
+    queued: '⏳',
+    running: '▶️',
+    success: '✅',
+    error: '❌',
+    interrupted: '⏹️',
+    failed: '❌',
+    deferred: '⏸️',
+    coalesced: '🔗',
+    dropped: '⏭️',
+    skipped: '⏭️',
+};
+
+// Live status panel, re-rendered on every pushed update
+function createLivePanel() {
+    const colors = getThemeColors();
+    const panel = document.createElement('div');
+    panel.style.cssText = `
+        margin-bottom: 15px;
+        padding: 10px 12px;
+        background: ${colors.background};
+        border: 1px solid ${colors.border};
+        border-radius: 6px;
+        font-size: 12px;
+        color: ${colors.text};
+    `;
+    
+    const summary = document.createElement('div');
+    summary.style.cssText = 'display: flex; flex-wrap: wrap; gap: 12px; margin-bottom: 6px;';
+    const runList = document.createElement('div');
+    runList.style.cssText = `font-size: 11px; color: ${colors.textSecondary}; max-height: 140px; overflow-y: auto;`;
+    
+    panel.appendChild(summary);
+    panel.appendChild(runList);
+    
+    renderLive = () => {
+        const state = liveState;
+        summary.innerHTML = '';
+        [
+            ['Service', state.running ? '🟢 Running' : '⚪ Stopped'],
+            ['Role', state.leader === false ? '💤 Standby' : '👑 Leader'],
+            ['Jobs', state.schedule_count ?? 0],
+            ['Next run', state.next_run ? formatClock(state.next_run) : '-'],
+            ['In flight', state.in_flight ?? 0],
+            ['Deferred', state.deferred ?? 0],
+        ].forEach(([label, value]) => {
+            const item = document.createElement('div');
+            item.innerHTML = `<span style="color: ${colors.textSecondary};">${label}:</span> <strong>${value}</strong>`;
+            summary.appendChild(item);
+        });
+        
+        runList.innerHTML = '';
+        if (liveRuns.length === 0) {
+            runList.textContent = 'No runs yet';
+            return;
+        }
+        liveRuns.forEach(run => {
+            const line = document.createElement('div');
+            const at = run.at || run.finished_at || run.started_at || run.enqueued_at;
+            const timing = run.execution_time != null ? ` in ${formatDuration(run.execution_time)}` : '';
+            line.textContent = `${RUN_STATUS_ICONS[run.status] || '•'} ${at ? formatClock(at) : ''} ${run.workflow} – ${run.status}${timing}${run.error ? ` (${run.error})` : ''}`;
+            runList.appendChild(line);
+        });
+    };
+    renderLive();
+    
+    return panel;
+}
+
 // Load existing schedule settings
 async function loadSchedules() {
     try {
@@ -655,16 +876,56 @@ async function createScheduleSettings() {
         saveButton.textContent = '💾 Save Settings';
     };
     
+    // Capacity planner
+    const planContainer = document.createElement('div');
+    planContainer.style.cssText = `
+        display: none;
+        margin-top: 12px;
+        padding: 12px;
+        border: 1px solid ${colors.border};
+        border-radius: 6px;
+        background: ${colors.background};
+        color: ${colors.text};
+    `;
+    const planDurations = {};
+    
+    const planButton = document.createElement('button');
+    planButton.textContent = '📈 Plan Day';
+    planButton.title = 'Predict queueing for the next 24 hours';
+    planButton.style.cssText = `
+        padding: 6px 12px;
+        background: #607D8B;
+        color: white;
+        border: none;
+        border-radius: 4px;
+        cursor: pointer;
+        font-size: 12px;
+    `;
+    
+    async function runPlan() {
+        planButton.disabled = true;
+        const plan = await planCapacity(planDurations);
+        planButton.disabled = false;
+        if (plan) {
+            renderPlan(planContainer, plan, planDurations, runPlan);
+        }
+    }
+    planButton.onclick = runPlan;
+    
+    buttonContainer.appendChild(planButton);
     buttonContainer.appendChild(addButton);
     buttonContainer.appendChild(saveButton);
     
     // Assemble interface
     container.appendChild(description);
     container.appendChild(globalSwitchContainer);
+    container.appendChild(createLivePanel());
     container.appendChild(schedulesContainer);
     container.appendChild(buttonContainer);
+    container.appendChild(planContainer);
     
     renderSchedules();
+    loadLiveState();
     
     return container;
 }
@@ -729,35 +990,151 @@ function createScheduleRow(schedule, index) {
     enabledContainer.appendChild(enabledLabel);
     enabledContainer.appendChild(enabledSwitch);
     
-    // Time input
-    const timeContainer = document.createElement('div');
-    timeContainer.style.cssText = 'display: flex; flex-direction: column; gap: 2px; min-width: 110px;';
+    // Trigger type selection
+    const typeContainer = document.createElement('div');
+    typeContainer.style.cssText = 'display: flex; flex-direction: column; gap: 2px; min-width: 90px;';
     
-    const timeLabel = document.createElement('label');
-    timeLabel.textContent = 'Time';
-    timeLabel.style.cssText = `font-size: 10px; color: ${colors.textSecondary}; font-weight: bold;`;
+    const typeLabel = document.createElement('label');
+    typeLabel.textContent = 'Trigger';
+    typeLabel.style.cssText = `font-size: 10px; color: ${colors.textSecondary}; font-weight: bold;`;
     
-    const timeInput = document.createElement('input');
-    timeInput.type = 'time';
-    timeInput.value = schedule.time || '';
-    timeInput.style.cssText = `
+    const inputStyle = `
         padding: 6px 8px;
         border: 1px solid ${colors.inputBorder};
         border-radius: 3px;
         font-size: 12px;
-        width: 100%;
-        min-width: 100px;
         background: ${colors.input};
         color: ${colors.text};
         box-sizing: border-box;
     `;
     
-    timeInput.onchange = (e) => {
-        schedule.time = e.target.value;
-    };
+    const typeSelect = document.createElement('select');
+    typeSelect.style.cssText = inputStyle + 'width: 100%;';
+    [
+        ['daily', 'Daily'],
+        ['cron', 'Cron'],
+        ['interval', 'Interval'],
+        ['rate', 'Rate']
+    ].forEach(([value, text]) => {
+        const option = document.createElement('option');
+        option.value = value;
+        option.textContent = text;
+        typeSelect.appendChild(option);
+    });
+    typeSelect.value = schedule.trigger ? (schedule.trigger.type || 'daily') : 'daily';
+    
+    typeContainer.appendChild(typeLabel);
+    typeContainer.appendChild(typeSelect);
+    
+    // Trigger inputs (time, cron expression, interval or rate)
+    const timeContainer = document.createElement('div');
+    timeContainer.style.cssText = 'display: flex; flex-direction: column; gap: 2px; min-width: 110px;';
     
-    timeContainer.appendChild(timeLabel);
-    timeContainer.appendChild(timeInput);
+    function createNumberInput(value, min, placeholder, onChange) {
+        const input = document.createElement('input');
+        input.type = 'number';
+        input.min = String(min);
+        input.value = value;
+        input.placeholder = placeholder;
+        input.title = placeholder;
+        input.style.cssText = inputStyle + 'width: 70px;';
+        input.onchange = (e) => onChange(parseInt(e.target.value, 10) || 0);
+        return input;
+    }
+    
+    function renderTriggerInputs() {
+        timeContainer.innerHTML = '';
+        const type = typeSelect.value;
+        const trigger = schedule.trigger || {};
+        
+        const label = document.createElement('label');
+        label.style.cssText = `font-size: 10px; color: ${colors.textSecondary}; font-weight: bold;`;
+        const inputs = document.createElement('div');
+        inputs.style.cssText = 'display: flex; gap: 4px; align-items: center;';
+        
+        if (type === 'daily') {
+            delete schedule.trigger;
+            label.textContent = 'Time';
+            const timeInput = document.createElement('input');
+            timeInput.type = 'time';
+            timeInput.value = schedule.time || '';
+            timeInput.style.cssText = inputStyle + 'width: 100%; min-width: 100px;';
+            timeInput.onchange = (e) => {
+                schedule.time = e.target.value;
+            };
+            inputs.appendChild(timeInput);
+        } else if (type === 'cron') {
+            schedule.trigger = { type: 'cron', expr: trigger.type === 'cron' ? trigger.expr : '' };
+            label.textContent = 'Cron (min hour day month weekday)';
+            const cronInput = document.createElement('input');
+            cronInput.type = 'text';
+            cronInput.value = schedule.trigger.expr;
+            cronInput.placeholder = '*/15 9-17 * * 1-5';
+            cronInput.style.cssText = inputStyle + 'width: 160px;';
+            cronInput.onchange = (e) => {
+                schedule.trigger.expr = e.target.value.trim();
+            };
+            inputs.appendChild(cronInput);
+        } else if (type === 'interval') {
+            schedule.trigger = trigger.type === 'interval' ? trigger : { type: 'interval', every: 900, offset: 0 };
+            label.textContent = 'Every / offset (minutes)';
+            inputs.appendChild(createNumberInput(schedule.trigger.every / 60, 1, 'Every (minutes)', (v) => {
+                schedule.trigger.every = Math.max(1, v) * 60;
+            }));
+            inputs.appendChild(createNumberInput((schedule.trigger.offset || 0) / 60, 0, 'Offset (minutes)', (v) => {
+                schedule.trigger.offset = v * 60;
+            }));
+        } else if (type === 'rate') {
+            schedule.trigger = trigger.type === 'rate' ? trigger : { type: 'rate', count: 4, window: 'hour' };
+            label.textContent = 'Runs per window';
+            inputs.appendChild(createNumberInput(schedule.trigger.count, 1, 'Runs', (v) => {
+                schedule.trigger.count = Math.max(1, v);
+            }));
+            // Window is 'minute', 'hour', 'day' or a number of seconds; other values are kept as saved
+            const current = schedule.trigger.window ?? 'hour';
+            const isSeconds = typeof current === 'number' || /^\d+$/.test(String(current));
+            const windowSelect = document.createElement('select');
+            windowSelect.style.cssText = inputStyle;
+            const units = ['minute', 'hour', 'day'];
+            if (!isSeconds && !units.includes(current)) {
+                units.push(current);
+            }
+            units.forEach(value => {
+                const option = document.createElement('option');
+                option.value = value;
+                option.textContent = `per ${value}`;
+                windowSelect.appendChild(option);
+            });
+            const secondsOption = document.createElement('option');
+            secondsOption.value = 'seconds';
+            secondsOption.textContent = 'per N seconds';
+            windowSelect.appendChild(secondsOption);
+            windowSelect.value = isSeconds ? 'seconds' : current;
+            
+            const secondsInput = createNumberInput(isSeconds ? Number(current) : 3600, 1, 'Window (seconds)', (v) => {
+                schedule.trigger.window = Math.max(1, v);
+            });
+            secondsInput.style.display = isSeconds ? '' : 'none';
+            
+            windowSelect.onchange = (e) => {
+                if (e.target.value === 'seconds') {
+                    schedule.trigger.window = Math.max(1, parseInt(secondsInput.value, 10) || 3600);
+                    secondsInput.style.display = '';
+                } else {
+                    schedule.trigger.window = e.target.value;
+                    secondsInput.style.display = 'none';
+                }
+            };
+            inputs.appendChild(windowSelect);
+            inputs.appendChild(secondsInput);
+        }
+        
+        timeContainer.appendChild(label);
+        timeContainer.appendChild(inputs);
+    }
+    
+    typeSelect.onchange = renderTriggerInputs;
+    renderTriggerInputs();
     
     // Workflow selection
     const workflowContainer = document.createElement('div');
@@ -789,6 +1166,10 @@ function createScheduleRow(schedule, index) {
         const option = document.createElement('option');
         option.value = w.filename;
         option.textContent = `${w.name} (${w.filename})`;
+        if (w.node_count !== undefined) {
+            const models = (w.models || []).join(', ') || 'none';
+            option.title = `${w.node_count} nodes, ${(w.size / 1024).toFixed(1)} KB, models: ${models}`;
+        }
         if (schedule.workflow === w.filename) {
             option.selected = true;
         }
@@ -802,6 +1183,48 @@ function createScheduleRow(schedule, index) {
     workflowContainer.appendChild(workflowLabel);
     workflowContainer.appendChild(workflowSelect);
     
+    // Batch count (variants per run; seeds are randomized unless "vary" is set in schedules.json)
+    const batchContainer = document.createElement('div');
+    batchContainer.style.cssText = 'display: flex; flex-direction: column; gap: 2px; min-width: 60px;';
+    
+    const batchLabel = document.createElement('label');
+    batchLabel.textContent = 'Batch';
+    batchLabel.style.cssText = `font-size: 10px; color: ${colors.textSecondary}; font-weight: bold;`;
+    
+    const batchInput = createNumberInput(schedule.batch ? schedule.batch.count : 1, 1, 'Variants per run', (v) => {
+        if (v > 1) {
+            schedule.batch = { ...(schedule.batch || {}), count: v };
+        } else {
+            delete schedule.batch;
+        }
+    });
+    batchInput.style.width = '60px';
+    
+    batchContainer.appendChild(batchLabel);
+    batchContainer.appendChild(batchInput);
+    
+    // Spread window in seconds (empty = global "spread.window", 0 = never shifted)
+    const spreadContainer = document.createElement('div');
+    spreadContainer.style.cssText = 'display: flex; flex-direction: column; gap: 2px; min-width: 60px;';
+    
+    const spreadLabel = document.createElement('label');
+    spreadLabel.textContent = 'Spread s';
+    spreadLabel.style.cssText = `font-size: 10px; color: ${colors.textSecondary}; font-weight: bold;`;
+    
+    const spreadInput = createNumberInput(schedule.spread ?? '', 0, 'Global', () => {});
+    spreadInput.title = 'Seconds this run may be delayed to avoid bursts with runs due the same minute';
+    spreadInput.style.width = '60px';
+    spreadInput.onchange = (e) => {
+        if (e.target.value === '') {
+            delete schedule.spread;
+        } else {
+            schedule.spread = Math.max(0, parseInt(e.target.value, 10) || 0);
+        }
+    };
+    
+    spreadContainer.appendChild(spreadLabel);
+    spreadContainer.appendChild(spreadInput);
+    
     // Delete button
     const deleteButton = document.createElement('button');
     deleteButton.textContent = '❌';
@@ -837,8 +1260,11 @@ function createScheduleRow(schedule, index) {
     // Assemble row
     row.appendChild(indexLabel);
     row.appendChild(enabledContainer);
+    row.appendChild(typeContainer);
     row.appendChild(timeContainer);
     row.appendChild(workflowContainer);
+    row.appendChild(batchContainer);
+    row.appendChild(spreadContainer);
     row.appendChild(deleteButton);
     
     updateRowStyle();
@@ -910,6 +1336,8 @@ waitForComfyUI().then(() => {
         async setup() {
             console.log("✅ ComfyUI-ScheduledTask extension loaded");
             
+            setupLiveUpdates();
+            
             // Add context menu item
             const origGetCanvasMenuOptions = LGraphCanvas.prototype.getCanvasMenuOptions;
             LGraphCanvas.prototype.getCanvasMenuOptions = function () {
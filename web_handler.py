@@ -1,22 +1,77 @@
 from aiohttp import web
-import json
 import logging
 
+from .storage import AsyncStorage, CHUNK_SIZE
+
 logger = logging.getLogger(__name__)
 
+# File and encoding work of the routes runs here, off ComfyUI's event loop
+storage = AsyncStorage()
+
+
+async def send_json(request, data, headers=None):
+    """Encode on the storage pool, gzip large bodies if accepted, and stream them out in chunks"""
+    body, encoding = await storage.encode(data, 'gzip' in request.headers.get('Accept-Encoding', ''))
+    headers = dict(headers or {})
+    headers['Content-Type'] = 'application/json; charset=utf-8'
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        headers['Vary'] = 'Accept-Encoding'
+    if len(body) <= CHUNK_SIZE:
+        return web.Response(body=body, headers=headers)
+    response = web.StreamResponse(headers=headers)
+    response.content_length = len(body)
+    await response.prepare(request)
+    view = memoryview(body)
+    for start in range(0, len(body), CHUNK_SIZE):
+        await response.write(view[start:start + CHUNK_SIZE])
+    await response.write_eof()
+    return response
+
+
+def plan_request(data):
+    """
+    (schedules, durations, start) of a /plan request body.
+
+    Raises ValueError with a message for the client if the body is malformed.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be an object')
+    schedules = data.get('schedules')
+    if schedules is not None:
+        if not isinstance(schedules, list) or not all(isinstance(item, dict) for item in schedules):
+            raise ValueError('schedules must be a list of objects')
+    durations = data.get('durations') or {}
+    if not isinstance(durations, dict):
+        raise ValueError('durations must be an object')
+    for workflow, seconds in durations.items():
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not 0 <= seconds < float('inf'):
+            raise ValueError(f'durations[{workflow!r}] must be a non-negative number of seconds')
+    start = data.get('start')
+    if start is not None and (isinstance(start, bool) or not isinstance(start, (int, float))):
+        raise ValueError('start must be a timestamp')
+    return schedules, durations, start
+
+
 def setup_routes():
     """Setup simplified web routes"""
     try:
         import server
         from . import get_scheduler
+        from .metrics import REGISTRY
         
         @server.PromptServer.instance.routes.get("/scheduledtask/get_workflows")
         async def get_workflows(request):
             """Get workflow list"""
             try:
                 scheduler = get_scheduler()
-                workflows = scheduler.get_workflows()
-                return web.json_response({'workflows': workflows})
+                # Rescanning reads changed workflow files
+                workflows = await storage.run(scheduler.get_workflows)
+                etag = scheduler.workflow_index.etag
+                headers = {'ETag': etag, 'Cache-Control': 'no-cache'} if etag else {}
+                if etag and request.headers.get('If-None-Match') == etag:
+                    return web.Response(status=304, headers=headers)
+                return await send_json(request, {'workflows': workflows}, headers=headers)
             except Exception as e:
                 logger.error(f"Failed to get workflow list: {e}")
                 return web.json_response({'error': str(e)}, status=500)
@@ -27,7 +82,7 @@ def setup_routes():
             try:
                 scheduler = get_scheduler()
                 config = scheduler.load_config()
-                return web.json_response({
+                return await send_json(request, {
                     'schedules': config.get('schedules', []),
                     'globalEnabled': config.get('globalEnabled', False)
                 })
@@ -39,12 +94,16 @@ def setup_routes():
         async def save_schedules(request):
             """Save schedule settings"""
             try:
-                data = await request.json()
+                data = await storage.read_json(request)
                 schedules = data.get('schedules', [])
                 global_enabled = data.get('globalEnabled', False)
                 
                 scheduler = get_scheduler()
-                success = scheduler.save_schedules(schedules, global_enabled)
+                # Atomic write with fsync
+                try:
+                    success = await storage.run(scheduler.save_schedules, schedules, global_enabled)
+                except ValueError as e:
+                    return web.json_response({'error': str(e)}, status=400)
                 
                 if success:
                     return web.json_response({
@@ -53,6 +112,8 @@ def setup_routes():
                     })
                 else:
                     return web.json_response({'error': 'Save failed'}, status=500)
+            except web.HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Failed to save schedule settings: {e}")
                 return web.json_response({'error': str(e)}, status=500)
@@ -62,22 +123,96 @@ def setup_routes():
             """Get service status"""
             try:
                 scheduler = get_scheduler()
-                status = scheduler.get_status()
+                # Reads the leader lease file
+                status = await storage.run(scheduler.get_status)
                 return web.json_response(status)
             except Exception as e:
                 logger.error(f"Failed to get status: {e}")
                 return web.json_response({'error': str(e)}, status=500)
         
+        @server.PromptServer.instance.routes.get("/scheduledtask/metrics")
+        async def get_metrics(request):
+            """Prometheus text exposition of scheduler metrics"""
+            try:
+                get_scheduler()
+                return web.Response(body=REGISTRY.render().encode('utf-8'),
+                                    headers={'Content-Type': REGISTRY.CONTENT_TYPE})
+            except Exception as e:
+                logger.error(f"Failed to render metrics: {e}")
+                return web.json_response({'error': str(e)}, status=500)
+        
+        @server.PromptServer.instance.routes.get("/scheduledtask/live")
+        async def get_live(request):
+            """Initial live state and recent runs; later changes arrive over the websocket"""
+            try:
+                scheduler = get_scheduler()
+                return web.json_response({
+                    'state': scheduler.live_state(),
+                    'runs': [record.to_dict() for record in list(scheduler.tracker.recent)[-20:]]
+                })
+            except Exception as e:
+                logger.error(f"Failed to get live status: {e}")
+                return web.json_response({'error': str(e)}, status=500)
+        
+        @server.PromptServer.instance.routes.get("/scheduledtask/history")
+        async def get_history(request):
+            """Get paginated run history"""
+            try:
+                query = request.rel_url.query
+                try:
+                    limit = min(max(int(query.get('limit', 50)), 1), 500)
+                    before = int(query['before']) if query.get('before') else None
+                    since = float(query['since']) if query.get('since') else None
+                    until = float(query['until']) if query.get('until') else None
+                except ValueError:
+                    return web.json_response({'error': 'Invalid pagination parameters'}, status=400)
+                
+                scheduler = get_scheduler()
+                page = await storage.run(
+                    scheduler.history.query,
+                    limit=limit,
+                    before=before,
+                    workflow=query.get('workflow') or None,
+                    status=query.get('status') or None,
+                    since=since,
+                    until=until
+                )
+                return await send_json(request, page)
+            except Exception as e:
+                logger.error(f"Failed to get run history: {e}")
+                return web.json_response({'error': str(e)}, status=500)
+        
+        @server.PromptServer.instance.routes.post("/scheduledtask/plan")
+        async def plan_capacity(request):
+            """Simulate a day of schedules (saved, or the posted unsaved ones)"""
+            try:
+                data = await storage.read_json(request) if request.can_read_body else {}
+                try:
+                    schedules, durations, start = plan_request(data)
+                except ValueError as e:
+                    return web.json_response({'error': str(e)}, status=400)
+                
+                scheduler = get_scheduler()
+                # Simulation is CPU bound; keep it off the event loop
+                result = await storage.run(scheduler.plan_capacity, schedules=schedules, durations=durations,
+                                           start=start)
+                return await send_json(request, result)
+            except web.HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Failed to plan capacity: {e}")
+                return web.json_response({'error': str(e)}, status=500)
+        
         @server.PromptServer.instance.routes.post("/scheduledtask/toggle_global")
         async def toggle_global(request):
             """Toggle global switch"""
             try:
-                data = await request.json()
+                data = await storage.read_json(request)
                 enabled = data.get('enabled', False)
                 
                 scheduler = get_scheduler()
                 schedules = scheduler.load_schedules()
-                success = scheduler.save_schedules(schedules, enabled)
+                success = await storage.run(scheduler.save_schedules, schedules, enabled)
                 
                 if success:
                     return web.json_response({
@@ -87,6 +222,8 @@ def setup_routes():
                     })
                 else:
                     return web.json_response({'error': 'Toggle failed'}, status=500)
+            except web.HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Failed to toggle global switch: {e}")
                 return web.json_response({'error': str(e)}, status=500)
@@ -95,7 +232,7 @@ def setup_routes():
         async def save_workflow(request):
             """Save workflow as task file"""
             try:
-                data = await request.json()
+                data = await storage.read_json(request)
                 workflow_name = data.get('name', '').strip()
                 workflow_data = data.get('workflow', {})
                 
@@ -116,21 +253,20 @@ def setup_routes():
                 
                 # Ensure folder exists
                 import os
-                os.makedirs(workflow_dir, exist_ok=True)
+                await storage.run(os.makedirs, workflow_dir, exist_ok=True)
                 
-                # Save file
+                # Save file (large workflows are written compactly)
                 filepath = os.path.join(workflow_dir, safe_name)
-                
-                # Check if file already exists
-                if os.path.exists(filepath):
+                try:
+                    size = await storage.save_workflow(filepath, workflow_data)
+                except FileExistsError:
                     return web.json_response({
                         'error': f'File {safe_name} already exists, please use a different name'
                     }, status=400)
                 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(workflow_data, f, ensure_ascii=False, indent=2)
-                
-                logger.info(f"Successfully saved workflow: {safe_name}")
+                # Index the new workflow's models for affinity grouping
+                await storage.run(scheduler.workflow_index.refresh, True)
+                logger.info(f"Successfully saved workflow: {safe_name} ({size} bytes)")
                 
                 return web.json_response({
                     'status': 'success',
@@ -138,6 +274,8 @@ def setup_routes():
                     'filename': safe_name
                 })
                 
+            except web.HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Failed to save workflow: {e}")
                 return web.json_response({'error': str(e)}, status=500)
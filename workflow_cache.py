@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .dispatcher import encode_prompt
+from .metrics import PAYLOAD_LOAD
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Batch templates kept, least recently used evicted first
+MAX_TEMPLATES = 64
+
+
+class WorkflowFormatError(ValueError):
+    """Raised when a workflow file is not a usable API-format graph"""
+
+
+def validate_workflow(workflow_data):
+    """Check that workflow_data is an API-format graph"""
+    if not isinstance(workflow_data, dict) or not workflow_data:
+        raise WorkflowFormatError("Workflow must be a non-empty JSON object")
+    for node_id, node in workflow_data.items():
+        if not isinstance(node, dict) or 'class_type' not in node:
+            raise WorkflowFormatError(f"Node {node_id} has no class_type (not an API-format workflow?)")
+    return workflow_data
+
+
+class WorkflowPayloadCache:
+    """
+    LRU cache of validated, pre-encoded /prompt request bodies.
+
+    Entries are keyed by path and checked against the file's mtime and
+    size on every lookup, so edited files are re-read on their next run.
+    The cache evicts least recently used entries beyond `max_bytes`.
+    Batch templates built from the parsed graph are cached the same way.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filepath):
+        """Return the encoded request body for a workflow file"""
+        started = time.perf_counter()
+        stat = os.stat(filepath)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(filepath)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(filepath)
+                self.hits += 1
+                PAYLOAD_LOAD.observe(time.perf_counter() - started, cache='hit')
+                return entry[1]
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            workflow_data = validate_workflow(json.load(f))
+        body = encode_prompt(workflow_data)
+
+        with self._lock:
+            self.misses += 1
+            old = self._entries.pop(filepath, None)
+            if old is not None:
+                self.size -= len(old[1])
+            if len(body) <= self.max_bytes:
+                self._entries[filepath] = (signature, body)
+                self.size += len(body)
+                while self.size > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self.size -= len(evicted)
+        PAYLOAD_LOAD.observe(time.perf_counter() - started, cache='miss')
+        return body
+
+    def template(self, filepath, key, build):
+        """
+        Return build(workflow_data) for a validated workflow file.
+
+        The result is cached per (filepath, key) and rebuilt when the
+        file's mtime or size changes; `key` must identify everything else
+        build depends on.
+        """
+        stat = os.stat(filepath)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._templates.get((filepath, key))
+            if entry is not None and entry[0] == signature:
+                self._templates.move_to_end((filepath, key))
+                return entry[1]
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            template = build(validate_workflow(json.load(f)))
+
+        with self._lock:
+            self._templates[(filepath, key)] = (signature, template)
+            self._templates.move_to_end((filepath, key))
+            while len(self._templates) > MAX_TEMPLATES:
+                self._templates.popitem(last=False)
+        return template
+
+    def invalidate(self, filepath=None):
+        """Drop one entry, or everything when filepath is None"""
+        with self._lock:
+            if filepath is None:
+                self._entries.clear()
+                self._templates.clear()
+                self.size = 0
+            else:
+                entry = self._entries.pop(filepath, None)
+                if entry is not None:
+                    self.size -= len(entry[1])
+                for key in [key for key in self._templates if key[0] == filepath]:
+                    del self._templates[key]
+
+    def status(self):
+        return {
+            'entries': len(self._entries),
+            'templates': len(self._templates),
+            'bytes': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
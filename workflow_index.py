@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MODEL_EXTENSIONS = ('.safetensors', '.ckpt', '.pt', '.pth', '.bin', '.gguf', '.sft', '.onnx')
+
+# Loader inputs by the kind of model they load, heaviest first
+LOADER_INPUTS = (
+    ('checkpoint', ('ckpt_name', 'unet_name')),
+    ('clip', ('clip_name', 'clip_name1', 'clip_name2', 'clip_name3')),
+    ('vae', ('vae_name',)),
+    ('lora', ('lora_name',)),
+)
+
+
+def find_model_files(workflow_data):
+    """Model files referenced by string inputs of an API-format workflow"""
+    models = set()
+    if not isinstance(workflow_data, dict):
+        return []
+    for node in workflow_data.values():
+        if not isinstance(node, dict):
+            continue
+        for value in (node.get('inputs') or {}).values():
+            if isinstance(value, str) and value.lower().endswith(MODEL_EXTENSIONS):
+                models.add(value)
+    return sorted(models)
+
+
+def find_loaders(workflow_data):
+    """{kind: sorted model names} loaded by the loader nodes of an API-format workflow"""
+    loaders = {}
+    if not isinstance(workflow_data, dict):
+        return loaders
+    for node in workflow_data.values():
+        if not isinstance(node, dict) or 'Loader' not in str(node.get('class_type', '')):
+            continue
+        inputs = node.get('inputs') or {}
+        for kind, names in LOADER_INPUTS:
+            for name in names:
+                value = inputs.get(name)
+                if isinstance(value, str) and value:
+                    loaders.setdefault(kind, set()).add(value)
+    return {kind: sorted(values) for kind, values in loaders.items()}
+
+
+def model_signature(loaders):
+    """
+    Affinity key of a workflow's models, or None if it loads none.
+
+    Base models (checkpoint/UNet, text encoders, VAE) come before LoRAs,
+    so sorting by signature also keeps runs sharing a checkpoint together.
+    """
+    parts = [f"{kind}:{','.join(loaders[kind])}" for kind, _ in LOADER_INPUTS if loaders.get(kind)]
+    return '|'.join(parts) or None
+
+
+class WorkflowEntry:
+    """Metadata of one workflow file"""
+
+    __slots__ = ('filename', 'mtime_ns', 'size', 'hash', 'node_count', 'models', 'loaders',
+                 'signature', 'error')
+
+    def __init__(self, filename, mtime_ns, size):
+        self.filename = filename
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.hash = None
+        self.node_count = 0
+        self.models = []
+        self.loaders = {}
+        self.signature = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            'name': self.filename[:-len('.json')],
+            'filename': self.filename,
+            'size': self.size,
+            'mtime': self.mtime_ns / 1e9,
+            'hash': self.hash,
+            'node_count': self.node_count,
+            'models': self.models,
+            'loaders': self.loaders,
+            'signature': self.signature,
+            'error': self.error,
+        }
+
+
+class WorkflowIndex:
+    """
+    Incrementally maintained index of the Workflow folder.
+
+    refresh() stats every file but only re-reads files whose mtime or
+    size changed. The listing ETag changes only when a file is added,
+    removed or its content changes.
+    """
+
+    def __init__(self, workflow_dir, min_interval=1.0):
+        self.workflow_dir = workflow_dir
+        self.min_interval = min_interval
+        self.entries = {}
+        self.etag = None
+        self._listing = []
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Rescan the folder, at most once per min_interval unless forced"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.etag is not None and now - self._scanned_at < self.min_interval:
+                return False
+            self._scanned_at = now
+
+            seen = {}
+            changed = False
+            try:
+                with os.scandir(self.workflow_dir) as it:
+                    for dir_entry in it:
+                        if not dir_entry.name.endswith('.json') or not dir_entry.is_file():
+                            continue
+                        stat = dir_entry.stat()
+                        entry = self.entries.get(dir_entry.name)
+                        if entry is None or entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                            entry = self._read_entry(dir_entry.path, dir_entry.name, stat)
+                            changed = True
+                        seen[dir_entry.name] = entry
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to scan workflow folder: {e}")
+                return False
+
+            if changed or seen.keys() != self.entries.keys():
+                self.entries = seen
+                self._rebuild_listing()
+                return True
+            return False
+
+    def _read_entry(self, path, filename, stat):
+        entry = WorkflowEntry(filename, stat.st_mtime_ns, stat.st_size)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            entry.hash = hashlib.sha256(raw).hexdigest()
+            workflow_data = json.loads(raw)
+            if isinstance(workflow_data, dict):
+                entry.node_count = len(workflow_data)
+            entry.models = find_model_files(workflow_data)
+            entry.loaders = find_loaders(workflow_data)
+            entry.signature = model_signature(entry.loaders)
+        except Exception as e:
+            entry.error = str(e)
+        return entry
+
+    def _rebuild_listing(self):
+        names = sorted(self.entries)
+        self._listing = [self.entries[name].to_dict() for name in names]
+        digest = hashlib.sha1()
+        for name in names:
+            digest.update(f"{name}\0{self.entries[name].hash}\n".encode('utf-8'))
+        self.etag = f'"{digest.hexdigest()}"'
+
+    def list(self):
+        """Current listing, refreshing it first if due"""
+        self.refresh()
+        return self._listing
+
+    def get(self, filename):
+        self.refresh()
+        return self.entries.get(filename)
+
+    def signatures(self, refresh=True):
+        """{filename: model signature} of every indexed workflow, as last scanned unless refresh"""
+        if refresh:
+            self.refresh()
+        return {name: entry.signature for name, entry in self.entries.items()}